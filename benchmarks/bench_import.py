@@ -0,0 +1,55 @@
+"""Import time benchmarks.
+
+Each benchmark starts a fresh interpreter, as worker processes and
+command line tools do, so the timings include interpreter startup;
+python_startup is the baseline to subtract. The package is imported from
+this source tree, not from an installed copy.
+"""
+
+import os
+import sys
+import subprocess
+
+from harness import benchmark, BENCHMARK_DIR
+
+SOURCE_DIR = os.path.abspath(os.path.join(BENCHMARK_DIR, os.pardir))
+
+
+def python_command(code):
+    """ Return a function that runs code in a fresh interpreter """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = SOURCE_DIR + os.pathsep + env.get('PYTHONPATH', '')
+    env.pop('MESHLABXML_TRACE', None)
+
+    def run_python():
+        subprocess.run([sys.executable, '-c', code], env=env, check=True)
+    return run_python
+
+
+@benchmark(group='import', repeat=10)
+def python_startup():
+    """ Interpreter startup only """
+    return python_command('pass')
+
+
+@benchmark(group='import', repeat=10)
+def import_meshlabxml():
+    return python_command('import meshlabxml')
+
+
+@benchmark(group='import', repeat=10)
+def import_meshlabxml_script():
+    """ Import and build a small script, loading the modules it uses """
+    return python_command(
+        'import meshlabxml as mlx\n'
+        'script = mlx.FilterScript(file_in="in.ply")\n'
+        'mlx.transform.scale(script, 2.0)\n'
+        'mlx.remesh.simplify(script, faces=1000)\n')
+
+
+@benchmark(group='import', repeat=10)
+def import_meshlabxml_all():
+    """ Import and load every filter module """
+    return python_command('import meshlabxml as mlx\n'
+                          'for name in mlx.SUBMODULES:\n'
+                          '    getattr(mlx, name)\n')
@@ -0,0 +1,218 @@
+"""Benchmarks of the Python side overheads of running meshlabserver:
+script generation, run() command assembly and process spawn, temp file
+handling, log parsing and the files helpers.
+
+All meshlabserver calls go to the stand-in fake_meshlabserver.py, so the
+timings do not depend on MeshLab.
+"""
+
+import meshlabxml as mlx
+from meshlabxml import compute
+from meshlabxml import files
+
+from harness import benchmark, BUNNY, BUNNY_RAW
+
+
+def build_script(filter_num=200):
+    """ Build a FilterScript with a mix of transform and measurement filters """
+    script = mlx.FilterScript(file_in=BUNNY, file_out='out.ply')
+    for index in range(filter_num // 4):
+        mlx.transform.translate(script, [index, 0, 0])
+        mlx.transform.rotate(script, 'z', index)
+        mlx.transform.scale(script, 1.01)
+        mlx.compute.measure_geometry(script)
+    return script
+
+
+@benchmark(group='script', repeat=10)
+def script_build_200_filters():
+    build_script(200)
+
+
+@benchmark(group='script', repeat=10)
+def script_save_200_filters():
+    script = build_script(200)
+    return lambda: script.save_to_file('bench_script.mlx')
+
+
+@benchmark(group='run')
+def run_no_script():
+    """ run() command assembly and process spawn only """
+    return lambda: mlx.run(script=None, file_in=BUNNY, file_out='out.ply',
+                           print_meshlabserver_output=False)
+
+
+@benchmark(group='run')
+def run_script_transform():
+    """ Temporary script file and run, no parsing """
+    script = mlx.FilterScript(file_in=BUNNY, file_out='out.ply')
+    mlx.transform.translate(script, [1, 2, 3])
+    return lambda: script.run_script(print_meshlabserver_output=False)
+
+
+@benchmark(group='run')
+def run_script_measure_live():
+    """ Temporary script file and live parsing of measurements """
+    script = mlx.FilterScript(file_in=BUNNY)
+    mlx.compute.measure_geometry(script)
+    mlx.compute.measure_topology(script)
+    return lambda: script.run_script(print_meshlabserver_output=False)
+
+
+@benchmark(group='run')
+def run_script_measure_ml_log():
+    """ Measurements parsed from an ml_log file after the run """
+    script = mlx.FilterScript(file_in=BUNNY)
+    mlx.compute.measure_geometry(script)
+    mlx.compute.measure_topology(script)
+    return lambda: script.run_script(ml_log='bench_ml_log.txt',
+                                     print_meshlabserver_output=False)
+
+
+@benchmark(group='parse', repeat=5)
+def parse_log_1000_blocks():
+    """ Parse a log with 1000 geometry, topology and Hausdorff results """
+    import fake_meshlabserver
+    blocks = [fake_meshlabserver.GEOMETRY_LOG, fake_meshlabserver.TOPOLOGY_LOG,
+              fake_meshlabserver.HAUSDORFF_LOG]
+    with open('bench_parse_log.txt', 'w') as log_file:
+        for _ in range(1000):
+            for block in blocks:
+                log_file.write(''.join('LOG: 2 %s\n' % line for line in block.splitlines()))
+    return lambda: compute.parse_log('bench_parse_log.txt')
+
+
+@benchmark(group='parse', repeat=10)
+def parse_geometry_single():
+    import fake_meshlabserver
+    with open('bench_geometry_log.txt', 'w') as log_file:
+        log_file.write(fake_meshlabserver.GEOMETRY_LOG + '\n')
+    return lambda: compute.parse_geometry('bench_geometry_log.txt')
+
+
+@benchmark(group='parse', repeat=5)
+def results_topology_columns_1000():
+    """ Append 1000 topology results to ResultColumns; the setup checks
+    that manifold and non-manifold results round trip unchanged """
+    import fake_meshlabserver
+    from meshlabxml import results
+    with open('bench_topology_log.txt', 'w') as log_file:
+        for block in (fake_meshlabserver.TOPOLOGY_LOG,
+                      fake_meshlabserver.NON_MANIFOLD_TOPOLOGY_LOG):
+            log_file.write(''.join('LOG: 2 %s\n' % line for line in block.splitlines()))
+    topologies = compute.parse_log('bench_topology_log.txt').topology
+    columns = results.ResultColumns('topology')
+    columns.extend(topologies)
+    for index, topology in enumerate(topologies):
+        if (results.TopologyResult.from_dict(topology).to_dict() != topology or
+                columns[index].to_dict() != topology):
+            raise ValueError('topology result does not round trip: %s' % topology)
+
+    def append():
+        columns = results.ResultColumns('topology')
+        columns.extend(topologies * 500)
+    return append
+
+
+@benchmark(group='files')
+def files_measure_all():
+    return lambda: files.measure_all(BUNNY, print_meshlabserver_output=False)
+
+
+@benchmark(group='files')
+def files_measure_aabb():
+    """ Conversion to xyz by meshlabserver, then parsing the xyz file """
+    return lambda: files.measure_aabb(BUNNY)
+
+
+@benchmark(group='files')
+def files_measure_native():
+    return lambda: files.measure_native(BUNNY)
+
+
+@benchmark(group='files')
+def files_measure_native_raw():
+    """ Open mesh with unreferenced vertices and holes """
+    return lambda: files.measure_native(BUNNY_RAW)
+
+
+@benchmark(group='files')
+def files_measure_sections_100():
+    offsets = [0.5 + 1.9 * index for index in range(100)]
+    return lambda: files.measure_sections(BUNNY, offsets=offsets)
+
+
+@benchmark(group='files')
+def files_measure_dimensions_100():
+    queries = [('x', -80.0 + 1.8 * index, 'y', 10.0) for index in range(100)]
+    return lambda: files.measure_dimensions(BUNNY, queries=queries)
+
+
+@benchmark(group='files')
+def mesh_io_read_ply():
+    from meshlabxml import mesh_io
+    return lambda: mesh_io.read_ply(BUNNY)
+
+
+@benchmark(group='files')
+def files_vert_color_function_native():
+    """ In process cyclic rainbow color function on the bunny, compared to
+    running vert_color.cyclic_rainbow in meshlabserver """
+    from meshlabxml import mesh_io
+    from meshlabxml import muparser
+
+    variables = muparser.vertex_variables(mesh_io.read_ply(BUNNY)[0])
+    funcs = ['127.5*sin(5*z - 0 + %s) + 127.5' % phase for phase in (0.0, 2.0944, 4.1888)]
+    return lambda: muparser.vert_color_function(variables, *funcs)
+
+
+@benchmark(group='files')
+def files_hausdorff_distance_native():
+    """ In process Hausdorff distance between the bunny and a rotated copy,
+    with 10000 samples of each kind, compared to running
+    sampling.hausdorff_distance in meshlabserver """
+    from meshlabxml import distance
+    from meshlabxml import mesh_io
+    from meshlabxml import pattern
+
+    vertices, faces = mesh_io.read_ply(BUNNY)
+    target = (pattern.transform_vertices(vertices, pattern.rotation('z', 1)), faces)
+    return lambda: distance.hausdorff_distance((vertices, faces), target, sample_num=10000)
+
+
+@benchmark(group='files')
+def files_hausdorff_distance_native_shifted():
+    """ Native Hausdorff distance to a copy of the bunny displaced by 20
+    units (a misplaced part), with 1000 samples of each kind """
+    from meshlabxml import distance
+    from meshlabxml import mesh_io
+
+    vertices, faces = mesh_io.read_ply(BUNNY)
+    target = (vertices + [20, 0, 0], faces)
+    return lambda: distance.hausdorff_distance((vertices, faces), target, sample_num=1000,
+                                               maxdist=None)
+
+
+@benchmark(group='files')
+def distance_query_far_points():
+    """ Closest points on the bunny for 100 points within 50 units of its
+    bounding box and 20 points thousands of units away """
+    import numpy as np
+    from meshlabxml import distance
+    from meshlabxml import mesh_io
+
+    vertices, faces = mesh_io.read_ply(BUNNY)
+    grid = distance.TriangleGrid(vertices, faces)
+    rng = np.random.default_rng(0)
+    low, high = vertices.min(axis=0), vertices.max(axis=0)
+    points = np.concatenate([rng.uniform(low - 50, high + 50, size=(100, 3)),
+                             rng.uniform(low - 2000, high + 2000, size=(20, 3))])
+    return lambda: grid.query(points)
+
+
+@benchmark(group='script', repeat=10)
+def script_dry_run_200_filters():
+    """ Dry run of build_script on a bunny proxy; reading and decimating
+    the input is included """
+    script = build_script(200)
+    return lambda: script.dry_run(proxy_faces=5000, print_output=False)
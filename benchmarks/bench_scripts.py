@@ -0,0 +1,249 @@
+"""Script generation microbenchmarks for every filter module.
+
+Each benchmark builds a large FilterScript from one module (nothing is
+run) and reports filters generated per second and the memory allocated,
+measured with tracemalloc. Scripts are generated on request paths in
+services, so this latency is user visible.
+"""
+
+import meshlabxml as mlx
+from meshlabxml import mp_func
+
+from harness import benchmark
+
+REPEAT = 50
+"""int: number of times each module's set of filters is added to a script
+"""
+
+
+def new_script():
+    return mlx.FilterScript(file_in='in.ply', file_out='out.ply')
+
+
+@benchmark(group='generate', memory=True)
+def generate_create():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.create.cube(script, size=2.0, center=True, color='red')
+            mlx.create.cylinder(script, height=2.0, radius=1.0, cir_segments=64)
+            mlx.create.icosphere(script, radius=1.0)
+            mlx.create.torus(script, major_radius=3.0, minor_radius=1.0)
+            mlx.create.grid(script, size=2.0, x_segments=10, y_segments=10)
+            mlx.create.annulus(script, radius1=2.0, radius2=1.0)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_create_hires():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT // 10):
+            mlx.create.cube_hires(script, size=2.0, x_segments=10, y_segments=10,
+                                  z_segments=10, center=True)
+            mlx.create.tube_hires(script, height=2.0, radius1=2.0, radius2=1.0,
+                                  cir_segments=64, rad_segments=4, height_segments=10)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_transform():
+    def build():
+        script = new_script()
+        for index in range(REPEAT):
+            mlx.transform.translate(script, [index, 1, 2])
+            mlx.transform.rotate(script, 'z', index)
+            mlx.transform.scale(script, [1.0, 2.0, 3.0])
+            mlx.transform.rotate2(script, axis='custom', angle=30, custom_axis=[1, 1, 0])
+            mlx.transform.function_cyl_co(script, r_func='r+1')
+            mlx.transform.wrap2cylinder(script, radius=5, pitch=1, taper=0.1)
+            mlx.transform.wrap2sphere(script, radius=5)
+            mlx.transform.radial_flare(script, flare_radius=2, start_radius=1)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_transform_bend():
+    """ Worst case muparser expression generation """
+    def build():
+        script = new_script()
+        for index in range(REPEAT):
+            mlx.transform.bend(script, radius=10 + index, pitch=1, taper=0.01,
+                               angle=90, straght_start=True, straght_end=True)
+        return script
+    return build
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_transform_deform2curve():
+    """ Worst case muparser expression generation """
+    def build():
+        script = new_script()
+        for _ in range(REPEAT // 10):
+            mlx.transform.deform2curve(script, curve=mp_func.torus_knot('t'))
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_select():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.select.all(script)
+            mlx.select.invert(script)
+            mlx.select.border(script)
+            mlx.select.grow(script, iterations=2)
+            mlx.select.small_parts(script)
+            mlx.select.vert_function(script, function='(y > 0) && (x < 1)')
+            mlx.select.cylindrical_vert(script, radius=2.0)
+            mlx.select.spherical_vert(script, radius=2.0)
+            mlx.select.none(script)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_smooth_remesh_subdivide():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.smooth.laplacian(script, iterations=3)
+            mlx.smooth.taubin(script)
+            mlx.smooth.twostep(script)
+            mlx.remesh.simplify(script, faces=10000)
+            mlx.remesh.uniform_resampling(script, voxel=0.5)
+            mlx.remesh.surface_poisson_screened(script)
+            mlx.subdivide.loop(script)
+            mlx.subdivide.midpoint(script)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_texture_transfer_color():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.texture.flat_plane(script)
+            mlx.texture.per_triangle(script)
+            mlx.transfer.vc2tex(script)
+            mlx.transfer.tex2vc(script)
+            mlx.vert_color.function(script, red='x*255', green='y*255', blue='z*255')
+            mlx.vert_color.cyclic_rainbow(script)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_clean_delete_normals_sampling():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.clean.merge_vert(script)
+            mlx.clean.close_holes(script)
+            mlx.delete.unreferenced_vert(script)
+            mlx.delete.duplicate_faces(script)
+            mlx.delete.small_parts(script)
+            mlx.normals.reorient(script)
+            mlx.normals.fix(script)
+            mlx.sampling.poisson_disk(script, sample_num=1000)
+            mlx.compute.measure_geometry(script)
+            mlx.compute.measure_topology(script)
+        return script
+    return build
+
+
+@benchmark(group='generate', memory=True)
+def generate_layers():
+    def build():
+        script = new_script()
+        for _ in range(REPEAT):
+            mlx.layers.duplicate(script)
+            mlx.layers.rename(script, label='copy')
+            mlx.layers.change(script, 0)
+            mlx.layers.delete(script)
+        return script
+    return build
+
+
+@benchmark(group='generate', repeat=10, memory=True)
+def generate_save_to_file():
+    """ Serializing a large script """
+    script = generate_transform()()
+    mlx.transform.bend(script, radius=10, pitch=1, taper=0.01, angle=90)
+
+    def save():
+        script.save_to_file('bench_generate.mlx')
+        return script
+    return save
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_native_cube_hires():
+    """ 1M vertex lithophane blank, generated natively and written as the
+    input of a script """
+    from meshlabxml import primitives
+
+    def build():
+        vertices, faces = primitives.cube_hires(size=[100, 100, 2], x_segments=1000,
+                                                y_segments=1000, z_segments=2)
+        return primitives.to_script('bench_blank.ply', vertices, faces)
+    return build
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_native_tube_hires():
+    from meshlabxml import primitives
+
+    def build():
+        vertices, faces = primitives.tube_hires(height=50, radius1=20, radius2=15,
+                                                cir_segments=1000, rad_segments=10,
+                                                height_segments=500)
+        return primitives.to_script('bench_tube.ply', vertices, faces)
+    return build
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_native_heightmap():
+    """ 1M pixel lithophane, closed and decimated """
+    import numpy as np
+    from meshlabxml import primitives
+
+    rows, cols = np.mgrid[0:1001, 0:1001]
+    heights = np.exp(-((cols - 500) ** 2 + (rows - 300) ** 2) / 5000.0)
+
+    def build():
+        vertices, faces = primitives.heightmap(heights, size=[100, 100], z_scale=3.0,
+                                               thickness=0.8, closed=True, tolerance=0.01)
+        return primitives.to_script('bench_heightmap.ply', vertices, faces)
+    return build
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_native_sweep():
+    """ Quatrefoil sized square tube swept along a (3,4) torus knot """
+    from meshlabxml import primitives
+
+    def build():
+        vertices, faces = primitives.sweep(
+            primitives.torus_knot_curve(p=3, q=4, scale=10.0, radius=2.0),
+            primitives.rect_profile(10, x_segments=64, y_segments=64), segments=1440)
+        return primitives.to_script('bench_sweep.ply', vertices, faces)
+    return build
+
+
+@benchmark(group='generate', repeat=3, memory=True)
+def generate_native_pattern():
+    """ 360 copy radial pattern of a 10x10 grid, written as one input """
+    from meshlabxml import pattern, primitives
+
+    def build():
+        vertices, faces = primitives.grid(size=1.0, x_segments=10, y_segments=10)
+        matrices = pattern.radial(360) @ pattern.translation([20, 0, 0])
+        vertices, faces = pattern.instance(vertices, faces, matrices)
+        return primitives.to_script('bench_pattern.ply', vertices, faces, color='white')
+    return build
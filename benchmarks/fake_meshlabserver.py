@@ -0,0 +1,149 @@
+#!/usr/bin/python3
+"""Stand-in for meshlabserver used by the benchmark suite.
+
+Parses the -i, -o, -s and -l options (other options are ignored), then:
+    Output meshes are copied from the first input mesh. If the extensions
+    differ and NumPy is available, the mesh is converted with mesh_io
+    (ply, stl, obj or xyz input to ply or xyz output); otherwise the file
+    is copied as is.
+    For each filter in the script a canned log is output, with the same
+    format as meshlabserver: measurement results for Compute Geometric
+    Measures, Compute Topological Measures and Hausdorff Distance, and an
+    "Applied filter ... in ... msec" line for every filter.
+    The log is written to the -l file (if any) and to stderr, prefixed with
+    "LOG: <level>" as meshlabserver does.
+
+Nothing is actually computed, so the time of a run is almost entirely the
+MeshLabXML side (command assembly, temp files, process spawn, parsing).
+"""
+
+import os
+import re
+import sys
+import shutil
+
+FILTER_NAME_PATTERN = re.compile(r'<(?:xml)?filter\s+name="([^"]*)"')
+
+GEOMETRY_LOG = """\
+Mesh Bounding Box Size 193.951340 149.001495 191.203903
+Mesh Bounding Box Diag 310.447250
+Mesh Bounding Box min -90.133743 -61.968838 0.000000
+Mesh Bounding Box max 103.817589 87.032661 191.203903
+Mesh Surface Area is 90150.687500
+Mesh Total Len of 96849 Edges is 179819.484375 Edges(including faux edges)
+Mesh Total Len of 96849 Edges is 179819.484375
+Thin shell (faces) barycenter:  -5.587373 0.559730 73.468121
+Mesh Volume  is 1486804.000000
+Center of Mass  is 1.747876 -2.226919 64.788971
+Inertia Tensor is :
+    | 3170550016.000000 -46370464.000000 987163904.000000 |
+    | -46370464.000000 5072923136.000000 -58690096.000000 |
+    | 987163904.000000 -58690096.000000 3817212928.000000 |
+Principal axes are :
+    | 0.809736 0.001188 -0.586793 |
+    | 0.581329 0.134539 0.802468 |
+    | -0.079900 0.990908 -0.108251 |
+axis momenta are :
+    | 2455110656.000000 4522500608.000000 5083073024.000000 |"""
+
+TOPOLOGY_LOG = """\
+V:  32285 E:  96849 F:64566
+Unreferenced Vertices 0
+Boundary Edges 0
+Mesh is composed by 1 connected component(s)
+Mesh is two-manifold
+Mesh has 0 holes
+Genus is 0"""
+
+NON_MANIFOLD_TOPOLOGY_LOG = """\
+V:  100 E:  300 F:200
+Unreferenced Vertices 0
+Boundary Edges 4
+Mesh is composed by 1 connected component(s)
+Mesh has 5 non two manifold edges and 12 faces are incident on these edges
+Mesh has 3 non two manifold vertexes and 9 faces are incident on these vertices
+Mesh has a undefined number of holes (non 2-manifold mesh)
+Genus is undefined (non 2-manifold mesh)"""
+
+HAUSDORFF_LOG = """\
+Hausdorff Distance computed
+Sampled 32285 pts (rng: 0) on bunny searched closest on bunny2
+     Min 0.000000 Max 2.500000 Mean 0.400000 RMS 0.600000
+     Values w.r.t. BBox Diag (310.447250)"""
+
+CANNED_LOGS = {'Compute Geometric Measures': GEOMETRY_LOG,
+               'Compute Topological Measures': TOPOLOGY_LOG,
+               'Hausdorff Distance': HAUSDORFF_LOG}
+
+
+def parse_args(argv):
+    """ Return the input, output, script and log filenames """
+    file_in, file_out, script, ml_log = [], [], None, None
+    index = 0
+    while index < len(argv):
+        arg = argv[index]
+        value = argv[index + 1] if index + 1 < len(argv) else None
+        if arg == '-i':
+            file_in.append(value)
+        elif arg == '-o':
+            file_out.append(value)
+        elif arg == '-s':
+            script = value
+        elif arg == '-l':
+            ml_log = value
+        else:
+            index += 1
+            continue
+        index += 2
+    return file_in, file_out, script, ml_log
+
+
+def write_output(file_in, file_out):
+    """ Copy or convert the input mesh to an output filename """
+    ext_in = os.path.splitext(file_in)[1].lower()
+    ext_out = os.path.splitext(file_out)[1].lower()
+    if ext_in != ext_out and ext_out in ('.ply', '.xyz'):
+        try:
+            sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                            os.pardir))
+            from meshlabxml import mesh_io
+            vertices, faces = mesh_io.read_mesh(file_in)
+            if ext_out == '.ply':
+                mesh_io.write_ply(file_out, vertices, faces)
+            else:
+                with open(file_out, 'w') as xyz_file:
+                    for vert in vertices.tolist():
+                        xyz_file.write('%r %r %r\n' % tuple(vert))
+            return
+        except (ImportError, SystemExit):
+            pass
+    shutil.copyfile(file_in, file_out)
+
+
+def main(argv):
+    """ Pretend to run meshlabserver """
+    file_in, file_out, script, ml_log = parse_args(argv)
+    lines = []
+    for val in file_in:
+        lines.append('LOG: 0 Opened mesh %s in 1 msec' % val)
+    if script is not None:
+        with open(script) as script_file:
+            names = FILTER_NAME_PATTERN.findall(script_file.read())
+        for name in names:
+            if name in CANNED_LOGS:
+                lines.extend('LOG: 2 ' + line for line in CANNED_LOGS[name].splitlines())
+            lines.append('LOG: 0 Applied filter %s in 1 msec' % name)
+    for val in file_out:
+        if file_in:
+            write_output(file_in[0], val)
+        lines.append('LOG: 0 Saved mesh %s in 1 msec' % val)
+    text = '\n'.join(lines) + '\n'
+    if ml_log is not None:
+        with open(ml_log, 'w') as log_file:
+            log_file.write(text)
+    sys.stderr.write(text)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
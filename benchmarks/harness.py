@@ -0,0 +1,208 @@
+"""Benchmark registry, timing and regression checks for the MeshLabXML
+benchmark suite. See run_benchmarks.py.
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import statistics
+import tracemalloc
+import contextlib
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BENCHMARK_DIR, os.pardir, 'models')
+BUNNY = os.path.join(MODEL_DIR, 'bunny_flat(1Z).ply')
+BUNNY_RAW = os.path.join(MODEL_DIR, 'bunny_raw(-1250Y).ply')
+
+BENCHMARKS = []
+"""list: registered benchmarks, as dicts with keys name, func, group,
+repeat and number
+"""
+
+
+def benchmark(name=None, group='default', repeat=5, number=1, memory=False):
+    """ Decorator to register a benchmark.
+
+    The decorated function is called with no arguments and may return a
+    callable: if it does, the function is treated as setup and only the
+    returned callable is timed. Otherwise the function itself is timed.
+    If the timed callable returns a FilterScript, the number of filters
+    generated per second is reported as well.
+
+    Args:
+        name (str): benchmark name; defaults to the function name
+        group (str): group name, for selecting benchmarks to run
+        repeat (int): number of timing samples
+        number (int): calls per sample; the reported time is per call
+        memory (bool): also measure the memory allocated by one call with
+            tracemalloc (in an untimed call, as tracing is slow)
+    """
+    def register(func):
+        BENCHMARKS.append({'name': name or func.__name__, 'func': func, 'group': group,
+                           'repeat': repeat, 'number': number, 'memory': memory})
+        return func
+    return register
+
+
+@contextlib.contextmanager
+def fake_meshlabserver():
+    """ Put the stand-in meshlabserver first on PATH and run in a temporary
+    working directory (MeshLabXML writes TEMP3D files to the cwd) """
+    temp_dir = tempfile.mkdtemp(prefix='mlx_bench_')
+    bin_dir = os.path.join(temp_dir, 'bin')
+    os.mkdir(bin_dir)
+    fake = os.path.join(BENCHMARK_DIR, 'fake_meshlabserver.py')
+    if os.name == 'nt':
+        with open(os.path.join(bin_dir, 'meshlabserver.bat'), 'w') as wrapper:
+            wrapper.write('@"%s" "%s" %%*\n' % (sys.executable, fake))
+    else:
+        wrapper_name = os.path.join(bin_dir, 'meshlabserver')
+        with open(wrapper_name, 'w') as wrapper:
+            wrapper.write('#!/bin/sh\nexec "%s" "%s" "$@"\n' % (sys.executable, fake))
+        os.chmod(wrapper_name, 0o755)
+    old_path, old_cwd = os.environ['PATH'], os.getcwd()
+    os.environ['PATH'] = bin_dir + os.pathsep + old_path
+    work_dir = os.path.join(temp_dir, 'work')
+    os.mkdir(work_dir)
+    os.chdir(work_dir)
+    try:
+        yield work_dir
+    finally:
+        os.chdir(old_cwd)
+        os.environ['PATH'] = old_path
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
+
+@contextlib.contextmanager
+def quiet():
+    """ Discard stdout and stderr, including the output of subprocesses,
+    e.g. meshlabserver output printed by run """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    os.dup2(devnull, 1)
+    os.dup2(devnull, 2)
+    try:
+        with open(os.devnull, 'w') as devnull_file:
+            with contextlib.redirect_stdout(devnull_file):
+                yield
+    finally:
+        sys.stdout.flush()
+        os.dup2(saved[0], 1)
+        os.dup2(saved[1], 2)
+        for descriptor in saved + [devnull]:
+            os.close(descriptor)
+
+
+def time_benchmark(bench):
+    """ Time a registered benchmark.
+
+    Returns:
+        dict: min, median and mean seconds per call, repeat and number.
+            If the benchmark returns a FilterScript also filters (per call)
+            and filters_per_s (using min), and if memory is set also
+            peak_bytes and retained_bytes (allocated during one call).
+    """
+    with quiet():
+        func = bench['func']()
+    if not callable(func):
+        func = bench['func']
+    samples = []
+    for _ in range(bench['repeat']):
+        with quiet():
+            start = time.perf_counter()
+            for _ in range(bench['number']):
+                value = func()
+            samples.append((time.perf_counter() - start) / bench['number'])
+    result = {'min': min(samples), 'median': statistics.median(samples),
+              'mean': statistics.mean(samples), 'repeat': bench['repeat'],
+              'number': bench['number'], 'group': bench['group']}
+    if getattr(value, 'filters', None):
+        result['filters'] = len(value.filters)
+        result['filters_per_s'] = len(value.filters) / result['min'] if result['min'] else 0.0
+    if bench['memory']:
+        value = None
+        with quiet():
+            tracemalloc.start()
+            try:
+                value = func()
+                result['retained_bytes'], result['peak_bytes'] = tracemalloc.get_traced_memory()
+            finally:
+                tracemalloc.stop()
+    return result
+
+
+def format_result(name, result):
+    """ One line summary of a benchmark result """
+    line = '{:40} {:>12.3f} ms'.format(name, result['min'] * 1000)
+    if 'filters_per_s' in result:
+        line += ' {:>12.0f} filters/s'.format(result['filters_per_s'])
+    if 'peak_bytes' in result:
+        line += ' {:>10.1f} kB peak'.format(result['peak_bytes'] / 1024.0)
+    return line
+
+
+def run(names=None, groups=None, print_output=True):
+    """ Run the registered benchmarks in the fake meshlabserver environment.
+
+    Args:
+        names (list): only run benchmarks with these names
+        groups (list): only run benchmarks in these groups
+
+    Returns:
+        dict: JSON serializable results, with keys "machine" and
+            "benchmarks" (results of time_benchmark by name)
+    """
+    results = {'machine': {'python': platform.python_version(),
+                           'platform': platform.platform(),
+                           'processor': platform.processor()},
+               'benchmarks': {}}
+    with fake_meshlabserver():
+        for bench in BENCHMARKS:
+            if names and bench['name'] not in names:
+                continue
+            if groups and bench['group'] not in groups:
+                continue
+            result = time_benchmark(bench)
+            results['benchmarks'][bench['name']] = result
+            if print_output:
+                print(format_result(bench['name'], result))
+    return results
+
+
+def compare(results, baseline, thresholds):
+    """ Compare results against a baseline.
+
+    Args:
+        results (dict): output of run
+        baseline (dict): output of a previous run
+        thresholds (dict): allowed slowdown as a fraction, by benchmark
+            name, with an optional "default" entry (0.25 if missing)
+
+    Returns:
+        list: (name, baseline seconds, seconds, ratio) of every benchmark
+            that is slower than allowed
+    """
+    default = thresholds.get('default', 0.25)
+    regressions = []
+    for name, result in results['benchmarks'].items():
+        if name not in baseline.get('benchmarks', {}):
+            continue
+        old = baseline['benchmarks'][name]['min']
+        ratio = result['min'] / old if old else float('inf')
+        if ratio > 1.0 + thresholds.get(name, default):
+            regressions.append((name, old, result['min'], ratio))
+    return regressions
+
+
+def load_json(filename):
+    """ Load a JSON file, or return an empty dict if it does not exist """
+    if filename is None or not os.path.exists(filename):
+        return {}
+    with open(filename) as json_file:
+        return json.load(json_file)
@@ -0,0 +1,65 @@
+#!/usr/bin/python3
+"""Run the MeshLabXML benchmark suite.
+
+Usage:
+    python benchmarks/run_benchmarks.py [-o results.json]
+        [--baseline baseline.json] [--thresholds thresholds.json]
+        [-g GROUP ...] [-b NAME ...]
+
+Results are written as JSON. If a baseline (a previous results file) is
+given, every benchmark that is slower than the baseline by more than its
+threshold is listed and the exit status is 1, so performance changes show
+up in review.
+"""
+
+import os
+import sys
+import json
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # pylint: disable=wrong-import-position
+
+BENCHMARK_MODULES = ['bench_overhead', 'bench_scripts', 'bench_import']
+"""list: modules that register benchmarks
+"""
+
+
+def main(args=None):
+    """ Run the benchmarks and check for regressions """
+    parser = argparse.ArgumentParser(description='MeshLabXML benchmark suite')
+    parser.add_argument('-o', '--output', default=None,
+                        help='write results to this JSON file')
+    parser.add_argument('--baseline', default=None,
+                        help='JSON results of a previous run to compare against')
+    parser.add_argument('--thresholds', default=os.path.join(harness.BENCHMARK_DIR,
+                                                             'thresholds.json'),
+                        help='JSON file of allowed slowdown (fraction) by benchmark')
+    parser.add_argument('-g', '--group', action='append', dest='groups',
+                        help='only run this group; may be repeated')
+    parser.add_argument('-b', '--benchmark', action='append', dest='names',
+                        help='only run this benchmark; may be repeated')
+    args = parser.parse_args(args)
+
+    for module in BENCHMARK_MODULES:
+        __import__(module)
+    results = harness.run(names=args.names, groups=args.groups)
+    if args.output is not None:
+        with open(args.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+
+    if args.baseline is not None:
+        regressions = harness.compare(results, harness.load_json(args.baseline),
+                                      harness.load_json(args.thresholds))
+        for name, old, new, ratio in regressions:
+            print('REGRESSION: {} {:.3f} ms -> {:.3f} ms ({:+.0f}%)'.format(
+                name, old * 1000, new * 1000, (ratio - 1) * 100))
+        if regressions:
+            return 1
+        print('No regressions against %s' % args.baseline)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -28,6 +28,7 @@ import os
 import math
 
 import meshlabxml as mlx
+from meshlabxml import pattern, primitives
 
 # Add meshlabserver directory to OS PATH; omit this if it is already in
 # your PATH
@@ -62,11 +63,31 @@ def main():
     # height = height of outer triangle
     height = width / math.tan(math.radians(90 / star_points))
 
-    shield = mlx.FilterScript(file_out="shield.ply")
+    # Create a diamond for the center star. First create a plane, specifying
+    # extra vertices to support the final deformation. The length from the
+    # center of the plane to the corners should be 1 for ease of scaling, so
+    # we use a side length of sqrt(2) (thanks Pythagoras!). Rotate the plane
+    # by 45 degrees and scale it to stretch it out per the calculations above,
+    # then translate it into place (including moving it up in z slightly so
+    # that it doesn't overlap the shield front). Copies of the diamond
+    # rotated around the center make the star; all of the copies are
+    # generated at once and used as the input of the script, instead of
+    # duplicating and rotating layers in MeshLab.
+    vertices, faces = primitives.grid(
+        size=math.sqrt(2), x_segments=10, y_segments=10, center=True)
+    diamond = (pattern.translation([0, polygon_radius, 0.001]) @
+               pattern.scaling([width, height, 1]) @
+               pattern.rotation(axis='z', angle=45))
+    vertices, faces = pattern.instance(
+        vertices, faces, pattern.radial(star_points) @ diamond)
+    shield = primitives.to_script(
+        'shield_star.ply', vertices, faces, color='white', file_out='shield.ply')
 
     # Create the colored front of the shield using several concentric
     # annuluses; combine them together and subdivide so we have more vertices
-    # to give a smoother deformation later.
+    # to give a smoother deformation later. The star is combined too, as it
+    # is the first layer, so only the front (at z = 0) is selected and
+    # subdivided; the star keeps its own grid, as when it was created last.
     mlx.create.annulus(shield, radius=star_radius, cir_segments=segments, color='blue')
     mlx.create.annulus(shield,
         radius1=star_radius + ring_thickness,
@@ -84,7 +105,9 @@ def main():
         cir_segments=segments,
         color='red')
     mlx.layers.join(shield)
-    mlx.subdivide.midpoint(shield, iterations=2)
+    mlx.select.face_function(shield, function='(z0 < 0.0005)')
+    mlx.subdivide.midpoint(shield, iterations=2, selected=True)
+    mlx.select.none(shield)
 
     # Create the inside surface of the shield & translate down slightly so it
     # doesn't overlap the front.
@@ -96,29 +119,6 @@ def main():
     mlx.transform.translate(shield, value=[0, 0, -0.005])
     mlx.subdivide.midpoint(shield, iterations=4)
 
-    # Create a diamond for the center star. First create a plane, specifying
-    # extra vertices to support the final deformation. The length from the
-    # center of the plane to the corners should be 1 for ease of scaling, so
-    # we use a side length of sqrt(2) (thanks Pythagoras!). Rotate the plane
-    # by 45 degrees and scale it to stretch it out per the calculations above,
-    # then translate it into place (including moving it up in z slightly so
-    # that it doesn't overlap the shield front).
-    mlx.create.grid(shield,
-        size=math.sqrt(2),
-        x_segments=10,
-        y_segments=10,
-        center=True,
-        color='white')
-    mlx.transform.rotate(shield, axis='z', angle=45)
-    mlx.transform.scale(shield, value=[width, height, 1])
-    mlx.transform.translate(shield, value=[0, polygon_radius, 0.001])
-
-    # Duplicate the diamond and rotate the duplicates around, generating the
-    # star.
-    for _ in range(1, star_points):
-        mlx.layers.duplicate(shield)
-        mlx.transform.rotate(shield, axis='z', angle=360 / star_points)
-
     # Combine everything together and deform using a spherical function.
     mlx.layers.join(shield)
     mlx.transform.vert_function(shield,
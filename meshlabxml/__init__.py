@@ -1,23 +1,24 @@
 
 from .mlx import *
 
-from . import clean
-from . import compute
-from . import create
-from . import delete
-from . import files
-from . import layers
-from . import normals
-from . import remesh
-from . import sampling
-from . import select
-from . import smooth
-from . import subdivide
-from . import texture
-from . import transfer
-from . import transform
-from . import util
-from . import vert_color
-from . import mp_func
+# Filter modules are imported on first use (e.g. mlx.transform), so that
+# importing meshlabxml stays cheap for short lived worker processes and
+# command line tools.
+SUBMODULES = ('clean', 'compute', 'create', 'delete', 'files', 'layers',
+              'normals', 'remesh', 'sampling', 'select', 'smooth', 'subdivide',
+              'texture', 'transfer', 'transform', 'util', 'vert_color', 'mp_func')
+
+
+def __getattr__(name):
+    if name in SUBMODULES:
+        import importlib
+        module = importlib.import_module('.' + name, __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+def __dir__():
+    return sorted(set(globals()) | set(SUBMODULES))
 
 #from .color_names import color_name
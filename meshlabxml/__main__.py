@@ -0,0 +1,52 @@
+""" MeshLabXML command line interface
+
+Usage:
+    python -m meshlabxml measure_tree ROOT [-p PATTERN ...] [-w WORKERS]
+        [-o REPORT] [--index INDEX] [--no-native] [--log LOG]
+        [--memory-budget BYTES|auto]
+"""
+
+import argparse
+
+from . import files
+
+
+def main(args=None):
+    """ Run the command line interface """
+    parser = argparse.ArgumentParser(prog='python -m meshlabxml',
+                                     description='MeshLabXML command line tools')
+    commands = parser.add_subparsers(dest='command')
+
+    tree = commands.add_parser('measure_tree', help=(
+        'measure geometry and topology of every mesh in a directory tree'))
+    tree.add_argument('root', help='directory to search')
+    tree.add_argument('-p', '--pattern', action='append', dest='patterns',
+                      help='filename pattern to measure, e.g. "*.ply"; may be '
+                      'repeated (default: all supported mesh formats)')
+    tree.add_argument('-w', '--workers', type=int, default=None,
+                      help='number of worker processes (default: number of CPUs)')
+    tree.add_argument('-o', '--report', default=None,
+                      help='write all results to this csv or npz file')
+    tree.add_argument('--index', default=None,
+                      help='sidecar index file (default: %s in root)' % files.MEASURE_TREE_INDEX)
+    tree.add_argument('--no-native', dest='native', action='store_false',
+                      help='always measure with meshlabserver')
+    tree.add_argument('--log', default=None, help='log progress to this file')
+    tree.add_argument('--memory-budget', default=None,
+                      help='only start a measurement while the predicted memory of all '
+                      'running measurements fits this many bytes, or "auto" for most of '
+                      'the host memory; -w is then the maximum concurrency')
+
+    args = parser.parse_args(args)
+    if args.command == 'measure_tree':
+        files.measure_tree(args.root, patterns=args.patterns or files.MEASURE_TREE_PATTERNS,
+                           workers=args.workers, report=args.report, index=args.index,
+                           native=args.native, log=args.log,
+                           memory_budget=(args.memory_budget if args.memory_budget in (None, 'auto')
+                                          else int(args.memory_budget)))
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
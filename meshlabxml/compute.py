@@ -3,6 +3,7 @@
 #from . import mlx.FilterScript
 import meshlabxml as mlx
 import re
+import time
 from . import util
 
 ml_version = '2020.09'
@@ -189,6 +190,429 @@ def measure_topology(script):
     return None
 
 
+# Log parsing
+NUM_PATTERN = re.compile(r'[-+]?(?:(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?|nan|inf)', re.I)
+"""Compiled regex matching a single number in meshlabserver's log output
+"""
+
+LOG_PREFIX_PATTERN = re.compile(r'^\s*LOG:\s*\d+\s')
+"""Compiled regex matching the "LOG: n" prefix of meshlabserver's stdout
+"""
+
+GEOMETRY_PATTERN = re.compile('|'.join([
+    r'(?P<aabb_min>Mesh Bounding Box min)',
+    r'(?P<aabb_max>Mesh Bounding Box max)',
+    r'(?P<aabb_size>Mesh Bounding Box Size)',
+    r'(?P<aabb_diagonal>Mesh Bounding Box Diag)',
+    r'(?P<volume>Mesh Volume)',
+    r'(?P<area>Mesh Surface)',
+    r'(?P<edge_length>Mesh Total Len of)',
+    r'(?P<barycenter>Thin shell (?:\(faces\) )?barycenter)',
+    r'(?P<vert_barycenter>Vertices barycenter)',
+    r'(?P<center_of_mass>Center of Mass)',
+    r'(?P<inertia_tensor>Inertia Tensor)',
+    r'(?P<principal_axes>Principal axes)',
+    r'(?P<axis_momenta>axis momenta)']))
+"""Compiled regex matching the lines output by measure_geometry
+"""
+
+TOPOLOGY_PATTERN = re.compile('|'.join([
+    r'(?P<vert_edge_face>V:\s*\d+\s+E:\s*\d+\s+F:\s*\d+)',
+    r'(?P<unref_vert_num>Unreferenced Vertices)',
+    r'(?P<boundry_edge_num>Boundary Edges)',
+    r'(?P<part_num>Mesh is composed by)',
+    r'(?P<non_manifold>non 2-manifold mesh)',
+    r'(?P<non_manifold_edge>non two manifold edges)',
+    r'(?P<non_manifold_vert>non two manifold vertexes)',
+    r'(?P<genus>Genus is)',
+    r'(?P<hole_num>Mesh has .*holes)']))
+"""Compiled regex matching the lines output by measure_topology
+"""
+
+HAUSDORFF_PATTERN = re.compile('|'.join([
+    r'(?P<number_points>Sampled (?P<sampled>\d+) pts)',
+    r'(?P<computed>Hausdorff Distance computed)']))
+"""Compiled regex matching the lines output by sampling.hausdorff_distance
+"""
+
+HAUSDORFF_VALUES_PATTERN = re.compile(
+    r"\D+(\d+\.*\d*)\D+(\d+\.*\d*)\D+(\d+\.*\d*)\D+(\d+\.*\d*)")
+
+FILTER_TIME_PATTERN = re.compile(
+    r'Applied filter:?\s+(?P<name>.+?)\s+in\s+(?P<msec>\d+(?:\.\d*)?)\s*(?:msec|ms)\b')
+"""Compiled regex matching the line output after each filter is applied,
+e.g. "Applied filter Compute Geometric Measures in 100 msec"
+"""
+
+MEASURE_FILTERS = {'geometry': 'Compute Geometric Measures',
+                   'topology': 'Compute Topological Measures',
+                   'hausdorff_distance': 'Hausdorff Distance'}
+"""dict: name of the MeshLab filter that produces each type of measurement
+"""
+
+
+def _empty_result(kind):
+    """ Result dict of the given kind (see MEASURE_FILTERS) before any of
+    its values are parsed """
+    if kind == 'geometry':
+        result = {'aabb': {}}
+    elif kind == 'topology':
+        result = {'manifold': True, 'non_manifold_E': 0, 'non_manifold_V': 0}
+    else:
+        result = {'min_distance': 0.0, 'max_distance': 0.0, 'mean_distance': 0.0,
+                  'rms_distance': 0.0, 'number_points': 0}
+    result['filter_num'] = None
+    result['layer_num'] = None
+    return result
+
+
+def first_result(results, kind):
+    """ First of a list of results of a kind (see MEASURE_FILTERS), or an
+    empty result if there are none (e.g. meshlabserver failed) """
+    return results[0] if results else _empty_result(kind)
+
+
+class LogParser(object):
+    """ Single pass, streaming parser for meshlabserver log output.
+
+    Lines are fed one at a time (from an ml_log file or live from
+    meshlabserver's stdout) and every measurement block is recorded, in the
+    order it was output. Each result is a dictionary with the same keys as
+    parse_geometry, parse_topology or parse_hausdorff, plus:
+        filter_num (int): index of the producing filter in
+            FilterScript.filters, or None if not known
+        layer_num (int): mesh layer the filter was applied to, or None if
+            not known
+
+    FilterScript.run_script fills in filter_num and layer_num.
+
+    Args:
+        on_result (function): optional callback, called as
+            on_result(kind, result) as soon as each result is complete.
+            kind is 'geometry', 'topology', 'hausdorff_distance' or
+            'filter_times'.
+
+    Attributes:
+        geometry (list): measure_geometry results
+        topology (list): measure_topology results
+        hausdorff_distance (list): hausdorff_distance results
+        filter_times (list): wall time of every applied filter, as dicts
+            with keys name, msec, filter_num and layer_num
+        line_num (int): number of lines parsed
+        byte_num (int): number of characters parsed
+        seconds (float): time spent parsing, if measured by the caller
+    """
+    def __init__(self, on_result=None):
+        self.on_result = on_result
+        self.reset()
+
+    def reset(self):
+        """ Discard everything parsed so far, e.g. before the output of a
+        retried run """
+        self.geometry = []
+        self.topology = []
+        self.hausdorff_distance = []
+        self.filter_times = []
+        self.line_num = 0
+        self.byte_num = 0
+        self.seconds = 0.0
+        self._block = None  # (kind, dict) of the block being parsed
+        self._rows = None  # (key, rows remaining) of a multi line value
+        self._hausdorff_countdown = None
+
+    def _start(self, kind, key=None):
+        """ Return the current block of this kind, starting a new one when
+        a key repeats (i.e. the filter was run again) """
+        if (self._block is None or self._block[0] != kind or
+                (key is not None and key in self._block[1])):
+            self._finish()
+            self._block = (kind, _empty_result(kind))
+        return self._block[1]
+
+    def _finish(self):
+        """ Finalize and store the current block """
+        if self._block is None:
+            return
+        kind, block = self._block
+        self._block = None
+        if kind == 'geometry':
+            aabb = block['aabb']
+            if 'max' in aabb and 'size' in aabb:
+                aabb['center'] = [aabb['max'][i] - aabb['size'][i] / 2.0 for i in range(3)]
+        self._store(kind, block)
+
+    def _store(self, kind, result):
+        getattr(self, kind).append(result)
+        if self.on_result is not None:
+            self.on_result(kind, result)
+
+    def feed(self, line):
+        """ Parse a single line of log output """
+        self.line_num += 1
+        self.byte_num += len(line)
+        line = LOG_PREFIX_PATTERN.sub('', line)
+        match = FILTER_TIME_PATTERN.search(line)
+        if match is not None:
+            # The filter is done, so any measurement block is complete
+            self._finish()
+            self._store('filter_times', {'name': match.group('name').strip('"\''),
+                                         'msec': float(match.group('msec')),
+                                         'filter_num': None, 'layer_num': None})
+            return
+        if self._rows is not None:
+            key, remaining = self._rows
+            values = [util.to_float(val) for val in NUM_PATTERN.findall(line)[-3:]]
+            block = self._block[1]
+            if key == 'axis_momenta':
+                block[key] = values
+            else:
+                block[key].append(values)
+            self._rows = (key, remaining - 1) if remaining > 1 else None
+            if key == 'axis_momenta':
+                # Last line output by measure_geometry
+                self._finish()
+            return
+        if self._hausdorff_countdown is not None:
+            # The distances are output two lines after 'Hausdorff Distance computed'
+            self._hausdorff_countdown -= 1
+            if self._hausdorff_countdown == 0:
+                self._hausdorff_countdown = None
+                match = HAUSDORFF_VALUES_PATTERN.match(line)
+                if match is not None:
+                    block = self._start('hausdorff_distance')
+                    for index, key in enumerate(('min_distance', 'max_distance',
+                                                 'mean_distance', 'rms_distance')):
+                        block[key] = float(match.group(index + 1))
+                    self._finish()
+                return
+
+        match = GEOMETRY_PATTERN.search(line)
+        if match is not None:
+            self._geometry(match, line)
+            return
+        match = TOPOLOGY_PATTERN.search(line)
+        if match is not None:
+            self._topology(match, line)
+            return
+        match = HAUSDORFF_PATTERN.search(line)
+        if match is not None:
+            if match.lastgroup == 'number_points':
+                block = self._start('hausdorff_distance')
+                block['number_points'] = int(match.group('sampled'))
+            else:
+                self._start('hausdorff_distance')
+                self._hausdorff_countdown = 2
+
+    def _geometry(self, match, line):
+        key = match.lastgroup
+        values = [util.to_float(val) for val in NUM_PATTERN.findall(line[match.end():])]
+        if key.startswith('aabb_'):
+            aabb_key = key[5:]
+            block = self._start('geometry')
+            if aabb_key in block['aabb']:
+                self._finish()
+                block = self._start('geometry')
+            block['aabb'][aabb_key] = values[0] if aabb_key == 'diagonal' else values[:3]
+            return
+        if key == 'volume':
+            block = self._start('geometry', 'volume_mm3')
+            block['volume_mm3'] = values[0]
+            block['volume_cm3'] = block['volume_mm3'] * 0.001
+        elif key == 'area':
+            block = self._start('geometry', 'area_mm2')
+            block['area_mm2'] = values[0]
+            block['area_cm2'] = block['area_mm2'] * 0.01
+        elif key == 'edge_length':
+            name = ('total_edge_length_incl_faux' if 'including faux edges' in line
+                    else 'total_edge_length')
+            block = self._start('geometry', name)
+            block[name] = values[1] if len(values) > 1 else values[0]
+        elif key in ('barycenter', 'vert_barycenter', 'center_of_mass'):
+            block = self._start('geometry', key)
+            block[key] = values[:3]
+        elif key in ('inertia_tensor', 'principal_axes'):
+            block = self._start('geometry', key)
+            block[key] = []
+            self._rows = (key, 3)
+        elif key == 'axis_momenta':
+            self._start('geometry', key)
+            self._rows = (key, 1)
+
+    def _topology(self, match, line):
+        key = match.lastgroup
+        words = line.split()
+        if key == 'vert_edge_face':
+            block = self._start('topology', 'vert_num')
+            vert_edge_face = line.replace('V:', ' ').replace('E:', ' ').replace('F:', ' ').split()
+            vert_edge_face = [val for val in vert_edge_face if val.isdigit()]
+            block['vert_num'] = int(vert_edge_face[0])
+            block['edge_num'] = int(vert_edge_face[1])
+            block['face_num'] = int(vert_edge_face[2])
+        elif key == 'non_manifold':
+            block = self._start('topology')
+            block['manifold'] = False
+        elif key == 'genus':  # undefined or int
+            block = self._start('topology', key)
+            block[key] = words[2]
+            if block[key] != 'undefined':
+                block[key] = int(block[key])
+            if 'non 2-manifold mesh' in line:
+                block['manifold'] = False
+            # Last line output by measure_topology
+            self._finish()
+            return
+        elif key == 'hole_num':
+            block = self._start('topology', key)
+            block[key] = 'undefined' if words[2] == 'a' else int(words[2])
+        else:
+            block = self._start('topology', key)
+            block[key] = int(words[4] if key == 'part_num' else words[2])
+        if 'non 2-manifold mesh' in line:
+            block['manifold'] = False
+
+    def close(self):
+        """ Finish parsing; call after the last line has been fed """
+        self._finish()
+        return self
+
+
+def parse_log(ml_log):
+    """Parse all measurement results in a meshlabserver log file.
+
+    The file is streamed line by line, so it is never loaded into memory.
+
+    Args:
+        ml_log (str): MeshLab log file to parse
+
+    Returns:
+        LogParser: parser with lists of all geometry, topology and
+            hausdorff_distance results found in the log
+    """
+    start = time.perf_counter()
+    parser = LogParser()
+    with open(ml_log) as fread:
+        for line in fread:
+            parser.feed(line)
+    parser.seconds = time.perf_counter() - start
+    return parser.close()
+
+
+def print_results(results, log=None, print_output=False, width=27):
+    """Write measurement results to a log file or stdout.
+
+    Args:
+        results (dict or list): result dictionary or list of dictionaries
+        log (str): filename to log output
+        print_output (bool): print to stdout if log is None
+        width (int): width of the key column
+    """
+    if isinstance(results, dict):
+        results = [results]
+    if log is not None:
+        log_file = open(log, 'a')
+    for result in results:
+        for key, value in result.items():
+            if key in ('filter_num', 'layer_num'):
+                continue
+            if log is not None:
+                log_file.write('{:{width}} = {}\n'.format(key, value, width=width))
+            elif print_output:
+                print('{:{width}} = {}'.format(key, value, width=width))
+    if log is not None:
+        log_file.close()
+
+
+def profile_report(filter_times):
+    """Rank filter wall times, slowest first.
+
+    Args:
+        filter_times (list): filter time dicts, as found in
+            LogParser.filter_times or FilterScript.filter_times
+
+    Returns:
+        list: one dict per filter, with keys filter_num, layer_num, name,
+            msec and percent (of the total time of all filters)
+    """
+    total = sum(entry['msec'] for entry in filter_times)
+    report = []
+    for entry in filter_times:
+        report.append({'filter_num': entry['filter_num'],
+                       'layer_num': entry['layer_num'],
+                       'name': entry['name'],
+                       'msec': entry['msec'],
+                       'percent': 100.0 * entry['msec'] / total if total else 0.0})
+    report.sort(key=lambda entry: entry['msec'], reverse=True)
+    return report
+
+
+def aggregate_profiles(reports):
+    """Aggregate the profiles of many runs of the same script.
+
+    Filters are matched between runs by filter_num (or by name if
+    filter_num is not known).
+
+    Args:
+        reports (list): list of profile reports (see profile_report) or
+            lists of filter times
+
+    Returns:
+        list: one dict per filter, slowest (total time) first, with keys
+            filter_num, layer_num, name, runs, msec (total), mean_msec,
+            min_msec, max_msec and percent
+    """
+    totals = {}
+    for report in reports:
+        for entry in report:
+            key = entry['filter_num'] if entry['filter_num'] is not None else entry['name']
+            if key not in totals:
+                totals[key] = {'filter_num': entry['filter_num'],
+                               'layer_num': entry['layer_num'],
+                               'name': entry['name'],
+                               'runs': 0, 'msec': 0.0,
+                               'min_msec': entry['msec'], 'max_msec': entry['msec']}
+            total = totals[key]
+            total['runs'] += 1
+            total['msec'] += entry['msec']
+            total['min_msec'] = min(total['min_msec'], entry['msec'])
+            total['max_msec'] = max(total['max_msec'], entry['msec'])
+    grand_total = sum(total['msec'] for total in totals.values())
+    report = list(totals.values())
+    for total in report:
+        total['mean_msec'] = total['msec'] / total['runs']
+        total['percent'] = 100.0 * total['msec'] / grand_total if grand_total else 0.0
+    report.sort(key=lambda total: total['msec'], reverse=True)
+    return report
+
+
+def print_profile(report, log=None, print_output=True):
+    """Write a profile report (see profile_report or aggregate_profiles)
+    to a log file or stdout as a table.
+
+    Args:
+        report (list): profile report
+        log (str): filename to log output
+        print_output (bool): print to stdout if log is None
+    """
+    lines = ['{:>4} {:>6} {:>5} {:>12} {:>6}  {}'.format(
+        'rank', 'filter', 'layer', 'msec', '%', 'name')]
+    for rank, entry in enumerate(report):
+        lines.append('{:>4} {:>6} {:>5} {:>12.1f} {:>6.1f}  {}'.format(
+            rank + 1, str(entry['filter_num']), str(entry['layer_num']),
+            entry['msec'], entry['percent'], entry['name']))
+        if 'runs' in entry:
+            lines[-1] += ' (%d runs, mean %.1f, min %.1f, max %.1f msec)' % (
+                entry['runs'], entry['mean_msec'], entry['min_msec'], entry['max_msec'])
+        if entry.get('max_rss_bytes') is not None:
+            lines[-1] += ' (peak RSS %.1f MB%s)' % (entry['max_rss_bytes'] / 1048576.0,
+                                                   ', cached' if entry.get('cached') else '')
+    if log is not None:
+        log_file = open(log, 'a')
+        log_file.write('\n'.join(lines) + '\n')
+        log_file.close()
+    elif print_output:
+        print('\n'.join(lines))
+
+
 def parse_geometry(ml_log, log=None, ml_version='2016.12', print_output=False):
     """Parse the ml_log file generated by the measure_geometry function.
 
@@ -197,76 +621,16 @@ def parse_geometry(ml_log, log=None, ml_version='2016.12', print_output=False):
     Args:
         ml_log (str): MeshLab log file to parse
         log (str): filename to log output
+        ml_version (str): ignored; the surface area line of both MeshLab
+            versions is recognized
+
+    Returns:
+        dict: the first geometry result in the log. Use parse_log to get all
+            results. If the log has no geometry output only the empty
+            'aabb', 'filter_num' and 'layer_num' keys exist.
     """
-    # TODO: read more than one occurrence per file. Record in list.
-    aabb = {}
-    geometry = {'aabb':aabb}
-    with open(ml_log) as fread:
-        for line in fread:
-            if 'Mesh Bounding Box min' in line: #2016.12
-                geometry['aabb']['min'] = (line.split()[4:7])
-                geometry['aabb']['min'] = [util.to_float(val) for val in geometry['aabb']['min']]
-            if 'Mesh Bounding Box max' in line: #2016.12
-                geometry['aabb']['max'] = (line.split()[4:7])
-                geometry['aabb']['max'] = [util.to_float(val) for val in geometry['aabb']['max']]
-            if 'Mesh Bounding Box Size' in line: #2016.12
-                geometry['aabb']['size'] = (line.split()[4:7])
-                geometry['aabb']['size'] = [util.to_float(val) for val in geometry['aabb']['size']]
-            if 'Mesh Bounding Box Diag' in line: #2016.12
-                geometry['aabb']['diagonal'] = util.to_float(line.split()[4])
-            if 'Mesh Volume' in line:
-                geometry['volume_mm3'] = util.to_float(line.split()[3])
-                geometry['volume_cm3'] = geometry['volume_mm3'] * 0.001
-            if 'Mesh Surface' in line:
-                if ml_version == '1.3.4BETA':
-                    geometry['area_mm2'] = util.to_float(line.split()[3])
-                else:
-                    geometry['area_mm2'] = util.to_float(line.split()[4])
-                geometry['area_cm2'] = geometry['area_mm2'] * 0.01
-            if 'Mesh Total Len of' in line:
-                if 'including faux edges' in line:
-                    geometry['total_edge_length_incl_faux'] = util.to_float(
-                        line.split()[7])
-                else:
-                    geometry['total_edge_length'] = util.to_float(
-                        line.split()[7])
-            if 'Thin shell barycenter' in line:
-                geometry['barycenter'] = (line.split()[3:6])
-                geometry['barycenter'] = [util.to_float(val) for val in geometry['barycenter']]
-            if 'Thin shell (faces) barycenter' in line: #2016.12
-                geometry['barycenter'] = (line.split()[4:7])
-                geometry['barycenter'] = [util.to_float(val) for val in geometry['barycenter']]
-            if 'Vertices barycenter' in line: #2016.12
-                geometry['vert_barycenter'] = (line.split()[2:5])
-                geometry['vert_barycenter'] = [util.to_float(val) for val in geometry['vert_barycenter']]
-            if 'Center of Mass' in line:
-                geometry['center_of_mass'] = (line.split()[4:7])
-                geometry['center_of_mass'] = [util.to_float(val) for val in geometry['center_of_mass']]
-            if 'Inertia Tensor' in line:
-                geometry['inertia_tensor'] = []
-                for val in range(3):
-                    row = (next(fread, val).split()[1:4])
-                    row = [util.to_float(b) for b in row]
-                    geometry['inertia_tensor'].append(row)
-            if 'Principal axes' in line:
-                geometry['principal_axes'] = []
-                for val in range(3):
-                    row = (next(fread, val).split()[1:4])
-                    row = [util.to_float(b) for b in row]
-                    geometry['principal_axes'].append(row)
-            if 'axis momenta' in line:
-                geometry['axis_momenta'] = (next(fread).split()[1:4])
-                geometry['axis_momenta'] = [util.to_float(val) for val in geometry['axis_momenta']]
-                break  # stop after we find the first match
-    geometry['aabb']['center'] = [geometry['aabb']['max'][0] - geometry['aabb']['size'][0]/2.0, geometry['aabb']['max'][1] - geometry['aabb']['size'][1]/2, geometry['aabb']['max'][2] - geometry['aabb']['size'][2]/2]
-
-    for key, value in geometry.items():
-        if log is not None:
-            log_file = open(log, 'a')
-            log_file.write('{:27} = {}\n'.format(key, value))
-            log_file.close()
-        elif print_output:
-            print('{:27} = {}'.format(key, value))
+    geometry = first_result(parse_log(ml_log).geometry, 'geometry')
+    print_results(geometry, log, print_output, width=27)
     return geometry
 
 
@@ -276,9 +640,14 @@ def parse_topology(ml_log, log=None, ml_version='1.3.4BETA', print_output=False)
     Args:
         ml_log (str): MeshLab log file to parse
         log (str): filename to log output
+        ml_version (str): ignored; the output of both MeshLab versions is
+            recognized
 
     Returns:
-        dict: dictionary with the following keys:
+        dict: the first topology result in the log (use parse_log to get all
+            results), with the following keys if they were output (only
+            manifold, non_manifold_E and non_manifold_V if the log has no
+            topology output):
             vert_num (int): number of vertices
             edge_num (int): number of edges
             face_num (int): number of faces
@@ -294,44 +663,8 @@ def parse_topology(ml_log, log=None, ml_version='1.3.4BETA', print_output=False)
                 or 'undefined' if the mesh is non-manifold.
 
     """
-    topology = {'manifold': True, 'non_manifold_E': 0, 'non_manifold_V': 0}
-    with open(ml_log) as fread:
-        for line in fread:
-            if 'V:' in line:
-                vert_edge_face = line.replace('V:', ' ').replace('E:', ' ').replace('F:', ' ').split()
-                topology['vert_num'] = int(vert_edge_face[0])
-                topology['edge_num'] = int(vert_edge_face[1])
-                topology['face_num'] = int(vert_edge_face[2])
-            if 'Unreferenced Vertices' in line:
-                topology['unref_vert_num'] = int(line.split()[2])
-            if 'Boundary Edges' in line:
-                topology['boundry_edge_num'] = int(line.split()[2])
-            if 'Mesh is composed by' in line:
-                topology['part_num'] = int(line.split()[4])
-            if 'non 2-manifold mesh' in line:
-                topology['manifold'] = False
-            if 'non two manifold edges' in line:
-                topology['non_manifold_edge'] = int(line.split()[2])
-            if 'non two manifold vertexes' in line:
-                topology['non_manifold_vert'] = int(line.split()[2])
-            if 'Genus is' in line:  # undefined or int
-                topology['genus'] = line.split()[2]
-                if topology['genus'] != 'undefined':
-                    topology['genus'] = int(topology['genus'])
-            if 'Mesh has' in line and 'holes' in line: # previously just searched on 'holes' but this collided with filenames
-                topology['hole_num'] = line.split()[2]
-                if topology['hole_num'] == 'a':
-                    topology['hole_num'] = 'undefined'
-                else:
-                    topology['hole_num'] = int(topology['hole_num'])
-    for key, value in topology.items():
-        if log is not None:
-            log_file = open(log, 'a')
-            log_file.write('{:16} = {}\n'.format(key, value))
-            log_file.close()
-        elif print_output:
-            print('{:16} = {}'.format(key, value))
-
+    topology = first_result(parse_log(ml_log).topology, 'topology')
+    print_results(topology, log, print_output, width=16)
     return topology
 
 
@@ -343,7 +676,9 @@ def parse_hausdorff(ml_log, log=None, print_output=False):
         log (str): filename to log output
 
     Returns:
-        dict: dictionary with the following keys:
+        dict: the first hausdorff_distance result in the log (use parse_log
+            to get all results), with the following keys (all zero if the
+            log has no hausdorff_distance output):
             number_points (int): number of points in mesh
             min_distance (float): minimum hausdorff distance
             max_distance (float): maximum hausdorff distance
@@ -351,32 +686,6 @@ def parse_hausdorff(ml_log, log=None, print_output=False):
             rms_distance (float): root mean square distance
 
     """
-    hausdorff_distance = {"min_distance": 0.0,
-                          "max_distance": 0.0,
-                          "mean_distance": 0.0,
-                          "rms_distance": 0.0,
-                          "number_points": 0}
-    with open(ml_log) as fread:
-        result = fread.readlines()
-        data = ""
-
-        for idx, line in enumerate(result):
-            m = re.match(r"\s*Sampled (\d+) pts.*", line)
-            if m is not None:
-                hausdorff_distance["number_points"] = int(m.group(1))
-            if 'Hausdorff Distance computed' in line:
-                data = result[idx + 2]
-
-        m = re.match(r"\D+(\d+\.*\d*)\D+(\d+\.*\d*)\D+(\d+\.*\d*)\D+(\d+\.*\d*)", data)
-        hausdorff_distance["min_distance"] = float(m.group(1))
-        hausdorff_distance["max_distance"] = float(m.group(2))
-        hausdorff_distance["mean_distance"] = float(m.group(3))
-        hausdorff_distance["rms_distance"] = float(m.group(4))
-        for key, value in hausdorff_distance.items():
-            if log is not None:
-                log_file = open(log, 'a')
-                log_file.write('{:16} = {}\n'.format(key, value))
-                log_file.close()
-            elif print_output:
-                print('{:16} = {}'.format(key, value))
-        return hausdorff_distance
+    hausdorff_distance = first_result(parse_log(ml_log).hausdorff_distance, 'hausdorff_distance')
+    print_results(hausdorff_distance, log, print_output, width=16)
+    return hausdorff_distance
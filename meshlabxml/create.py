@@ -519,11 +519,6 @@ def plane_hires_edges(script, size=1.0, x_segments=1, y_segments=1,
 
     grid(script, size=[x_segments + y_segments - 1, 1],
          x_segments=(x_segments + y_segments - 1), y_segments=1)
-    if ml_script1.ml_version == '1.3.4BETA':
-        and_val = 'and'
-    else:
-        and_val = '&&'
-
     if script.ml_version == '1.3.4BETA': # muparser version: 1.3.2
         # Deform left side
         transform.vert_function(
@@ -593,9 +588,11 @@ def cube_hires(script, size=1.0, x_segments=1, y_segments=1, z_segments=1,
 
     Grid spacing is the same as its dimensions (spacing = 1) and its
     thickness is one. Intended to be used for e.g. deforming using functions
-    or a height map (lithopanes) and can be resized after creation.
+    or a height map (lithopanes) and can be resized after creation. To
+    create a lithophane directly from an image see primitives.heightmap.
 
-    Warnings: function uses layers.join
+    Warnings: function uses layers.join. For large meshes use
+    primitives.cube_hires, which generates the mesh natively.
 
     top_option
         0 open
@@ -653,6 +650,7 @@ def annulus_hires(script, radius=None, radius1=None, radius2=None,
                   cir_segments=48, rad_segments=1, color=None):
     """Create a cylinder with user defined number of segments
 
+    See primitives.annulus_hires for a native version.
     """
     if radius is not None and diameter is None:
         if radius1 is None and diameter1 is None:
@@ -691,6 +689,7 @@ def tube_hires(script, height=1.0, radius=None, radius1=None, radius2=None,
                simple_bottom=False, color=None):
     """Create a cylinder with user defined number of segments
 
+    See primitives.tube_hires for a native version.
     """
 
     # TODO: add option to round the top of the cylinder, i.e. deform spherically
@@ -0,0 +1,452 @@
+""" MeshLabXML native Hausdorff distance
+
+NumPy version of sampling.hausdorff_distance, for comparing meshes
+without a meshlabserver run and log parsing. Samples are taken from the
+vertices, edges and faces of one mesh as by MeshLab's Hausdorff Distance
+filter, and the closest point on the other mesh is found for each one
+with a uniform grid index of its triangles (with coarser levels for
+points far from the mesh):
+
+    result = distance.hausdorff_distance('scan.ply', 'reference.ply',
+                                         sample_num=100000, maxdist=1.0)
+    if result['max_distance'] > tolerance:
+        ...
+
+Samples are random (seeded), so results agree with MeshLab's
+statistically rather than exactly.
+
+Requires NumPy.
+"""
+
+import math
+
+import numpy as np
+
+from . import mesh_io
+
+BATCH_POINTS = 4096
+"""int: number of query points searched at once; bounds memory use
+"""
+
+NEIGHBOURS = np.array([(x, y, z) for x in (-1, 0, 1) for y in (-1, 0, 1) for z in (-1, 0, 1)
+                       if x or y or z])
+"""array: offsets of the 26 neighbours of a cell
+"""
+
+OCTANTS = np.array([(x, y, z) for x in (0, 1) for y in (0, 1) for z in (0, 1)])
+"""array: offsets of the child cells of a cell in the next finer level
+"""
+
+
+def closest_points_on_triangles(points, vert_a, vert_b, vert_c):
+    """ Closest point on each triangle (a, b, c) to each point.
+
+    All arguments are (N, 3) arrays, one row per point and triangle pair.
+    Degenerate triangles (including points, a = b = c) are supported.
+
+    Returns:
+        (N, 3) array of closest points
+    """
+    edge_ab, edge_ac = vert_b - vert_a, vert_c - vert_a
+    with np.errstate(all='ignore'):
+        d_1 = np.einsum('ij,ij->i', edge_ab, points - vert_a)
+        d_2 = np.einsum('ij,ij->i', edge_ac, points - vert_a)
+        d_3 = np.einsum('ij,ij->i', edge_ab, points - vert_b)
+        d_4 = np.einsum('ij,ij->i', edge_ac, points - vert_b)
+        d_5 = np.einsum('ij,ij->i', edge_ab, points - vert_c)
+        d_6 = np.einsum('ij,ij->i', edge_ac, points - vert_c)
+        v_a = d_3 * d_6 - d_5 * d_4
+        v_b = d_5 * d_2 - d_1 * d_6
+        v_c = d_1 * d_4 - d_3 * d_2
+        denom = v_a + v_b + v_c
+        # Voronoi regions of the triangle, checked from the lowest priority
+        # (interior) to the highest (vertex a), as in Ericson's
+        # Real-Time Collision Detection 5.1.5
+        closest = (vert_a + edge_ab * (v_b / denom)[:, None] +
+                   edge_ac * (v_c / denom)[:, None])
+        regions = [
+            ((v_a <= 0) & (d_4 - d_3 >= 0) & (d_5 - d_6 >= 0),
+             lambda: vert_b + (vert_c - vert_b) *
+             ((d_4 - d_3) / ((d_4 - d_3) + (d_5 - d_6)))[:, None]),
+            ((v_b <= 0) & (d_2 >= 0) & (d_6 <= 0),
+             lambda: vert_a + edge_ac * (d_2 / (d_2 - d_6))[:, None]),
+            ((d_6 >= 0) & (d_5 <= d_6), lambda: vert_c),
+            ((v_c <= 0) & (d_1 >= 0) & (d_3 <= 0),
+             lambda: vert_a + edge_ab * (d_1 / (d_1 - d_3))[:, None]),
+            ((d_3 >= 0) & (d_4 <= d_3), lambda: vert_b),
+            ((d_1 <= 0) & (d_2 <= 0), lambda: vert_a)]
+        for mask, region_point in regions:
+            closest = np.where(mask[:, None], region_point(), closest)
+    # Degenerate edge cases that divided by zero: fall back to the nearest
+    # corner
+    bad = ~np.isfinite(closest).all(axis=1)
+    if bad.any():
+        corners = np.stack([vert_a[bad], vert_b[bad], vert_c[bad]], axis=1)
+        nearest = np.argmin(((corners - points[bad][:, None]) ** 2).sum(axis=2), axis=1)
+        closest[bad] = corners[np.arange(len(corners)), nearest]
+    return closest
+
+
+class TriangleGrid(object):
+    """ Uniform grid index of the triangles of a mesh for closest point
+    queries.
+
+    Each triangle is stored in every cell its bounding box overlaps. Cells
+    are kept sparse (sorted cell keys), so the grid size only depends on
+    the mesh surface. A mesh without faces is indexed as points.
+
+    Coarser levels, each halving the grid, record which of their cells
+    are occupied and a representative triangle of each, so queries descend
+    from one cell covering the whole mesh and only visit occupied cells
+    near the closest point found so far, however far a query point is
+    from the mesh.
+
+    Args:
+        vertices (array): (N, 3) vertex coordinates
+        faces (array): (M, 3) triangle vertex indices
+        cell_size (float): grid spacing; by default the mean triangle size
+    """
+    def __init__(self, vertices, faces, cell_size=None):
+        vertices = np.asarray(vertices, dtype=np.float64)
+        faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        if not len(faces):
+            faces = np.repeat(np.arange(len(vertices))[:, None], 3, axis=1)
+        self.vertices = vertices
+        self.faces = faces
+        corners = vertices[faces]
+        tri_min, tri_max = corners.min(axis=1), corners.max(axis=1)
+        self.tri_min, self.tri_max = tri_min, tri_max
+        self.origin = tri_min.min(axis=0)
+        extent = np.maximum(tri_max.max(axis=0) - self.origin, 1e-12)
+        if cell_size is None:
+            cell_size = float(np.mean((tri_max - tri_min).max(axis=1)))
+            # Points and tiny triangles: about 4 per cell on a surface
+            cell_size = max(cell_size, float(extent.max()) * 2.0 / math.sqrt(len(faces)),
+                            float(extent.max()) * 1e-6)
+        while True:
+            self.cell_size = cell_size
+            self.dims = np.floor(extent / cell_size).astype(np.int64) + 1
+            cell_min = self._cells(tri_min)
+            cell_max = self._cells(tri_max)
+            spans = cell_max - cell_min + 1
+            counts = spans.prod(axis=1)
+            if counts.sum() <= 16 * len(faces) + 1024:
+                break
+            # Large triangles span too many cells
+            cell_size *= 1.5
+        # Expand each triangle to the cells its bounding box overlaps
+        tri_ids = np.repeat(np.arange(len(faces)), counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        span = spans[tri_ids]
+        offsets = np.stack([local // (span[:, 1] * span[:, 2]),
+                            (local // span[:, 2]) % span[:, 1],
+                            local % span[:, 2]], axis=1)
+        cells = cell_min[tri_ids] + offsets
+        keys = _keys(cells, self.dims)
+        order = np.argsort(keys, kind='stable')
+        self.keys, first = np.unique(keys[order], return_index=True)
+        self.starts = first
+        self.ends = np.append(self.starts[1:], len(order))
+        self.tri_ids = tri_ids[order]
+        # Levels as (dims, sorted keys, cell coordinates, representative
+        # triangle), from the finest to a single cell
+        cells = cells[order][first]
+        reps = self.tri_ids[self.starts]
+        dims = self.dims
+        self.levels = [(dims, self.keys, cells, reps)]
+        while dims.max() > 1:
+            cells, dims = cells // 2, (dims + 1) // 2
+            keys, first = np.unique(_keys(cells, dims), return_index=True)
+            cells, reps = cells[first], reps[first]
+            self.levels.append((dims, keys, cells, reps))
+
+    def _cells(self, points):
+        """ Cell coordinates of points, clamped to the grid """
+        cells = np.floor((points - self.origin) / self.cell_size).astype(np.int64)
+        return np.clip(cells, 0, self.dims - 1)
+
+    def query(self, points, maxdist=None):
+        """ Closest point on the mesh to each point.
+
+        The cell of each point and its neighbours are searched first,
+        which settles points near the mesh. The others are bounded by the
+        triangles of a cell reached by following the nearest occupied cell
+        down the levels, then the levels are searched from the coarsest
+        down, skipping cells farther than the closest point found so far.
+        The result is exact.
+
+        Args:
+            points (array): (N, 3) query points
+            maxdist (float): points farther than this from the mesh are not
+                matched; None for no limit
+
+        Returns:
+            distances (array): (N,) distances; inf for unmatched points
+            closest (array): (N, 3) closest points; nan for unmatched points
+            face_ids (array): (N,) index of the closest face (or vertex, for
+                a mesh without faces); -1 for unmatched points
+        """
+        points = np.asarray(points, dtype=np.float64).reshape(-1, 3)
+        distances = np.full(len(points), np.inf)
+        closest = np.full((len(points), 3), np.nan)
+        face_ids = np.full(len(points), -1, dtype=np.int64)
+        limit = np.inf if maxdist is None else float(maxdist)
+        for start in range(0, len(points), BATCH_POINTS):
+            batch = slice(start, start + BATCH_POINTS)
+            pending = self._neighbours(points[batch], limit, distances[batch],
+                                       closest[batch], face_ids[batch])
+            if len(pending):
+                pending += start
+                found = (distances[pending], closest[pending], face_ids[pending])
+                self._descend(points[pending], limit, *found)
+                distances[pending], closest[pending], face_ids[pending] = found
+        reject = distances > limit
+        distances[reject] = np.inf
+        closest[reject] = np.nan
+        face_ids[reject] = -1
+        return distances, closest, face_ids
+
+    def _neighbours(self, points, limit, distances, closest, face_ids):
+        """ Search the cell of each point, then its neighbours; returns the
+        points that may have a closer triangle outside these cells """
+        cells = self._cells(points)
+        pending = np.arange(len(points))
+        for ring, shell in enumerate((np.zeros((1, 3), dtype=np.int64), NEIGHBOURS)):
+            candidates = (cells[pending][:, None, :] + shell[None]).reshape(-1, 3)
+            inside = ((candidates >= 0) & (candidates < self.dims)).all(axis=1)
+            point_idx = np.repeat(pending, len(shell))[inside]
+            wanted = _keys(candidates[inside], self.dims)
+            slots = np.minimum(np.searchsorted(self.keys, wanted), len(self.keys) - 1)
+            found = self.keys[slots] == wanted
+            self._update_cells(points, point_idx[found], slots[found], distances, closest,
+                               face_ids)
+            # Distance to the unsearched part of the grid
+            low = self.origin + (cells[pending] - ring) * self.cell_size
+            high = self.origin + (cells[pending] + ring + 1) * self.cell_size
+            gaps = np.concatenate([
+                np.where(cells[pending] - ring > 0, points[pending] - low, np.inf),
+                np.where(cells[pending] + ring < self.dims - 1, high - points[pending],
+                         np.inf)], axis=1)
+            bound = gaps.min(axis=1)
+            pending = pending[(distances[pending] > bound) & (bound <= limit)]
+        return pending
+
+    def _descend(self, points, limit, distances, closest, face_ids):
+        """ Search the levels from the coarsest down for a batch of points;
+        distances, closest and face_ids are updated in place """
+        self._update_cells(points, np.arange(len(points)), self._greedy(points),
+                           distances, closest, face_ids)
+        point_idx = np.repeat(np.arange(len(points)), len(self.levels[-1][1]))
+        slots = np.tile(np.arange(len(self.levels[-1][1])), len(points))
+        for level in range(len(self.levels) - 1, -1, -1):
+            dims, keys, cells, reps = self.levels[level]
+            size = self.cell_size * 2 ** level
+            low = self.origin + cells[slots] * size
+            gap = (np.maximum(low - points[point_idx], 0) +
+                   np.maximum(points[point_idx] - low - size, 0))
+            cell_dist = np.einsum('ij,ij->i', gap, gap)
+            # Bound each point by a triangle of its nearest cell
+            nearest = _group_min(point_idx, cell_dist)
+            self._update(points, point_idx[nearest], reps[slots[nearest]],
+                         distances, closest, face_ids)
+            near = cell_dist <= np.minimum(distances, limit)[point_idx] ** 2
+            point_idx, slots, cell_dist = point_idx[near], slots[near], cell_dist[near]
+            if level == 0:
+                break
+            point_idx, slots = self._children(level, point_idx, slots)
+        # The nearest cell of each point first, for a tight bound on the rest
+        nearest = np.zeros(len(point_idx), dtype=bool)
+        nearest[_group_min(point_idx, cell_dist)] = True
+        for search in (nearest, ~nearest):
+            search &= cell_dist <= distances[point_idx] ** 2
+            self._update_cells(points, point_idx[search], slots[search], distances, closest,
+                               face_ids)
+
+    def _children(self, level, point_idx, slots):
+        """ (point, slot) pairs of the occupied children of cells of a
+        level """
+        cells = self.levels[level][2]
+        child_dims, child_keys = self.levels[level - 1][:2]
+        children = (2 * cells[slots][:, None, :] + OCTANTS[None]).reshape(-1, 3)
+        point_idx = np.repeat(point_idx, len(OCTANTS))
+        inside = (children < child_dims).all(axis=1)
+        children, point_idx = children[inside], point_idx[inside]
+        wanted = _keys(children, child_dims)
+        slots = np.minimum(np.searchsorted(child_keys, wanted), len(child_keys) - 1)
+        found = child_keys[slots] == wanted
+        return point_idx[found], slots[found]
+
+    def _greedy(self, points):
+        """ Finest cell reached by following the nearest occupied child from
+        the coarsest level, for each point """
+        slots = np.zeros(len(points), dtype=np.int64)
+        for level in range(len(self.levels) - 1, 0, -1):
+            point_idx, child_slots = self._children(level, np.arange(len(points)), slots)
+            size = self.cell_size * 2 ** (level - 1)
+            low = self.origin + self.levels[level - 1][2][child_slots] * size
+            gap = (np.maximum(low - points[point_idx], 0) +
+                   np.maximum(points[point_idx] - low - size, 0))
+            slots = child_slots[_group_min(point_idx, np.einsum('ij,ij->i', gap, gap))]
+        return slots
+
+    def _update_cells(self, points, point_idx, slots, distances, closest, face_ids):
+        """ Update points with all triangles of finest cells (slots) """
+        counts = self.ends[slots] - self.starts[slots]
+        pair_points = np.repeat(point_idx, counts)
+        local = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        pair_tris = self.tri_ids[np.repeat(self.starts[slots], counts) + local]
+        self._update(points, pair_points, pair_tris, distances, closest, face_ids)
+
+    def _update(self, points, pair_points, pair_tris, distances, closest, face_ids):
+        """ Keep the nearest of the candidate triangles of each point """
+        # Skip triangles whose bounding box is farther than the closest
+        # point found so far
+        pair_pos = points[pair_points]
+        gap = (np.maximum(self.tri_min[pair_tris] - pair_pos, 0) +
+               np.maximum(pair_pos - self.tri_max[pair_tris], 0))
+        near = np.einsum('ij,ij->i', gap, gap) <= distances[pair_points] ** 2
+        pair_points, pair_tris = pair_points[near], pair_tris[near]
+        if not len(pair_tris):
+            return
+        # A triangle is stored in every cell its bounding box overlaps
+        pair_keys = np.unique(pair_points * len(self.faces) + pair_tris)
+        pair_points, pair_tris = pair_keys // len(self.faces), pair_keys % len(self.faces)
+        pair_pos = points[pair_points]
+        tris = self.faces[pair_tris]
+        pair_closest = closest_points_on_triangles(
+            pair_pos, self.vertices[tris[:, 0]], self.vertices[tris[:, 1]],
+            self.vertices[tris[:, 2]])
+        pair_dist = np.linalg.norm(pair_closest - pair_pos, axis=1)
+        best = _group_min(pair_points, pair_dist)
+        best = best[pair_dist[best] < distances[pair_points[best]]]
+        distances[pair_points[best]] = pair_dist[best]
+        closest[pair_points[best]] = pair_closest[best]
+        face_ids[pair_points[best]] = pair_tris[best]
+
+
+def _group_min(groups, values):
+    """ Index of the smallest value in each run of equal groups (sorted
+    point indices) """
+    if not len(groups):
+        return np.zeros(0, dtype=np.int64)
+    starts = np.flatnonzero(np.concatenate(([True], groups[1:] != groups[:-1])))
+    minima = np.minimum.reduceat(values, starts)
+    is_min = np.flatnonzero(values == np.repeat(minima, np.diff(np.append(starts, len(groups)))))
+    return is_min[np.concatenate(([True], groups[is_min][1:] != groups[is_min][:-1]))]
+
+
+def _keys(cells, dims):
+    """ Sort keys of cell coordinates in a grid of dims cells """
+    return (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+
+
+def sample_vertices(vertices, sample_num, rng):
+    """ All vertices, or sample_num of them chosen at random if there are
+    more """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if sample_num >= len(vertices):
+        return vertices.copy()
+    return vertices[rng.choice(len(vertices), sample_num, replace=False)]
+
+
+def sample_edges(vertices, faces, sample_num):
+    """ About sample_num points evenly spaced along the unique edges """
+    from . import geometry
+
+    vertices = np.asarray(vertices, dtype=np.float64)
+    if not len(faces) or sample_num <= 0:
+        return np.zeros((0, 3))
+    edges = geometry.mesh_edges(faces)[0]
+    starts, ends = vertices[edges[:, 0]], vertices[edges[:, 1]]
+    lengths = np.linalg.norm(ends - starts, axis=1)
+    cumulative = np.cumsum(lengths)
+    if cumulative[-1] <= 0:
+        return np.zeros((0, 3))
+    positions = (np.arange(sample_num) + 0.5) * (cumulative[-1] / sample_num)
+    edge_num = np.minimum(np.searchsorted(cumulative, positions, side='right'), len(edges) - 1)
+    along = (positions - (cumulative[edge_num] - lengths[edge_num])) / np.where(
+        lengths[edge_num] > 0, lengths[edge_num], 1.0)
+    return starts[edge_num] + (ends[edge_num] - starts[edge_num]) * along[:, None]
+
+
+def sample_faces(vertices, faces, sample_num, rng):
+    """ sample_num points uniformly distributed over the surface
+    (Montecarlo sampling) """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if not len(faces) or sample_num <= 0:
+        return np.zeros((0, 3))
+    corners = vertices[faces]
+    areas = np.linalg.norm(np.cross(corners[:, 1] - corners[:, 0],
+                                    corners[:, 2] - corners[:, 0]), axis=1)
+    if areas.sum() <= 0:
+        return np.zeros((0, 3))
+    face_num = rng.choice(len(faces), sample_num, p=areas / areas.sum())
+    u_val, v_val = rng.random(sample_num), rng.random(sample_num)
+    flip = u_val + v_val > 1
+    u_val[flip], v_val[flip] = 1 - u_val[flip], 1 - v_val[flip]
+    corners = corners[face_num]
+    return (corners[:, 0] + (corners[:, 1] - corners[:, 0]) * u_val[:, None] +
+            (corners[:, 2] - corners[:, 0]) * v_val[:, None])
+
+
+def sample_mesh(vertices, faces, sample_vert=True, sample_edge=True, sample_face=True,
+                sample_num=1000, seed=0):
+    """ Hausdorff samples of a mesh: each enabled kind (vertices, edges,
+    faces) contributes about sample_num samples, as in MeshLab """
+    rng = np.random.default_rng(seed)
+    samples = [np.zeros((0, 3))]
+    if sample_vert:
+        samples.append(sample_vertices(vertices, sample_num, rng))
+    if sample_edge:
+        samples.append(sample_edges(vertices, faces, sample_num))
+    if sample_face:
+        samples.append(sample_faces(vertices, faces, sample_num, rng))
+    return np.concatenate(samples)
+
+
+def _mesh(mesh):
+    if isinstance(mesh, str):
+        return mesh_io.read_mesh(mesh)
+    return mesh
+
+
+def hausdorff_distance(sampled, target, sample_vert=True, sample_edge=True,
+                       sample_faux_edge=False, sample_face=True, sample_num=1000,
+                       maxdist=10, seed=0, return_samples=False):
+    """ Native sampling.hausdorff_distance.
+
+    Args:
+        sampled: the mesh whose surface is sampled, as a filename or a
+            (vertices, faces) tuple
+        target: the mesh searched for the closest point to each sample
+        sample_vert, sample_edge, sample_face (bool): take samples from
+            the vertices, edges and faces; see sampling.hausdorff_distance
+        sample_faux_edge (bool): ignored; natively read meshes have no
+            faux (polygon internal) edges, so all edges are sampled
+        sample_num (int): number of samples of each kind
+        maxdist (float): samples farther than this from the target are
+            rejected; None for no limit
+        seed (int): random seed for the vertex and face samples
+        return_samples (bool): also return the per sample arrays
+
+    Returns:
+        dict: number_points, min_distance, max_distance, mean_distance and
+            rms_distance, as compute.parse_hausdorff. If return_samples is
+            True, also samples, closest (closest points on target) and
+            distances, (N, 3) and (N,) arrays that include rejected
+            samples (distance inf).
+    """
+    sampled_vertices, sampled_faces = _mesh(sampled)
+    samples = sample_mesh(sampled_vertices, sampled_faces, sample_vert, sample_edge,
+                          sample_face, sample_num, seed)
+    distances, closest, _ = TriangleGrid(*_mesh(target)).query(samples, maxdist)
+    found = distances[np.isfinite(distances)]
+    result = {'number_points': int(len(found)),
+              'min_distance': float(found.min()) if len(found) else 0.0,
+              'max_distance': float(found.max()) if len(found) else 0.0,
+              'mean_distance': float(found.mean()) if len(found) else 0.0,
+              'rms_distance': float(np.sqrt(np.mean(found ** 2))) if len(found) else 0.0}
+    if return_samples:
+        result.update({'samples': samples, 'closest': closest, 'distances': distances})
+    return result
@@ -2,7 +2,10 @@
 
 import os
 import sys
+import json
 import math
+import fnmatch
+import tempfile
 
 import meshlabxml as mlx
 from . import run
@@ -10,6 +13,7 @@ from . import util
 from . import compute
 from . import transform
 from . import layers
+from . import trace
 
 #ml_version = '1.3.4BETA'
 #ml_version = '2016.12'
@@ -150,45 +154,108 @@ def measure_section(fbasename=None, log=None, axis='z', offset=0.0,
     return aabb
 
 
-def polylinesort(fbasename=None, log=None):
-    """Sort separate line segments in obj format into a continuous polyline or polylines.
-    NOT FINISHED; DO NOT USE
+def measure_sections(fbasename=None, log=None, axis='z', offsets=(0.0,),
+                     custom_axis=None, rotate_x_angle=None):
+    """Measure many parallel cross sections of a mesh in a single pass
 
-    Also measures the length of each polyline
+    Native (NumPy) alternative to calling measure_section once per cutting
+    plane. The mesh is loaded once and all sections are computed together;
+    meshlabserver is only used to convert the input to ply if it is not in
+    a natively supported format.
 
-    Return polyline and polylineMeta (lengths)
+    Args:
+        fbasename (str): filename of input model
+        log (str): filename of log file
+        axis (str): axis perpendicular to the cutting planes, e.g. specify "z"
+            to cut parallel to the XY plane. Any other value is interpreted as
+            a custom axis.
+        offsets (float or list): offsets of the cutting planes from the origin
+        custom_axis (3 component list or tuple): plane normal to use if axis
+            is custom.
+        rotate_x_angle (float): degrees to rotate about the X axis. Useful for
+            correcting "Up" direction: 90 to rotate Y to Z, and -90 to rotate
+            Z to Y.
+
+    Returns:
+        list: one dictionary per offset; see geometry.measure_sections for
+            the keys (offset, aabb, perimeter, area, segment_num).
+    """
+    from . import mesh_io
+    from . import geometry
+
+    fext = os.path.splitext(fbasename)[1][1:].strip().lower()
+    if fext not in mesh_io.READERS:
+        fin = 'TEMP3D_sections.ply'
+        run(log=log, file_in=fbasename, file_out=fin, script=None)
+    else:
+        fin = fbasename
+    vertices, faces = mesh_io.read_mesh(fin)
+    if rotate_x_angle is not None:
+        vertices = geometry.rotate_vertices(vertices, axis='x', angle=rotate_x_angle)
+    sections = geometry.measure_sections(vertices, faces, util.make_list(offsets),
+                                         axis=axis, custom_axis=custom_axis)
+    if log is not None:
+        log_file = open(log, 'a')
+        log_file.write('***Sections along %s for file "%s":\n' % (axis, fbasename))
+    for section in sections:
+        line = '{:10} perimeter = {}, area = {}, aabb = {}'.format(
+            section['offset'], section['perimeter'], section['area'], section['aabb'])
+        if log is None:
+            print(line)
+        else:
+            log_file.write(line + '\n')
+    if log is not None:
+        log_file.close()
+    return sections
+
+
+def polylinesort(fbasename=None, log=None, tolerance=0.0):
+    """Sort separate line segments in obj format into continuous polylines.
+
+    Intended for the output of compute.section saved as an obj file. Segment
+    end points are linked with a hash map, so sorting takes linear time in
+    the number of segments. Also measures the length of each polyline.
+
+    Args:
+        fbasename (str): filename of input obj file
+        log (str): filename of log file
+        tolerance (float): end points closer than about this distance are
+            considered the same point; 0 only links identical points.
 
+    Returns:
+        polylines (list): one (K, 3) array of ordered points per polyline.
+            Closed polylines repeat their first point at the end.
+        lengths (list): length of each polyline
     """
+    from . import mesh_io
+    from . import geometry
+
     fext = os.path.splitext(fbasename)[1][1:].strip().lower()
     if fext != 'obj':
         print('Input file must be obj. Exiting ...')
         sys.exit(1)
-    fread = open(fbasename, 'r')
-    first = True
-    polyline_vertices = []
-    line_segments = []
-    for line in fread:
-        element, x_co, y_co, z_co = line.split()
-        if element == 'v':
-            polyline_vertices.append(
-                [util.to_float(x_co), util.to_float(y_co), util.to_float(z_co)])
-        elif element == 'l':
-            p1 = x_co
-            p2 = y_co
-            line_segments.append([int(p1), int(p2)])
+    vertices, segments = mesh_io.read_obj_lines(fbasename)
+    # Section output may duplicate end points, so weld before linking
+    vertices, inverse = geometry.weld_points(vertices, tolerance)
+    chains = geometry.link_segments(inverse[segments])
+    lengths = geometry.polyline_lengths(vertices, chains).tolist()
+    polylines = [vertices[chain] for chain in chains]
 
-    fread.close()
     if log is not None:
         log_file = open(log, 'a')
-        #log_file.write('***Axis Aligned Bounding Results for file "%s":\n' % fbasename)
-        """log_file.write('min = %s\n' % aabb['min'])
-        log_file.write('max = %s\n' % aabb['max'])
-        log_file.write('center = %s\n' % aabb['center'])
-        log_file.write('size = %s\n' % aabb['size'])
-        log_file.write('diagonal = %s\n' % aabb['diagonal'])"""
+        log_file.write('***Polylines for file "%s":\n' % fbasename)
+    for index, polyline in enumerate(polylines):
+        line = 'polyline {}: points = {}, closed = {}, length = {}'.format(
+            index, len(polyline), bool(len(polyline) > 2 and
+                                       (polyline[0] == polyline[-1]).all()),
+            lengths[index])
+        if log is None:
+            print(line)
+        else:
+            log_file.write(line + '\n')
+    if log is not None:
         log_file.close()
-    # print(aabb)
-    return None
+    return polylines, lengths
 
 
 def measure_geometry(fbasename=None, log=None, ml_version=ml_version):
@@ -203,7 +270,7 @@ def measure_geometry(fbasename=None, log=None, ml_version=ml_version):
     compute.measure_geometry(ml_script1)
     ml_script1.save_to_file(ml_script1_file)
     ml_script1.run_script(log=log, script_file=ml_script1_file)
-    geometry = ml_script1.geometry
+    geometry = compute.first_result(ml_script1.geometry, 'geometry')
 
     if ml_version == '1.3.4BETA':
         if log is not None:
@@ -247,25 +314,30 @@ def measure_topology(fbasename=None, log=None, ml_version=ml_version):
     compute.measure_topology(ml_script1)
     ml_script1.save_to_file(ml_script1_file)
     ml_script1.run_script(log=log, script_file=ml_script1_file)
-    topology = ml_script1.topology
+    topology = compute.first_result(ml_script1.topology, 'topology')
     return topology
 
 
-def measure_all(fbasename=None, log=None, ml_version=ml_version):
-    """Measures mesh geometry, aabb and topology."""
-    ml_script1_file = 'TEMP3D_measure_gAndT.mlx'
+def measure_all(fbasename=None, log=None, ml_version=ml_version,
+                print_meshlabserver_output=True):
+    """Measures mesh geometry, aabb and topology.
+
+    The script is written to a temporary file, so several measurements can
+    run in parallel in the same directory.
+    """
     if ml_version == '1.3.4BETA':
-        file_out = 'TEMP3D_aabb.xyz'
+        temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xyz')
+        temp_file.close()
+        file_out = temp_file.name
     else:
         file_out = None
 
     ml_script1 = mlx.FilterScript(file_in=fbasename, file_out=file_out, ml_version=ml_version)
     compute.measure_geometry(ml_script1)
     compute.measure_topology(ml_script1)
-    ml_script1.save_to_file(ml_script1_file)
-    ml_script1.run_script(log=log, script_file=ml_script1_file)
-    geometry = ml_script1.geometry
-    topology = ml_script1.topology
+    ml_script1.run_script(log=log, print_meshlabserver_output=print_meshlabserver_output)
+    geometry = compute.first_result(ml_script1.geometry, 'geometry')
+    topology = compute.first_result(ml_script1.topology, 'topology')
 
     if ml_version == '1.3.4BETA':
         if log is not None:
@@ -275,11 +347,224 @@ def measure_all(fbasename=None, log=None, ml_version=ml_version):
                 fbasename)
             log_file.close()
         aabb = measure_aabb(file_out, log)
+        os.remove(file_out)
     else:
         aabb = geometry['aabb']
     return aabb, geometry, topology
 
 
+def measure_native(fbasename):
+    """Measures mesh geometry, aabb and topology without meshlabserver.
+
+    Only files with a native reader (see mesh_io.READERS) are supported.
+    Requires NumPy.
+
+    Returns:
+        aabb, geometry, topology: same as measure_all
+    """
+    from . import mesh_io
+    from . import geometry as native_geometry
+
+    vertices, faces = mesh_io.read_mesh(fbasename)
+    geometry = native_geometry.measure_geometry(vertices, faces)
+    topology = native_geometry.measure_topology(vertices, faces)
+    return geometry['aabb'], geometry, topology
+
+
+NATIVE_FORMATS = ('ply', 'stl', 'obj')
+"""tuple: mesh formats that measure_tree measures natively
+"""
+
+MEASURE_TREE_PATTERNS = ('*.ply', '*.stl', '*.obj', '*.off', '*.3ds', '*.dae', '*.wrl', '*.x3d')
+"""tuple: default file patterns for measure_tree
+"""
+
+MEASURE_TREE_INDEX = '.measure_tree_index.jsonl'
+"""str: default name of the measure_tree sidecar index, created in root
+"""
+
+
+def _measure_tree_init():
+    # meshlabserver errors would otherwise wait for input in a worker
+    sys.stdin = open(os.devnull)
+
+
+def _measure_tree_file(fbasename, native=True, ml_version=ml_version):
+    """Measure one file for measure_tree; returns (method, geometry, topology,
+    max_rss_bytes) or ('error', message, None, max_rss_bytes). max_rss_bytes
+    is the peak RSS of the worker plus that of meshlabserver, if run."""
+    from . import hooks
+    from . import schedule
+
+    child_rss = []
+
+    def on_exit(event, info):
+        if info['rusage'] is not None:
+            child_rss.append(info['rusage']['max_rss_bytes'])
+
+    schedule.reset_peak_rss()
+    hooks.register('exit', on_exit)
+    try:
+        method, geometry, topology = _measure_tree_measure(fbasename, native, ml_version)
+    finally:
+        hooks.unregister('exit', on_exit)
+    max_rss = schedule.peak_rss()
+    if max_rss is not None:
+        max_rss += max(child_rss + [0])
+    return method, geometry, topology, max_rss
+
+
+def _measure_tree_measure(fbasename, native, ml_version):
+    with trace.span('measure_file', path=fbasename) as span_args:
+        try:
+            if native and os.path.splitext(fbasename)[1][1:].strip().lower() in NATIVE_FORMATS:
+                try:
+                    _, geometry, topology = measure_native(fbasename)
+                    if topology['face_num'] > 0:
+                        span_args['method'] = 'native'
+                        return 'native', geometry, topology
+                except ImportError:
+                    pass
+            _, geometry, topology = measure_all(fbasename, ml_version=ml_version,
+                                                print_meshlabserver_output=False)
+            span_args['method'] = 'meshlabserver'
+            return 'meshlabserver', geometry, topology
+        except (Exception, SystemExit) as error:
+            span_args['method'] = 'error'
+            return 'error', '%s: %s' % (type(error).__name__, error), None
+
+
+@trace.traced()
+def measure_tree(root='.', patterns=MEASURE_TREE_PATTERNS, workers=None, report=None,
+                 index=None, native=True, log=None, memory_budget=None, ml_version=ml_version):
+    """Measure geometry and topology of every mesh in a directory tree.
+
+    Meshes are discovered recursively and measured in a process pool, using
+    native (NumPy) measurement for formats in NATIVE_FORMATS and
+    measure_all (meshlabserver) otherwise.
+
+    Progress is stored in a sidecar index (one JSON line per file, keyed by
+    path relative to root, size and mtime) as each file finishes, so an
+    interrupted run can be resumed and unchanged files are not measured
+    again. Each entry also records the vertex and face counts (for ply
+    files) and the peak RSS of the measurement, which are used by
+    memory_budget.
+
+    Args:
+        root (str): directory to search
+        patterns (str or list): filename patterns to measure, e.g. '*.ply'.
+            Matching is case insensitive.
+        workers (int): number of worker processes; defaults to the number
+            of CPUs
+        report (str): if not None, write all results to this file as one
+            columnar report; the format is csv or npz, by extension. See
+            results.save_report.
+        index (str): filename of the sidecar index; defaults to
+            MEASURE_TREE_INDEX in root
+        native (bool): if False always use meshlabserver
+        log (str): filename to log progress to; printed if None
+        memory_budget (int or str): if not None, only start measuring a
+            file while the predicted peak memory of all running
+            measurements fits this many bytes, or 'auto' for most of the
+            host memory; workers is then the maximum number of concurrent
+            measurements. Predictions are learnt from the index entries of
+            earlier runs (see schedule.MemoryScheduler).
+
+    Returns:
+        dict: results.ResultColumns for 'geometry' and 'topology', with one
+            row per successfully measured file, labelled with its path
+            relative to root
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+    from . import results
+    from . import schedule
+
+    patterns = [pattern.lower() for pattern in util.make_list(patterns)]
+    if index is None:
+        index = os.path.join(root, MEASURE_TREE_INDEX)
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in sorted(filenames):
+            if any(fnmatch.fnmatch(filename.lower(), pattern) for pattern in patterns):
+                paths.append(os.path.relpath(os.path.join(dirpath, filename), root))
+
+    entries = {}
+    if os.path.exists(index):
+        with open(index) as index_file:
+            for line in index_file:
+                try:
+                    entry = json.loads(line)
+                except ValueError:  # incomplete last line of an interrupted run
+                    continue
+                entries[entry['path']] = entry
+
+    def progress(message):
+        if log is None:
+            print(message)
+        else:
+            with open(log, 'a') as log_file:
+                log_file.write(message + '\n')
+
+    pending = {}
+    for path in paths:
+        stat = os.stat(os.path.join(root, path))
+        entry = entries.get(path)
+        if (entry is None or entry['size'] != stat.st_size or
+                entry['mtime_ns'] != stat.st_mtime_ns or entry['method'] == 'error'):
+            pending[path] = {'path': path, 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+            counts = schedule.ply_counts(os.path.join(root, path))
+            if counts is not None:
+                pending[path]['vert_num'], pending[path]['face_num'] = counts
+    progress('measure_tree: %d files, %d to measure' % (len(paths), len(pending)))
+
+    def submit(pool, entry):
+        return pool.submit(_measure_tree_file, os.path.join(root, entry['path']),
+                           native, ml_version)
+
+    if pending:
+        if memory_budget is not None:
+            model = schedule.MemoryModel()
+            model.add_records(entries.values(), mix_key='method')
+            scheduler = schedule.MemoryScheduler(memory_budget, model, max_jobs=workers)
+            workers = scheduler.max_jobs
+            for entry in pending.values():
+                native_format = os.path.splitext(entry['path'])[1][1:].lower() in NATIVE_FORMATS
+                entry['mix'] = 'native' if native and native_format else 'meshlabserver'
+        with open(index, 'a') as index_file, \
+                ProcessPoolExecutor(max_workers=workers, initializer=_measure_tree_init) as pool:
+            if memory_budget is None:
+                futures = {submit(pool, entry): entry for entry in pending.values()}
+                completed = ((futures[future], future) for future in as_completed(futures))
+            else:
+                completed = scheduler.run(pool, list(pending.values()), submit)
+            for count, (entry, future) in enumerate(completed):
+                path = entry['path']
+                (entry['method'], entry['geometry'], entry['topology'],
+                 entry['max_rss_bytes']) = future.result()
+                if memory_budget is not None:
+                    # The model learns from the method that was actually used
+                    entry['mix'] = entry['method']
+                index_file.write(json.dumps({key: val for key, val in entry.items()
+                                             if key not in ('mix', 'predicted_bytes')}) + '\n')
+                index_file.flush()
+                entries[path] = entry
+                progress('[%d/%d] %s (%s)' % (count + 1, len(pending), path,
+                                              entry['geometry'] if entry['method'] == 'error'
+                                              else entry['method']))
+
+    tables = {'geometry': results.ResultColumns('geometry', capacity=len(paths)),
+              'topology': results.ResultColumns('topology', capacity=len(paths))}
+    for path in paths:
+        entry = entries[path]
+        if entry['method'] != 'error':
+            tables['geometry'].append(entry['geometry'], label=path)
+            tables['topology'].append(entry['topology'], label=path)
+    if report is not None:
+        results.save_report(report, tables)
+    return tables
+
+
 def measure_dimension(fbasename=None, log=None, axis1=None, offset1=0.0,
                       axis2=None, offset2=0.0, ml_version=ml_version):
     """Measure a dimension of a mesh"""
@@ -321,3 +606,52 @@ def measure_dimension(fbasename=None, log=None, axis1=None, offset1=0.0,
         log_file.write('Total length = %s\n' % dimension['length'])
         log_file.close()
     return dimension
+
+
+def measure_dimensions(fbasename=None, log=None, queries=None):
+    """Measure many dimensions of a mesh, loading it only once
+
+    Native (NumPy) batched alternative to measure_dimension. The mesh is
+    loaded once and a triangle index is built for each pair of axes, so
+    hundreds of caliper style queries can be answered without launching
+    meshlabserver for each one.
+
+    Args:
+        fbasename (str): filename of input model
+        log (str): filename of log file
+        queries (list): list of (axis1, offset1, axis2, offset2) tuples, using
+            the same arguments as measure_dimension
+
+    Returns:
+        list: one dictionary per query with the same keys as
+            measure_dimension (min, max, length, axis). min and max are None
+            if the measured line misses the mesh.
+    """
+    from . import mesh_io
+    from . import geometry
+
+    fext = os.path.splitext(fbasename)[1][1:].strip().lower()
+    if fext not in mesh_io.READERS:
+        fin = 'TEMP3D_measure_dimensions.ply'
+        run(log=log, file_in=fbasename, file_out=fin, script=None)
+    else:
+        fin = fbasename
+    vertices, faces = mesh_io.read_mesh(fin)
+    dimensions = geometry.measure_dimensions(vertices, faces, queries)
+
+    if log is None:
+        print('\nFor file "%s"' % fbasename)
+    else:
+        log_file = open(log, 'a')
+        log_file.write('\nFor file "%s"\n' % fbasename)
+    for (axis1, offset1, axis2, offset2), dimension in zip(queries, dimensions):
+        line = 'Dimension parallel to %s with %s=%s & %s=%s: min = %s, max = %s, length = %s' % (
+            dimension['axis'], axis1, offset1, axis2, offset2,
+            dimension['min'], dimension['max'], dimension['length'])
+        if log is None:
+            print(line)
+        else:
+            log_file.write(line + '\n')
+    if log is not None:
+        log_file.close()
+    return dimensions
@@ -0,0 +1,259 @@
+""" MeshLabXML instrumentation hooks
+
+Callbacks can be registered for the following events, and are called as
+func(event, info), where info is a dictionary:
+
+    script_build: a FilterScript was written to an mlx file
+        script_file, filter_num, bytes, seconds
+    spawn: meshlabserver is about to be started
+        cmd, file_in, file_out, time (time.time() at spawn)
+    exit: meshlabserver exited
+        cmd, return_code, seconds (wall time), aborted, rusage (dict with
+        user_seconds, system_seconds, max_rss_bytes, or None if not
+        available on this platform)
+    parse: meshlabserver output was parsed
+        source ('stdout' or the ml_log filename), lines, bytes, seconds,
+        results (number of measurement results), filter_times (list of
+        dicts with name, msec, filter_num, layer_num)
+    output: an output file was written
+        file_out, bytes
+
+Hooks are global and are called in the order they were registered.
+Exceptions raised by hooks are not caught.
+"""
+
+import os
+import math
+
+EVENTS = ('script_build', 'spawn', 'exit', 'parse', 'output')
+"""tuple: names of the hook events
+"""
+
+HOOKS = {event: [] for event in EVENTS}
+"""dict: registered callbacks for each event
+"""
+
+
+def register(event, func):
+    """ Register a callback for an event.
+
+    Args:
+        event (str): event name, one of EVENTS, or 'all' to register for
+            every event
+        func (function): called as func(event, info)
+
+    Returns:
+        func
+    """
+    events = EVENTS if event == 'all' else [event]
+    for val in events:
+        if val not in HOOKS:
+            raise ValueError('Unknown hook event "%s"; valid events are %s' % (val, EVENTS))
+        HOOKS[val].append(func)
+    return func
+
+
+def unregister(event, func):
+    """ Remove a callback registered with register """
+    events = EVENTS if event == 'all' else [event]
+    for val in events:
+        if func in HOOKS[val]:
+            HOOKS[val].remove(func)
+
+
+def clear():
+    """ Remove all callbacks """
+    for event in EVENTS:
+        del HOOKS[event][:]
+
+
+def active(event):
+    """ Return True if any callback is registered for event """
+    return bool(HOOKS[event])
+
+
+def emit(event, **info):
+    """ Call all callbacks registered for event with info """
+    for func in list(HOOKS[event]):
+        func(event, info)
+
+
+def wait(process):
+    """ Wait for a subprocess.Popen process and collect its resource usage.
+
+    Uses os.wait4 where available so that the usage of this one process
+    (and the children it waited for) is reported.
+
+    Returns:
+        return_code (int), rusage (dict or None)
+    """
+    if not hasattr(os, 'wait4'):
+        return process.wait(), None
+    while True:
+        try:
+            _, status, usage = os.wait4(process.pid, 0)
+            break
+        except InterruptedError:
+            continue
+        except ChildProcessError:  # already reaped
+            return process.wait(), None
+    if hasattr(os, 'waitstatus_to_exitcode'):
+        process.returncode = os.waitstatus_to_exitcode(status)
+    elif os.WIFSIGNALED(status):
+        process.returncode = -os.WTERMSIG(status)
+    else:
+        process.returncode = os.WEXITSTATUS(status)
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = usage.ru_maxrss * (1 if os.uname().sysname == 'Darwin' else 1024)
+    return process.returncode, {'user_seconds': usage.ru_utime,
+                                'system_seconds': usage.ru_stime,
+                                'max_rss_bytes': max_rss}
+
+
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0,
+                   1800.0, float('inf'))
+"""tuple: default histogram bucket upper bounds, in seconds
+"""
+
+
+class _Histogram(object):
+    """ Prometheus style cumulative histogram """
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+
+def _labels(labels):
+    return '{%s}' % ','.join('%s="%s"' % (key, str(val).replace('\\', '\\\\').replace('"', '\\"'))
+                             for key, val in sorted(labels.items()))
+
+
+def _bound(bound):
+    return '+Inf' if math.isinf(bound) else repr(bound)
+
+
+class PrometheusExporter(object):
+    """ Write MeshLabXML metrics in the Prometheus textfile format.
+
+    Counters and histograms are kept per job and, for filter timings, per
+    filter. The file is rewritten atomically after every meshlabserver
+    run, parse and output file, so it can be picked up by the
+    node_exporter textfile collector.
+
+    Per filter timings are only available when meshlabserver output is
+    parsed, i.e. when FilterScript.parse_profile (or a measurement) is set.
+
+    Args:
+        filename (str): output filename, e.g. 'meshlabxml.prom'
+        job (str): value of the job label
+        buckets (tuple): histogram bucket upper bounds in seconds
+
+    Example:
+        exporter = hooks.PrometheusExporter('/var/lib/node_exporter/mlx.prom',
+                                            job='decimate')
+        exporter.install()
+    """
+    def __init__(self, filename, job='meshlabxml', buckets=DEFAULT_BUCKETS):
+        self.filename = filename
+        self.job = job
+        self.buckets = buckets
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+
+    def install(self):
+        """ Register the exporter for all hook events """
+        register('all', self)
+        return self
+
+    def uninstall(self):
+        """ Unregister the exporter """
+        unregister('all', self)
+
+    def inc(self, name, value=1, **labels):
+        """ Increment a counter """
+        key = (name, tuple(sorted(labels.items())))
+        self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        """ Add an observation to a histogram """
+        key = (name, tuple(sorted(labels.items())))
+        if key not in self.histograms:
+            self.histograms[key] = _Histogram(self.buckets)
+        self.histograms[key].observe(value)
+
+    def __call__(self, event, info):
+        job = self.job
+        if event == 'script_build':
+            self.inc('meshlabxml_scripts_total', job=job)
+            self.inc('meshlabxml_script_filters_total', info['filter_num'], job=job)
+            self.inc('meshlabxml_script_bytes_total', info['bytes'], job=job)
+            self.observe('meshlabxml_script_build_seconds', info['seconds'], job=job)
+        elif event == 'spawn':
+            self.inc('meshlabxml_runs_started_total', job=job)
+        elif event == 'exit':
+            self.inc('meshlabxml_runs_total', job=job)
+            if info['return_code'] != 0:
+                self.inc('meshlabxml_run_failures_total', job=job)
+            self.observe('meshlabxml_run_seconds', info['seconds'], job=job)
+            if info['rusage'] is not None:
+                self.inc('meshlabxml_cpu_seconds_total', info['rusage']['user_seconds'],
+                         job=job, mode='user')
+                self.inc('meshlabxml_cpu_seconds_total', info['rusage']['system_seconds'],
+                         job=job, mode='system')
+                key = ('meshlabxml_max_rss_bytes', (('job', job),))
+                self.gauges[key] = max(self.gauges.get(key, 0),
+                                       info['rusage']['max_rss_bytes'])
+            self.write()
+        elif event == 'parse':
+            self.inc('meshlabxml_parse_bytes_total', info['bytes'], job=job)
+            self.observe('meshlabxml_parse_seconds', info['seconds'], job=job)
+            for entry in info['filter_times']:
+                self.observe('meshlabxml_filter_seconds', entry['msec'] / 1000.0,
+                             job=job, filter=entry['name'])
+            self.write()
+        elif event == 'output':
+            self.inc('meshlabxml_output_files_total', job=job)
+            self.inc('meshlabxml_output_bytes_total', info['bytes'], job=job)
+            self.write()
+
+    def text(self):
+        """ Return the metrics in the Prometheus text format """
+        lines = []
+        for metrics, kind in ((self.counters, 'counter'), (self.gauges, 'gauge')):
+            names = sorted(set(name for name, _ in metrics))
+            for name in names:
+                lines.append('# TYPE %s %s' % (name, kind))
+                for (metric, labels), value in sorted(metrics.items()):
+                    if metric == name:
+                        lines.append('%s%s %r' % (name, _labels(dict(labels)), value))
+        names = sorted(set(name for name, _ in self.histograms))
+        for name in names:
+            lines.append('# TYPE %s histogram' % name)
+            for (metric, labels), hist in sorted(self.histograms.items(),
+                                                 key=lambda item: item[0]):
+                if metric != name:
+                    continue
+                labels = dict(labels)
+                for bound, count in zip(hist.buckets, hist.counts):
+                    lines.append('%s_bucket%s %d' % (
+                        name, _labels(dict(labels, le=_bound(bound))), count))
+                lines.append('%s_sum%s %r' % (name, _labels(labels), hist.sum))
+                lines.append('%s_count%s %d' % (name, _labels(labels), hist.count))
+        return '\n'.join(lines) + '\n'
+
+    def write(self):
+        """ Atomically (re)write the metrics file """
+        temp_name = '%s.%d.tmp' % (self.filename, os.getpid())
+        with open(temp_name, 'w') as prom_file:
+            prom_file.write(self.text())
+        os.replace(temp_name, self.filename)
@@ -0,0 +1,658 @@
+""" MeshLabXML native mesh file readers and writers
+
+These functions load mesh files directly into NumPy arrays so that simple
+measurements can be performed without launching meshlabserver. Meshes are
+returned as a tuple of (vertices, faces), where vertices is an (N, 3) float64
+array and faces is an (M, 3) int64 array of vertex indices. Polygonal faces
+are fan triangulated.
+
+Requires NumPy.
+"""
+
+import os
+import sys
+import warnings
+
+import numpy as np
+
+from . import geometry
+
+PLY_TYPES = {'char': 'i1', 'int8': 'i1', 'uchar': 'u1', 'uint8': 'u1',
+             'short': 'i2', 'int16': 'i2', 'ushort': 'u2', 'uint16': 'u2',
+             'int': 'i4', 'int32': 'i4', 'uint': 'u4', 'uint32': 'u4',
+             'float': 'f4', 'float32': 'f4', 'double': 'f8', 'float64': 'f8'}
+"""dict: map of ply property types to NumPy type codes
+"""
+
+
+def fan_triangulate(polygons):
+    """ Fan triangulate a list of polygons with the same number of vertices.
+
+    Args:
+        polygons (array): (M, K) array of vertex indices, K >= 3
+
+    Returns:
+        (M * (K-2), 3) array of triangle vertex indices
+    """
+    polygons = np.asarray(polygons)
+    if polygons.shape[1] == 3:
+        return polygons
+    fans = [polygons[:, [0, i, i + 1]] for i in range(1, polygons.shape[1] - 1)]
+    # Interleave so that the triangles of each polygon stay adjacent
+    return np.stack(fans, axis=1).reshape(-1, 3)
+
+
+def _ply_header(fread):
+    """ Read a ply header from a binary file object.
+
+    Returns:
+        fmt (str): ply format, e.g. 'binary_little_endian'
+        elements (list): list of [name, count, properties] where properties
+            is a list of (name, type) or (name, (count_type, item_type)) for
+            list properties
+    """
+    if fread.readline().strip() != b'ply':
+        raise ValueError('File is not a ply file')
+    fmt = None
+    elements = []
+    while True:
+        line = fread.readline()
+        if not line:
+            raise ValueError('Unexpected end of file in ply header')
+        words = line.decode('ascii', 'replace').split()
+        if not words:
+            continue
+        if words[0] == 'format':
+            fmt = words[1]
+        elif words[0] == 'element':
+            elements.append([words[1], int(words[2]), []])
+        elif words[0] == 'property':
+            if words[1] == 'list':
+                elements[-1][2].append((words[4], (PLY_TYPES[words[2]], PLY_TYPES[words[3]])))
+            else:
+                elements[-1][2].append((words[2], PLY_TYPES[words[1]]))
+        elif words[0] == 'end_header':
+            break
+    return fmt, elements
+
+
+def _read_ply_binary_element(fread, count, properties, endian):
+    """ Read a binary ply element, returning a dict of property arrays.
+
+    Elements without list properties (and list elements whose lists all
+    have the same length, which is by far the most common case for faces)
+    are read with a single structured np.frombuffer call. Mixed length lists fall back to
+    a slower per-item read.
+    """
+    lists = [prop for prop in properties if isinstance(prop[1], tuple)]
+    if not lists:
+        dtype = np.dtype([(name, endian + ptype) for name, ptype in properties])
+        data = np.frombuffer(fread.read(dtype.itemsize * count), dtype=dtype, count=count)
+        return {name: data[name] for name, _ in properties}
+    # Peek at the first list length to guess a fixed record size
+    start = fread.tell()
+    offset = 0
+    list_lens = []
+    for name, ptype in properties:
+        if isinstance(ptype, tuple):
+            fread.seek(start + offset)
+            ctype = np.dtype(endian + ptype[0])
+            length = int(np.frombuffer(fread.read(ctype.itemsize), dtype=ctype)[0])
+            list_lens.append(length)
+            offset += ctype.itemsize + length * np.dtype(ptype[1]).itemsize
+        else:
+            offset += np.dtype(ptype).itemsize
+    fread.seek(start)
+    fields = []
+    lengths = iter(list_lens)
+    for name, ptype in properties:
+        if isinstance(ptype, tuple):
+            length = next(lengths)
+            fields.append((name + '_count', endian + ptype[0]))
+            fields.append((name, endian + ptype[1], (length,)))
+        else:
+            fields.append((name, endian + ptype))
+    dtype = np.dtype(fields)
+    raw = fread.read(dtype.itemsize * count)
+    if len(raw) == dtype.itemsize * count:
+        data = np.frombuffer(raw, dtype=dtype, count=count)
+        fixed = all(
+            np.all(data[name + '_count'] == length)
+            for (name, _), length in zip(lists, list_lens))
+        if fixed:
+            fread.seek(start + dtype.itemsize * count)
+            return {name: data[name] for name, _ in properties}
+    # Variable length lists; read item by item
+    fread.seek(start)
+    result = {name: [] for name, _ in properties}
+    for _ in range(count):
+        for name, ptype in properties:
+            if isinstance(ptype, tuple):
+                ctype = np.dtype(endian + ptype[0])
+                length = int(np.frombuffer(fread.read(ctype.itemsize), dtype=ctype)[0])
+                itype = np.dtype(endian + ptype[1])
+                result[name].append(np.frombuffer(
+                    fread.read(itype.itemsize * length), dtype=itype))
+            else:
+                ptype = np.dtype(endian + ptype)
+                result[name].append(np.frombuffer(fread.read(ptype.itemsize), dtype=ptype)[0])
+    return result
+
+
+def _read_ply_ascii_element(lines, count, properties):
+    """ Read an ascii ply element from an iterator of lines """
+    result = {name: [] for name, _ in properties}
+    for _ in range(count):
+        words = next(lines).split()
+        pos = 0
+        for name, ptype in properties:
+            if isinstance(ptype, tuple):
+                length = int(words[pos])
+                result[name].append(np.array(words[pos + 1:pos + 1 + length], dtype=ptype[1]))
+                pos += 1 + length
+            else:
+                result[name].append(float(words[pos]))
+                pos += 1
+    return result
+
+
+def _faces_from_lists(face_lists):
+    """ Convert a list (or 2D array) of polygon index lists to triangles """
+    if isinstance(face_lists, np.ndarray):
+        if face_lists.size == 0:
+            return np.zeros((0, 3), dtype=np.int64)
+        return fan_triangulate(face_lists.astype(np.int64))
+    if not face_lists:
+        return np.zeros((0, 3), dtype=np.int64)
+    # Group polygons by vertex count so each group is triangulated at once
+    by_len = {}
+    for poly in face_lists:
+        by_len.setdefault(len(poly), []).append(poly)
+    tris = [fan_triangulate(np.array(polys, dtype=np.int64))
+            for length, polys in sorted(by_len.items()) if length >= 3]
+    if not tris:
+        return np.zeros((0, 3), dtype=np.int64)
+    return np.concatenate(tris)
+
+
+def read_ply(fbasename):
+    """ Read a binary or ascii ply file.
+
+    Args:
+        fbasename (str): input filename
+
+    Returns:
+        vertices (array): (N, 3) float64 array of vertex coordinates
+        faces (array): (M, 3) int64 array of triangle vertex indices.
+            Polygons are fan triangulated. Empty for point clouds.
+    """
+    vertices = np.zeros((0, 3))
+    faces = np.zeros((0, 3), dtype=np.int64)
+    with open(fbasename, 'rb') as fread:
+        fmt, elements = _ply_header(fread)
+        if fmt == 'ascii':
+            lines = (line for line in fread.read().decode('ascii').splitlines() if line.strip())
+        elif fmt in ('binary_little_endian', 'binary_big_endian'):
+            endian = '<' if fmt == 'binary_little_endian' else '>'
+        else:
+            raise ValueError('Unsupported ply format "%s"' % fmt)
+        for name, count, properties in elements:
+            if fmt == 'ascii':
+                data = _read_ply_ascii_element(lines, count, properties)
+            else:
+                data = _read_ply_binary_element(fread, count, properties, endian)
+            if name == 'vertex':
+                vertices = np.column_stack(
+                    [np.asarray(data[axis], dtype=np.float64) for axis in ('x', 'y', 'z')])
+            elif name == 'face':
+                key = 'vertex_indices' if 'vertex_indices' in data else 'vertex_index'
+                faces = _faces_from_lists(data[key])
+    return vertices, faces
+
+
+def write_ply(file_out, vertices, faces=None, vert_colors=None, comments=None):
+    """ Write a binary little endian ply file.
+
+    Args:
+        file_out (str): output filename
+        vertices (array): (N, 3) array of vertex coordinates
+        faces (array): (M, 3) array of triangle vertex indices; may be None
+            for a point cloud.
+        vert_colors (array): optional (N, 3) or (N, 4) array of 8 bit RGB(A)
+            vertex colors
+        comments (list): optional list of header comment strings
+    """
+    vertices = np.asarray(vertices)
+    vert_fields = [('x', '<f4'), ('y', '<f4'), ('z', '<f4')]
+    if vert_colors is not None:
+        vert_colors = np.asarray(vert_colors, dtype=np.uint8)
+        for channel in ('red', 'green', 'blue', 'alpha')[:vert_colors.shape[1]]:
+            vert_fields.append((channel, 'u1'))
+    vert_data = np.empty(len(vertices), dtype=vert_fields)
+    vert_data['x'] = vertices[:, 0]
+    vert_data['y'] = vertices[:, 1]
+    vert_data['z'] = vertices[:, 2]
+    if vert_colors is not None:
+        for index, channel in enumerate(('red', 'green', 'blue', 'alpha')[:vert_colors.shape[1]]):
+            vert_data[channel] = vert_colors[:, index]
+    if faces is None:
+        faces = np.zeros((0, 3), dtype=np.int64)
+    faces = np.asarray(faces)
+    face_data = np.empty(len(faces), dtype=[('n', 'u1'), ('vertex_indices', '<i4', (3,))])
+    face_data['n'] = 3
+    face_data['vertex_indices'] = faces
+    header = ['ply', 'format binary_little_endian 1.0', 'comment MeshLabXML generated']
+    if comments is not None:
+        header += ['comment %s' % comment for comment in comments]
+    header += ['element vertex %d' % len(vertices),
+               'property float x', 'property float y', 'property float z']
+    if vert_colors is not None:
+        header += ['property uchar %s' % channel for channel, _ in vert_fields[3:]]
+    header += ['element face %d' % len(faces),
+               'property list uchar int vertex_indices', 'end_header\n']
+    with open(file_out, 'wb') as fwrite:
+        fwrite.write('\n'.join(header).encode('ascii'))
+        fwrite.write(vert_data.tobytes())
+        fwrite.write(face_data.tobytes())
+    return None
+
+
+def read_xyz(fbasename):
+    """ Read an ascii xyz point cloud, ignoring any columns past the third """
+    vertices = np.loadtxt(fbasename, usecols=(0, 1, 2), ndmin=2)
+    return vertices, np.zeros((0, 3), dtype=np.int64)
+
+
+STL_DTYPE = np.dtype([('normal', '<f4', (3,)), ('vertices', '<f4', (3, 3)),
+                      ('attribute', '<u2')])
+"""NumPy dtype of a binary stl triangle record
+"""
+
+
+def read_stl(fbasename, tolerance=0.0):
+    """ Read a binary or ascii stl file, welding shared vertices on load.
+
+    STL stores every triangle with its own three vertices. These are merged
+    by hashing their (optionally quantized) coordinates with np.unique, which
+    replaces running clean.merge_vert in meshlabserver.
+
+    Args:
+        fbasename (str): input filename
+        tolerance (float): vertices falling into the same cell of a grid with
+            this spacing are merged; 0 merges only identical vertices.
+
+    Returns:
+        vertices, faces: see read_ply
+    """
+    with open(fbasename, 'rb') as fread:
+        data = fread.read()
+    # Binary files may also start with "solid", so check the size first
+    binary = False
+    if len(data) >= 84:
+        tri_num = int(np.frombuffer(data, dtype='<u4', count=1, offset=80)[0])
+        binary = len(data) == 84 + 50 * tri_num
+    if binary:
+        tris = np.frombuffer(data, dtype=STL_DTYPE, count=tri_num, offset=84)['vertices']
+        points = tris.reshape(-1, 3).astype(np.float64)
+    else:
+        words = data.decode('ascii', 'replace').split()
+        words = np.array(words)
+        index = np.flatnonzero(words == 'vertex')
+        points = words[index[:, np.newaxis] + np.arange(1, 4)].astype(np.float64)
+    vertices, inverse = geometry.weld_points(points, tolerance)
+    return vertices, inverse.reshape(-1, 3).astype(np.int64)
+
+
+def welded_ply(fbasename, tolerance=0.0, file_out=None):
+    """ Convert an stl file to a welded binary ply, reusing a cached result.
+
+    The welded file is written next to the source as "{name}_welded.ply",
+    or "{name}_welded_{tolerance}.ply" for a non-zero tolerance (unless
+    file_out is given), and is reused as long as it is newer than the
+    source and was welded with the same tolerance.
+
+    Args:
+        fbasename (str): input stl filename
+        tolerance (float): welding tolerance; see read_stl
+        file_out (str): output ply filename
+
+    Returns:
+        str: filename of the welded ply file
+    """
+    if file_out is None:
+        file_out = '%s_welded%s.ply' % (os.path.splitext(fbasename)[0],
+                                        '_%g' % tolerance if tolerance else '')
+    stamp = 'welded tolerance=%r' % float(tolerance)
+    if (os.path.exists(file_out) and
+            os.path.getmtime(file_out) >= os.path.getmtime(fbasename)):
+        with open(file_out, 'rb') as fread:
+            header = fread.read(512).split(b'end_header')[0].decode('ascii', 'replace')
+        if ('comment %s' % stamp) in header:
+            return file_out
+    vertices, faces = read_stl(fbasename, tolerance)
+    write_ply(file_out, vertices, faces, comments=[stamp])
+    return file_out
+
+
+OBJ_NUMERIC = ('v', 'vt', 'vn')
+"""tuple: obj records parsed into float arrays
+"""
+OBJ_ELEMENTS = ('f', 'l')
+"""tuple: obj records parsed into vertex index arrays
+"""
+OBJ_NAMES = ('mtllib', 'usemtl', 'o', 'g')
+"""tuple: obj records collected as lists of names
+"""
+OBJ_WIDTHS = {'v': 3, 'vt': 2, 'vn': 3, 'f': 3, 'l': 2}
+"""dict: number of columns of each parsed obj record array
+"""
+_OBJ_TYPES = {b'v ': 'v', b'v\t': 'v', b'vt': 'vt', b'vn': 'vn',
+              b'f ': 'f', b'f\t': 'f', b'l ': 'l', b'l\t': 'l'}
+
+
+def _obj_line_types(chunk):
+    """ Classify every line of a chunk by its first two bytes.
+
+    Returns:
+        starts (array): byte offset of the start of each line, plus a final
+            entry for the end of the chunk
+        types (array): type code of each line; an index into
+            list(_OBJ_TYPES.values()) + [other]
+    """
+    arr = np.frombuffer(chunk, dtype=np.uint8)
+    starts = np.concatenate(([0], np.flatnonzero(arr == 10) + 1))
+    if starts[-1] != len(arr):
+        starts = np.append(starts, len(arr))
+    first = arr[starts[:-1]].astype(np.int64)
+    second = arr[np.minimum(starts[:-1] + 1, len(arr) - 1)].astype(np.int64)
+    pairs = first * 256 + second
+    names = list(_OBJ_TYPES.values())
+    types = np.full(len(pairs), len(names), dtype=np.int64)
+    for code, (prefix, _) in enumerate(_OBJ_TYPES.items()):
+        types[pairs == prefix[0] * 256 + prefix[1]] = code
+    return starts, types
+
+
+def _obj_block_fast(data, count, record):
+    """ Convert a run of same type obj lines in one batch.
+
+    Every line must have the same number of values; returns None otherwise
+    so the caller can fall back to _obj_block_slow.
+    """
+    if b'#' in data:
+        return None
+    per = 1
+    if record in OBJ_ELEMENTS:
+        # Keep only the vertex index of 'v/vt/vn' corners
+        data = data.replace(b'//', b'/0/')
+        first_corner = data[:data.find(b'\n')].split()[1]
+        per = first_corner.count(b'/') + 1
+        data = data.replace(b'/', b' ')
+    # Blank out the record type at the start of each line
+    data = data.replace(record.encode('ascii'), b' ' * len(record))
+    # Count the values on each line without splitting the data
+    arr = np.frombuffer(data, dtype=np.uint8)
+    space = arr <= 32
+    value_start = ~space & np.concatenate(([True], space[:-1]))
+    line_ends = np.append(np.flatnonzero(arr == 10), len(arr))
+    if len(line_ends) != count:
+        return None
+    values_before = np.searchsorted(np.flatnonzero(value_start), line_ends)
+    values_per_line = np.diff(values_before, prepend=0)
+    width = int(values_per_line[0])
+    if np.any(values_per_line != width) or width % per:
+        return None
+    with warnings.catch_warnings():
+        warnings.simplefilter('error')
+        try:
+            block = np.fromstring(data, dtype=np.float64 if record in OBJ_NUMERIC else np.int64,
+                                  sep=' ')
+        except (ValueError, DeprecationWarning):
+            return None
+    if block.size != count * width:
+        return None
+    block = block.reshape(count, width)
+    if per > 1:
+        block = block[:, ::per]
+    return block
+
+
+def _obj_block_slow(data, record):
+    """ Convert obj lines one at a time, for mixed or commented lines """
+    rows = []
+    for line in data.split(b'\n'):
+        words = line.split(b'#')[0].split()[1:]
+        if record in OBJ_ELEMENTS:
+            words = [word.split(b'/')[0] for word in words]
+        rows.append(words)
+    if record in OBJ_NUMERIC:
+        width = OBJ_WIDTHS[record]
+        return np.array([row[:width] + [0.0] * (width - len(row)) for row in rows],
+                        dtype=np.float64)
+    # Mixed polygon sizes; return a list of rows
+    return [np.array(row, dtype=np.int64) for row in rows]
+
+
+def _obj_elements(block, record, vert_num):
+    """ Triangulate faces (or split polylines) and resolve 1-based and
+    negative indices.
+
+    Args:
+        block (array or list): (K, C) index array, or list of index arrays
+        vert_num (int): number of vertices defined before these lines
+    """
+    if isinstance(block, list):
+        # Mixed corner counts; convert each group and restore the line order
+        lengths = np.array([len(row) for row in block], dtype=np.int64)
+        sizes = np.maximum(lengths - (2 if record == 'f' else 1), 0)
+        offsets = np.cumsum(sizes) - sizes
+        out = np.empty((int(sizes.sum()), OBJ_WIDTHS[record]), dtype=np.int64)
+        for length in np.unique(lengths[sizes > 0]).tolist():
+            line_nums = np.flatnonzero(lengths == length)
+            group = _obj_elements(np.array([block[i] for i in line_nums]), record, vert_num)
+            pieces = length - (2 if record == 'f' else 1)
+            rows = (offsets[line_nums][:, np.newaxis] + np.arange(pieces)).reshape(-1)
+            out[rows] = group
+        return out
+    block = np.where(block < 0, block + vert_num, block - 1)
+    corners = block.shape[1]
+    if record == 'f':
+        if corners < 3:
+            return np.zeros((0, 3), dtype=np.int64)
+        return fan_triangulate(block)
+    if corners < 2:
+        return np.zeros((0, 2), dtype=np.int64)
+    return np.stack([block[:, [i, i + 1]] for i in range(corners - 1)],
+                    axis=1).reshape(-1, 2)
+
+
+def parse_obj(fbasename, records=OBJ_NUMERIC + OBJ_ELEMENTS + OBJ_NAMES,
+              first=False, chunk_size=2**26):
+    """ Bulk parse an obj file into NumPy arrays.
+
+    The file is read in large chunks. Each chunk is split into runs of lines
+    of the same record type using NumPy on the raw bytes, and each run is
+    converted to an array with a single split and a single array
+    conversion, rather than line by line. This keeps multi gigabyte obj
+    files tractable.
+
+    Args:
+        fbasename (str): input filename
+        records (list): record types to parse, any of OBJ_NUMERIC,
+            OBJ_ELEMENTS and OBJ_NAMES. Parsing fewer record types is faster.
+        first (bool): if True, stop reading after the chunk in which every
+            requested record type has been found at least once. For header
+            records such as mtllib use obj_header, which does not read a
+            whole chunk.
+        chunk_size (int): approximate number of bytes to read at a time
+
+    Returns:
+        dict: one entry per requested record:
+            v (array): (N, 3) float64 vertex coordinates (extra columns,
+                such as vertex colors, are dropped)
+            vt (array): (N, 2) float64 texture coordinates
+            vn (array): (N, 3) float64 vertex normals
+            f (array): (M, 3) int64 0-based triangle vertex indices. Polygons
+                are fan triangulated and negative (relative) indices are
+                resolved.
+            l (array): (K, 2) int64 0-based line segment vertex indices.
+                Polylines are split into segments.
+            mtllib, usemtl, o, g (list): names in file order
+    """
+    type_names = list(_OBJ_TYPES.values())
+    wanted = set(records)
+    result = {record: [] for record in records}
+    vert_num = 0
+    with open(fbasename, 'rb') as fread:
+        remainder = b''
+        while True:
+            chunk = fread.read(chunk_size)
+            if chunk:
+                chunk = remainder + chunk
+                cut = chunk.rfind(b'\n') + 1
+                chunk, remainder = chunk[:cut], chunk[cut:]
+                if not chunk:
+                    continue
+            elif remainder:
+                chunk, remainder = remainder, b''
+            else:
+                break
+            starts, types = _obj_line_types(chunk)
+            bounds = np.flatnonzero(np.diff(types)) + 1
+            run_starts = np.concatenate(([0], bounds))
+            run_ends = np.append(bounds, len(types))
+            for run_start, run_end, code in zip(run_starts.tolist(), run_ends.tolist(),
+                                                types[run_starts].tolist()):
+                record = type_names[code] if code < len(type_names) else None
+                count = run_end - run_start
+                if record is None:
+                    if not wanted.intersection(OBJ_NAMES):
+                        continue
+                    for line in chunk[starts[run_start]:starts[run_end]].split(b'\n'):
+                        words = line.split(b'#')[0].split(None, 1)
+                        if len(words) == 2 and words[0].decode('ascii', 'replace') in wanted:
+                            result[words[0].decode('ascii')].append(
+                                words[1].decode('utf-8', 'replace').strip())
+                    continue
+                if record not in wanted:
+                    if record == 'v':
+                        vert_num += count
+                    continue
+                data = chunk[starts[run_start]:starts[run_end]].rstrip(b'\r\n')
+                block = _obj_block_fast(data, count, record)
+                if block is None:
+                    block = _obj_block_slow(data, record)
+                if record in OBJ_NUMERIC:
+                    block = block[:, :OBJ_WIDTHS[record]]
+                    if block.shape[1] < OBJ_WIDTHS[record]:
+                        block = np.pad(block, ((0, 0), (0, OBJ_WIDTHS[record] - block.shape[1])))
+                else:
+                    block = _obj_elements(block, record, vert_num)
+                if record == 'v':
+                    vert_num += count
+                result[record].append(block)
+            if first and all(result[record] for record in records):
+                break
+
+    for record in records:
+        if record in OBJ_NUMERIC or record in OBJ_ELEMENTS:
+            blocks = result[record]
+            dtype = np.float64 if record in OBJ_NUMERIC else np.int64
+            result[record] = (np.concatenate(blocks) if blocks else
+                              np.zeros((0, OBJ_WIDTHS[record]), dtype=dtype))
+    return result
+
+
+def obj_header(fbasename, records=('mtllib',)):
+    """ Read name records (see OBJ_NAMES) from the header of an obj file.
+
+    Lines are read one at a time until every requested record has been
+    found, or until the first face or line element, so only the header of
+    a large file is read.
+
+    Args:
+        fbasename (str): input filename
+        records (list): record types to find, e.g. ('mtllib',)
+
+    Returns:
+        dict: list of the names found for each requested record
+    """
+    result = {record: [] for record in records}
+    with open(fbasename, 'rb') as fread:
+        for line in fread:
+            words = line.split(b'#')[0].split(None, 1)
+            if not words:
+                continue
+            record = words[0].decode('ascii', 'replace')
+            if record in OBJ_ELEMENTS:
+                break
+            if record in result and len(words) == 2:
+                result[record].append(words[1].decode('utf-8', 'replace').strip())
+                if all(result.values()):
+                    break
+    return result
+
+
+def read_obj(fbasename):
+    """ Read the vertices and faces of an obj file.
+
+    Args:
+        fbasename (str): input filename
+
+    Returns:
+        vertices, faces: see read_ply
+    """
+    data = parse_obj(fbasename, records=('v', 'f'))
+    return data['v'], data['f']
+
+
+def read_obj_lines(fbasename):
+    """ Read the vertices and line elements of an obj file.
+
+    Intended for polyline output such as compute.section saved as obj.
+    Polyline elements with more than two vertices are split into
+    consecutive segments and negative (relative) indices are resolved.
+
+    Args:
+        fbasename (str): input filename
+
+    Returns:
+        vertices (array): (N, 3) float64 array of vertex coordinates
+        segments (array): (K, 2) int64 array of 0-based vertex indices
+    """
+    data = parse_obj(fbasename, records=('v', 'l'))
+    return data['v'], data['l']
+
+
+def read_mtl_textures(fbasename):
+    """ Return the texture filenames (map_Kd) referenced by an mtl file """
+    texture_files = []
+    with open(fbasename, 'r') as fread:
+        for line in fread:
+            words = line.split('#')[0].split()
+            if len(words) > 1 and words[0] == 'map_Kd':
+                # Options such as "-s 1 1 1" may precede the filename
+                texture_files.append(words[-1])
+    return texture_files
+
+
+READERS = {'ply': read_ply, 'xyz': read_xyz, 'stl': read_stl, 'obj': read_obj}
+"""dict: native reader function for each supported file extension
+"""
+
+
+def read_mesh(fbasename):
+    """ Read a mesh file using the native reader for its file extension.
+
+    Args:
+        fbasename (str): input filename. Supported file extensions are the
+            keys of READERS.
+
+    Returns:
+        vertices, faces: see read_ply
+    """
+    fext = os.path.splitext(fbasename)[1][1:].strip().lower()
+    if fext not in READERS:
+        print('Native reading of "%s" files is not supported. Exiting ...' % fext)
+        sys.exit(1)
+    return READERS[fext](fbasename)
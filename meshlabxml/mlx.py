@@ -21,26 +21,25 @@ License:
 
 import os
 import sys
-import inspect
+import time
 import subprocess
-import xml.etree.ElementTree as ET
 import tempfile
+import threading
 
 from . import util
 from . import layers
 #from .layers import clean
 from . import clean
 from . import compute
+from . import hooks
+from . import trace
 
 # Global variables
 ML_VERSION = '2016.12'
 """str: MeshLab version to target
 """
 
-THIS_MODULEPATH = os.path.dirname(
-    os.path.realpath(
-        inspect.getsourcefile(
-            lambda: 0)))
+THIS_MODULEPATH = os.path.dirname(os.path.realpath(__file__))
 
 """
 Notes on meshlabserver filters - tested with 1.34Beta:
@@ -82,9 +81,19 @@ class FilterScript(object):
     add run method?
 
     """
-    def __init__(self, file_in=None, mlp_in=None, file_out=None, ml_version=ML_VERSION):
+    @trace.traced('FilterScript')
+    def __init__(self, file_in=None, mlp_in=None, file_out=None, ml_version=ML_VERSION,
+                 weld_stl=False):
         self.ml_version = ml_version # MeshLab version
+        # If True (or a welding tolerance), stl input files are welded
+        # natively when the script is run instead of adding clean.merge_vert
+        # to the script
+        self.weld_stl = weld_stl
         self.filters = []
+        # Layer that each entry in filters was applied to
+        self.filter_layers = []
+        # Number of layers when each entry in filters was added
+        self.filter_layer_counts = []
         self.layer_stack = [-1] # set current layer to -1
         self.opening = ['<!DOCTYPE FilterScript>\n<FilterScript>\n']
         self.closing = ['</FilterScript>\n']
@@ -93,17 +102,22 @@ class FilterScript(object):
         self.mlp_in = mlp_in
         self.__no_file_in = False
         self.file_out = file_out
+        # Lists of results (dicts) for every measurement filter, in order
         self.geometry = None
         self.topology = None
         self.hausdorff_distance = None
         self.parse_geometry = False
         self.parse_topology = False
         self.parse_hausdorff = False
+        # Wall time of every applied filter (see profile)
+        self.filter_times = None
+        self.parse_profile = False
         # Process input files
         # Process project files first
 
         # TODO: test to make sure this works with "bunny"; should work fine!
         if self.mlp_in is not None:
+            import xml.etree.ElementTree as ET
             # make a list if it isn't already
             self.mlp_in = util.make_list(self.mlp_in)
             for val in self.mlp_in:
@@ -142,7 +156,7 @@ class FilterScript(object):
                 #self.layer_stack[self.last_layer() + 1] = self.last_layer()
                 # If the mesh file extension is stl, change to that layer and
                 # run clean.merge_vert
-                if fext == 'stl':
+                if fext == 'stl' and _weld_tolerance(self.weld_stl) is None:
                     self.__stl_layers.append(self.current_layer())
         # If some input files were stl, we need to change back to the last layer
         # If the mesh file extension is stl, change to that layer and
@@ -203,17 +217,39 @@ class FilterScript(object):
         # TODO: raise exception here instead?
         if not self.filters:
             print('WARNING: no filters to save to file!')
+        start = time.perf_counter()
+        script_text = ''.join(self.opening + self.filters + self.closing)
         script_file_descriptor = open(script_file, 'w')
-        script_file_descriptor.write(''.join(self.opening + self.filters + self.closing))
+        script_file_descriptor.write(script_text)
         script_file_descriptor.close()
+        hooks.emit('script_build', script_file=script_file, filter_num=len(self.filters),
+                   bytes=len(script_text), seconds=time.perf_counter() - start)
 
+    @trace.traced()
     def run_script(self, log=None, ml_log=None, mlp_out=None, overwrite=False,
-                   file_out=None, output_mask=None, script_file=None, print_meshlabserver_output=True):
+                   file_out=None, output_mask=None, script_file=None, print_meshlabserver_output=True,
+                   callback=None):
         """ Run the script
+
+        If parse_geometry, parse_topology or parse_hausdorff is set and ml_log
+        is None, meshlabserver's output is parsed live while it is running.
+
+        Args:
+            callback (function): optional function called while meshlabserver
+                is running as callback(event, value). event is 'line' for
+                each line of meshlabserver output (value is the line), or
+                'geometry', 'topology', 'hausdorff_distance' or
+                'filter_times' as soon as a measurement result or filter
+                is complete (value is the result or filter time dict,
+                already tagged with filter_num and layer_num; only when
+                ml_log is None). If callback
+                returns True meshlabserver is terminated, e.g. when an
+                intermediate measurement is already out of tolerance.
         """
 
         temp_script = False
-        temp_ml_log = False
+        parse = (self.parse_geometry or self.parse_topology or self.parse_hausdorff or
+                 self.parse_profile)
 
         if self.__no_file_in:
             # If no input files are provided, create a dummy file
@@ -235,36 +271,191 @@ class FilterScript(object):
             self.save_to_file(temp_script_file.name)
             script_file = temp_script_file.name
 
-        if (self.parse_geometry or self.parse_topology or self.parse_hausdorff) and (ml_log is None):
-            # create temp ml_log
-            temp_ml_log = True
-            ml_log_file = tempfile.NamedTemporaryFile(delete=False, suffix='.txt')
-            ml_log_file.close()
-            ml_log = ml_log_file.name
+        line_callback = None
+        parser = None
+        if (parse and ml_log is None) or callback is not None:
+            # Parse meshlabserver's output as it is produced
+            filter_nums = {kind: self.measure_filter_nums(kind)
+                           for kind in compute.MEASURE_FILTERS}
+            abort = []
+
+            def on_result(kind, result):
+                if kind == 'filter_times':
+                    self.match_filter_times(parser.filter_times)
+                else:
+                    index = len(getattr(parser, kind)) - 1
+                    if index < len(filter_nums[kind]):
+                        self.tag_result(result, filter_nums[kind][index])
+                if callback is not None and callback(kind, result):
+                    abort.append(kind)
+
+            def line_callback(line):
+                if ml_log is None:
+                    start = time.perf_counter()
+                    parser.feed(line)
+                    parser.seconds += time.perf_counter() - start
+                if callback is not None and callback('line', line):
+                    abort.append('line')
+                return bool(abort)
+
+            def on_spawn(event, info):
+                # run retries after an error; only keep the last attempt
+                if threading.get_ident() == thread:
+                    parser.reset()
+
+            parser = compute.LogParser(on_result=on_result)
+            thread = threading.get_ident()
+            hooks.register('spawn', on_spawn)
         if file_out is None:
             file_out = self.file_out
 
-        run(script=script_file, log=log, ml_log=ml_log,
-            mlp_in=self.mlp_in, mlp_out=mlp_out, overwrite=overwrite,
-            file_in=self.file_in, file_out=file_out, output_mask=output_mask, ml_version=self.ml_version,
-            print_meshlabserver_output=print_meshlabserver_output)
+        try:
+            run(script=script_file, log=log, ml_log=ml_log,
+                mlp_in=self.mlp_in, mlp_out=mlp_out, overwrite=overwrite,
+                file_in=self.file_in, file_out=file_out, output_mask=output_mask,
+                ml_version=self.ml_version, print_meshlabserver_output=print_meshlabserver_output,
+                weld_stl=self.weld_stl, line_callback=line_callback)
+        finally:
+            if line_callback is not None:
+                hooks.unregister('spawn', on_spawn)
 
         # Parse output
-        # TODO: record which layer this is associated with?
-        if self.parse_geometry:
-            self.geometry = compute.parse_geometry(ml_log, log, print_output=print_meshlabserver_output)
-        if self.parse_topology:
-            self.topology = compute.parse_topology(ml_log, log, print_output=print_meshlabserver_output)
-        if self.parse_hausdorff:
-            self.hausdorff_distance = compute.parse_hausdorff(ml_log, log, print_output=print_meshlabserver_output)
+        if parse:
+            if ml_log is None:
+                parser.close()
+            else:
+                parser = compute.parse_log(ml_log)
+            self.parse_results(parser, log=log, print_output=print_meshlabserver_output)
+            hooks.emit('parse', source='stdout' if ml_log is None else ml_log,
+                       lines=parser.line_num, bytes=parser.byte_num, seconds=parser.seconds,
+                       results=sum(len(getattr(parser, kind)) for kind in compute.MEASURE_FILTERS),
+                       filter_times=parser.filter_times)
 
         # Delete temp files
         if self.__no_file_in:
             os.remove(temp_file_in_file.name)
         if temp_script:
             os.remove(temp_script_file.name)
-        if temp_ml_log:
-            os.remove(ml_log_file.name)
+
+    def measure_filter_nums(self, kind):
+        """ Return the indexes in self.filters of the filters that produce
+        the given kind of measurement (see compute.MEASURE_FILTERS) """
+        filter_name = compute.MEASURE_FILTERS[kind]
+        return [index for index, filter_xml in enumerate(self.filters)
+                if 'name="%s"' % filter_name in filter_xml]
+
+    def tag_result(self, result, filter_num):
+        """ Set the filter_num and layer_num of a measurement result """
+        result['filter_num'] = filter_num
+        if filter_num < len(self.filter_layers):
+            result['layer_num'] = self.filter_layers[filter_num]
+
+    def match_filter_times(self, filter_times):
+        """ Set the filter_num and layer_num of filter times, in order.
+
+        Each time is matched to the next filter in self.filters with the
+        same name. If the name is not found the time is assumed to belong
+        to the next filter.
+        """
+        names = [util.filter_name(filter_xml) for filter_xml in self.filters]
+        filter_num = 0
+        for entry in filter_times:
+            if filter_num >= len(names):
+                break
+            if entry['name'] in names[filter_num:]:
+                filter_num = names.index(entry['name'], filter_num)
+            self.tag_result(entry, filter_num)
+            filter_num += 1
+
+    def parse_results(self, parser, log=None, print_output=False):
+        """ Store the results of a compute.LogParser in the geometry,
+        topology, hausdorff_distance and filter_times lists.
+
+        Each result is tagged with the index of the filter (in self.filters)
+        that produced it and the layer that filter was applied to, by
+        matching results to measurement filters in order.
+        """
+        self.match_filter_times(parser.filter_times)
+        self.filter_times = parser.filter_times
+        for kind in compute.MEASURE_FILTERS:
+            results = getattr(parser, kind)
+            for result, filter_num in zip(results, self.measure_filter_nums(kind)):
+                self.tag_result(result, filter_num)
+            if getattr(self, 'parse_' + kind.split('_')[0]):
+                setattr(self, kind, results)
+                compute.print_results(results, log, print_output,
+                                      width=27 if kind == 'geometry' else 16)
+        return None
+
+    def profile(self, ml_log=None, log=None, print_output=True, **kwargs):
+        """ Per filter wall time profile of the script.
+
+        The times are taken from the "Applied filter ... in ... msec" lines
+        output by meshlabserver and mapped back to entries in self.filters.
+
+        Args:
+            ml_log (str or list): meshlabserver log file of a previous run
+                of this script. If a list of log files is provided (e.g.
+                from running the script on many input files) the times are
+                aggregated across all runs. If None the script is run and
+                its output parsed.
+            log (str): filename to log the report
+            print_output (bool): print the report to stdout if log is None
+            **kwargs: passed to run_script if ml_log is None
+
+        Returns:
+            list: one dict per filter, slowest first; see
+                compute.profile_report and compute.aggregate_profiles
+        """
+        if ml_log is None:
+            parse_profile = self.parse_profile
+            self.parse_profile = True
+            try:
+                self.run_script(log=log, **kwargs)
+            finally:
+                self.parse_profile = parse_profile
+            report = compute.profile_report(self.filter_times)
+        else:
+            reports = []
+            for val in util.make_list(ml_log):
+                parser = compute.parse_log(val)
+                self.match_filter_times(parser.filter_times)
+                reports.append(parser.filter_times)
+            if len(reports) == 1:
+                report = compute.profile_report(reports[0])
+            else:
+                report = compute.aggregate_profiles(reports)
+        compute.print_profile(report, log, print_output)
+        return report
+
+    def dry_run(self, proxy=None, proxy_faces=None, log=None, print_output=True):
+        """ Simulate the script on small proxy meshes without running
+        meshlabserver; see the plan module.
+
+        Transforms, function filters, selections, deletions and layer
+        operations are run natively on the proxies, so bad parameters
+        (e.g. a selection that deletes everything, or a scale that gives
+        the wrong size) show up in milliseconds.
+
+        Args:
+            proxy: None to decimate the inputs; a filename, list of
+                filenames or list of (vertices, faces) tuples of prepared
+                proxies, one per input
+            proxy_faces (int): maximum faces of proxies made from the
+                inputs; default plan.PROXY_FACES
+            log (str): filename to log the report
+            print_output (bool): print the report to stdout if log is None
+
+        Returns:
+            dict: estimated per layer counts and aabb, and per filter
+                counts and no-op flags; see plan.dry_run
+        """
+        from . import plan
+
+        if proxy_faces is None:
+            proxy_faces = plan.PROXY_FACES
+        return plan.dry_run(self, proxy=proxy, proxy_faces=proxy_faces, log=log,
+                            print_output=print_output)
 
 
 def handle_error(program_name, cmd, log=None):
@@ -316,10 +507,19 @@ def handle_error(program_name, cmd, log=None):
     return break_now
 
 
+def _weld_tolerance(weld_stl):
+    """ Welding tolerance of a weld_stl argument (True or a tolerance), or
+    None if stl files are merged by the script """
+    if weld_stl is None or weld_stl is False:
+        return None
+    return 0.0 if weld_stl is True else float(weld_stl)
+
+
+@trace.traced()
 def run(script='TEMP3D_default.mlx', log=None, ml_log=None,
         mlp_in=None, mlp_out=None, overwrite=False, file_in=None,
         file_out=None, output_mask=None, cmd=None, ml_version=ML_VERSION,
-        print_meshlabserver_output=True):
+        print_meshlabserver_output=True, weld_stl=False, line_callback=None):
     """Run meshlabserver in a subprocess.
 
     Args:
@@ -368,6 +568,18 @@ def run(script='TEMP3D_default.mlx', log=None, ml_log=None,
             will override all other arguements except for log.
         print_meshlabserver_output (bool): Pass meshlabserver's output to stdout; useful for debugging.
                                            Only used if log is None.
+        weld_stl (bool or float): if True or a welding tolerance, stl input
+            files are replaced with a welded binary ply (see
+            mesh_io.welded_ply), which is cached next to the source file.
+            Use together with begin(weld_stl=...) or
+            FilterScript(weld_stl=...) so that clean.merge_vert is not
+            added to the script. Requires NumPy.
+        line_callback (function): if not None, meshlabserver's stdout and
+            stderr are read through a pipe and line_callback(line) is
+            called for each line as it is output, e.g. to feed a
+            compute.LogParser. If it returns True meshlabserver is
+            terminated and its return code is returned without any
+            error handling.
 
     Notes:
         Meshlabserver can't handle spaces in paths or filenames (on Windows at least; haven't tested on other platforms). Enclosing the name in quotes or escaping the space has no effect.
@@ -406,6 +618,10 @@ def run(script='TEMP3D_default.mlx', log=None, ml_log=None,
                 elif val == 'bunny_raw':
                     cmd += ' -i "%s"' % os.path.join(THIS_MODULEPATH, os.pardir,
                                                      'models', 'bunny_raw(-1250Y).ply')
+                elif (_weld_tolerance(weld_stl) is not None and
+                      os.path.splitext(val)[1][1:].strip().lower() == 'stl'):
+                    from . import mesh_io
+                    cmd += ' -i "%s"' % mesh_io.welded_ply(val, _weld_tolerance(weld_stl))
                 else:
                     cmd += ' -i "%s"' % val
         if file_out is not None:
@@ -437,22 +653,75 @@ def run(script='TEMP3D_default.mlx', log=None, ml_log=None,
         else:
             log_file = open(os.devnull, 'w')
     while True:
-        # TODO: test if shell=True is really needed
-        return_code = subprocess.call(cmd, shell=True,
-                                      stdout=log_file, stderr=log_file,
-                                      universal_newlines=True)
+        aborted = False
+        hooks.emit('spawn', cmd=cmd, file_in=file_in, file_out=file_out, time=time.time())
+        start = time.perf_counter()
+        if line_callback is None:
+            # TODO: test if shell=True is really needed
+            process = subprocess.Popen(cmd, shell=True, stdout=log_file, stderr=log_file,
+                                       universal_newlines=True)
+            return_code, rusage = hooks.wait(process)
+        else:
+            return_code, aborted, rusage = _run_live(cmd, line_callback, log_file)
+        hooks.emit('exit', cmd=cmd, return_code=return_code, aborted=aborted,
+                   seconds=time.perf_counter() - start, rusage=rusage)
         if log is not None:
             log_file.close()
-        if (return_code == 0) or handle_error(program_name='MeshLab', cmd=cmd, log=log):
+        if (return_code == 0) or aborted or handle_error(program_name='MeshLab', cmd=cmd, log=log):
             break
     if log is not None:
         log_file = open(log, 'a')
         log_file.write('***END OF MESHLAB STDOUT & STDERR***\n')
         log_file.write('meshlabserver return code = %s\n\n' % return_code)
         log_file.close()
+    if hooks.active('output'):
+        for val in util.make_list(file_out) + util.make_list(mlp_out):
+            if val is not None and os.path.exists(val):
+                hooks.emit('output', file_out=val, bytes=os.path.getsize(val))
     return return_code
 
 
+def run_live(cmd, line_callback, log_file=None):
+    """Run a shell command, passing each line of its output to a callback
+    while it is running.
+
+    Args:
+        cmd (str): command line to run
+        line_callback (function): called with each line of stdout and
+            stderr. If it returns True the process is terminated.
+        log_file (file): open file to copy the output to. If None the
+            output is printed to stdout.
+
+    Returns:
+        return_code (int): return code of the process
+        aborted (bool): True if the process was terminated by line_callback
+    """
+    return _run_live(cmd, line_callback, log_file)[:2]
+
+
+def _run_live(cmd, line_callback, log_file=None):
+    """ run_live, also returning the resource usage (see hooks.wait) """
+    if os.name == 'posix':
+        # Replace the shell so that terminate() reaches the program itself
+        cmd = 'exec ' + cmd
+    process = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE,
+                               stderr=subprocess.STDOUT, universal_newlines=True,
+                               bufsize=1)
+    aborted = False
+    for line in iter(process.stdout.readline, ''):
+        if log_file is None:
+            print(line, end='')
+        else:
+            log_file.write(line)
+        if line_callback(line):
+            aborted = True
+            process.terminate()
+            break
+    process.stdout.close()
+    return_code, rusage = hooks.wait(process)
+    return return_code, aborted, rusage
+
+
 def find_texture_files(fbasename, log=None):
     """Finds the filenames of the referenced texture file(s) (and material
     file for obj) for the mesh.
@@ -485,17 +754,31 @@ def find_texture_files(fbasename, log=None):
     face_colors = False
     if fext == 'obj':
         # Material Format: mtllib ./model_mesh.obj.mtl
-        with open(fbasename, 'r') as fread:
-            for line in fread:
-                if 'mtllib' in line:
-                    material_file = os.path.basename(line.split()[1])
-                    break
+        try:
+            from . import mesh_io
+        except ImportError:  # NumPy is not available; scan line by line
+            mesh_io = None
+        if mesh_io is not None:
+            mtllib = mesh_io.obj_header(fbasename)['mtllib']
+            if mtllib:
+                material_file = os.path.basename(mtllib[0].split()[0])
+        else:
+            with open(fbasename, 'r') as fread:
+                for line in fread:
+                    if 'mtllib' in line:
+                        material_file = os.path.basename(line.split()[1])
+                        break
         if material_file is not None:
             # Texture Format: map_Kd model_texture.jpg
-            with open(material_file, 'r') as fread:
-                for line in fread:
-                    if 'map_Kd' in line:
-                        texture_files.append(os.path.basename(line.split()[1]))
+            material_path = os.path.join(os.path.dirname(fbasename), material_file)
+            if mesh_io is not None:
+                texture_files = [os.path.basename(val) for val in
+                                 mesh_io.read_mtl_textures(material_path)]
+            else:
+                with open(material_path, 'r') as fread:
+                    for line in fread:
+                        if 'map_Kd' in line:
+                            texture_files.append(os.path.basename(line.split()[1]))
     elif fext == 'ply':
         # Texture Format: comment TextureFile model_texture.jpg
         # This works for MeshLab & itSeez3D, but may not work for
@@ -522,6 +805,7 @@ def find_texture_files(fbasename, log=None):
         # Texture Format:   <image id="texture0" name="texture0">
         #               <init_from>model_texture.jpg</init_from>
         #           </image>
+        import xml.etree.ElementTree as ET
         namespace = 'http://www.collada.org/2005/11/COLLADASchema'
         tree = ET.parse(fbasename)
         #root = tree.getroot()
@@ -533,6 +817,7 @@ def find_texture_files(fbasename, log=None):
     elif fext == 'x3d':
         # Texture Format: <ImageTexture url="model_texture.jpg"/>
         #ns = 'http://www.w3.org/2001/XMLSchema-instance'
+        import xml.etree.ElementTree as ET
         tree = ET.parse(fbasename)
         #root = tree.getroot()
         #print('root = ', root)
@@ -620,10 +905,13 @@ def default_output_mask(file_out, texture=False, vert_normals=False, vert_colors
     return output_mask
 
 
-def begin(script='TEMP3D_default.mlx', file_in=None, mlp_in=None):
+def begin(script='TEMP3D_default.mlx', file_in=None, mlp_in=None, weld_stl=False):
     """Create new mlx script and write opening tags.
 
-    Performs special processing on stl files.
+    Performs special processing on stl files. If weld_stl is True (or a
+    welding tolerance), stl input files are not merged in the script;
+    instead pass the same weld_stl to run so that they are welded natively
+    before meshlabserver loads them.
 
     If no input files are provided this will create a dummy
     file and delete it as the first filter. This works around
@@ -643,6 +931,7 @@ def begin(script='TEMP3D_default.mlx', file_in=None, mlp_in=None):
 
     # Process project files first
     if mlp_in is not None:
+        import xml.etree.ElementTree as ET
         # make a list if it isn't already
         if not isinstance(mlp_in, list):
             mlp_in = [mlp_in]
@@ -670,7 +959,8 @@ def begin(script='TEMP3D_default.mlx', file_in=None, mlp_in=None):
             last_layer += 1
             # If the mesh file extension is stl, change to that layer and
             # run clean.merge_vert
-            if os.path.splitext(val)[1][1:].strip().lower() == 'stl':
+            if (os.path.splitext(val)[1][1:].strip().lower() == 'stl' and
+                    _weld_tolerance(weld_stl) is None):
                 layers.change(script, current_layer)
                 clean.merge_vert(script)
                 stl = True
@@ -10,6 +10,8 @@ from . import util
 def muparser_ref():
     """Reference documentation for muparser.
 
+    See the muparser module for a native (NumPy) evaluator of this dialect.
+
     muparser is used by many internal MeshLab filters, specifically those
     where you can control parameters via a mathematical expression. Examples:
         transform.function
@@ -331,7 +333,6 @@ def vq_function(script, function='vi', normalize=False, color=False):
     function function to generate new Quality for every vertex
     normalize if checked normalize all quality values in range [0..1]
     color if checked map quality generated values into per-vertex color
-
     """
     filter_xml = ''.join([
         '  <filter name="Per Vertex Quality Function">\n',
@@ -0,0 +1,585 @@
+""" MeshLabXML native muparser evaluator
+
+Parses the muparser expressions used by the function filters (see
+mp_func.muparser_ref) and compiles them to vectorized NumPy code, so pure
+per vertex math can run in process on loaded meshes instead of launching
+meshlabserver:
+
+    vertices, faces = mesh_io.read_ply('in.ply')
+    variables = muparser.vertex_variables(vertices)
+    vertices = muparser.vert_function(variables, z_func='z + 0.1*sin(x)')
+
+Both operator dialects are accepted: '&&', '||' and 'a ? b : c' (muparser
+2.x, ml_version 2016.12) as well as 'and', 'or' and 'if(a, b, c)' (muparser
+1.3, ml_version 1.3.4BETA). Comparison and logical operators return 1 or 0.
+As in muparser 2.2, unary minus binds looser than '^' (-x^2 is -(x^2)) and
+'^' is right associative. Evaluation follows C double arithmetic, so
+division by zero gives inf or nan instead of raising.
+
+Compiled expressions are kept in a bounded LRU cache (CACHE), so batch
+jobs applying the same expressions to many meshes only parse and compile
+each one once; cache_info() reports the hit and miss counters for sizing
+it (CACHE.resize).
+
+Requires NumPy.
+"""
+
+import re
+import sys
+import math
+import threading
+import collections
+
+import numpy as np
+
+from . import util
+
+CACHE_SIZE = 256
+"""int: default maximum number of compiled expressions kept in CACHE
+"""
+
+CONSTANTS = {'_pi': math.pi, '_e': math.e}
+"""dict: built-in muparser constants
+"""
+
+FUNCTIONS = {
+    'sin': ('_np.sin', 1), 'cos': ('_np.cos', 1), 'tan': ('_np.tan', 1),
+    'asin': ('_np.arcsin', 1), 'acos': ('_np.arccos', 1), 'atan': ('_np.arctan', 1),
+    'atan2': ('_np.arctan2', 2), 'sinh': ('_np.sinh', 1), 'cosh': ('_np.cosh', 1),
+    'tanh': ('_np.tanh', 1), 'asinh': ('_np.arcsinh', 1), 'acosh': ('_np.arccosh', 1),
+    'atanh': ('_np.arctanh', 1), 'log2': ('_np.log2', 1), 'log10': ('_np.log10', 1),
+    'log': ('_np.log10', 1), 'ln': ('_np.log', 1), 'exp': ('_np.exp', 1),
+    'sqrt': ('_np.sqrt', 1), 'sign': ('_np.sign', 1), 'rint': ('_np.rint', 1),
+    'abs': ('_np.abs', 1), 'min': ('_min', None), 'max': ('_max', None),
+    'sum': ('_sum', None), 'avg': ('_avg', None), 'if': ('_if', 3)}
+"""dict: built-in functions; values are the NumPy code and the number of
+arguments (None for any number)
+"""
+
+BINARY_OPERATORS = {
+    '+': '_np.add', '-': '_np.subtract', '*': '_np.multiply', '/': '_np.divide',
+    '^': '_np.power', '<': '_np.less', '>': '_np.greater', '<=': '_np.less_equal',
+    '>=': '_np.greater_equal', '==': '_np.equal', '!=': '_np.not_equal',
+    '&&': '_and', 'and': '_and', '||': '_or', 'or': '_or'}
+"""dict: binary operators and their NumPy code
+"""
+
+_TOKEN_RE = re.compile(r'\s*(?:(?P<number>(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)|'
+                       r'(?P<name>[A-Za-z_][A-Za-z0-9_]*)|'
+                       r'(?P<op>&&|\|\||<=|>=|==|!=|[-+*/^<>?:(),]))')
+
+
+def _constant(value):
+    """ Code and value node for a constant """
+    value = float(value)
+    if math.isnan(value):
+        return '_np.nan', value
+    if math.isinf(value):
+        return ('-_np.inf' if value < 0 else '_np.inf'), value
+    return repr(value), value
+
+
+def _float(value):
+    return np.multiply(value, 1.0)
+
+
+def _if(test, then_value, else_value):
+    return np.where(np.not_equal(test, 0), then_value, else_value)
+
+
+def _and(left, right):
+    return _float(np.logical_and(np.not_equal(left, 0), np.not_equal(right, 0)))
+
+
+def _or(left, right):
+    return _float(np.logical_or(np.not_equal(left, 0), np.not_equal(right, 0)))
+
+
+def _min(*args):
+    return np.minimum.reduce(np.broadcast_arrays(*args))
+
+
+def _max(*args):
+    return np.maximum.reduce(np.broadcast_arrays(*args))
+
+
+def _sum(*args):
+    return np.add.reduce(np.broadcast_arrays(*args))
+
+
+def _avg(*args):
+    return _sum(*args) / float(len(args))
+
+
+_RUNTIME = {'_np': np, '_float': _float, '_if': _if, '_and': _and, '_or': _or,
+            '_min': _min, '_max': _max, '_sum': _sum, '_avg': _avg,
+            '__builtins__': {}}
+
+
+def tokenize(text):
+    """ Split a muparser expression into (kind, value, position) tokens;
+    kind is 'number', 'name' or 'op' """
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if match is None:
+            raise ValueError('Unexpected character "%s" at position %d in "%s"' % (
+                text[position:].strip()[:1], position, text))
+        kind = match.lastgroup
+        value = match.group(kind)
+        if kind == 'name' and value in ('and', 'or'):
+            kind = 'op'
+        tokens.append((kind, value, match.start(kind)))
+        position = match.end()
+    return tokens
+
+
+class _Parser(object):
+    """ Recursive descent parser producing NumPy code; constant
+    subexpressions are evaluated while parsing """
+    def __init__(self, text, tokens=None):
+        self.text = text
+        self.tokens = tokenize(text) if tokens is None else tokens
+        self.index = 0
+        self.variables = set()
+
+    def error(self, message):
+        position = (self.tokens[self.index][2] if self.index < len(self.tokens)
+                    else len(self.text))
+        raise ValueError('%s at position %d in "%s"' % (message, position, self.text))
+
+    def peek(self):
+        if self.index < len(self.tokens):
+            return self.tokens[self.index][1]
+        return None
+
+    def take(self, expected=None):
+        if self.index >= len(self.tokens):
+            self.error('Unexpected end of expression')
+        kind, value, _ = self.tokens[self.index]
+        if expected is not None and value != expected:
+            self.error('Expected "%s"' % expected)
+        self.index += 1
+        return kind, value
+
+    def parse(self):
+        node = self.ternary()
+        if self.index < len(self.tokens):
+            self.error('Unexpected "%s"' % self.peek())
+        return node
+
+    @staticmethod
+    def call(code, args):
+        """ Node for a call; args are (code, constant value or None) """
+        node_code = '%s(%s)' % (code, ', '.join(arg[0] for arg in args))
+        if all(arg[1] is not None for arg in args):
+            with np.errstate(all='ignore'):
+                return _constant(eval(node_code, dict(_RUNTIME)))
+        return node_code, None
+
+    def ternary(self):
+        test = self.binary(0)
+        if self.peek() != '?':
+            return test
+        self.take('?')
+        then_value = self.ternary()
+        self.take(':')
+        return self.call('_if', [test, then_value, self.ternary()])
+
+    _LEVELS = (('||', 'or'), ('&&', 'and'), ('<=', '>=', '!=', '==', '>', '<'),
+               ('+', '-'), ('*', '/'))
+
+    def binary(self, level):
+        if level == len(self._LEVELS):
+            return self.unary()
+        node = self.binary(level + 1)
+        while self.peek() in self._LEVELS[level] and self.tokens[self.index][0] == 'op':
+            _, operator = self.take()
+            code = BINARY_OPERATORS[operator]
+            right = self.binary(level + 1)
+            if level == 2:
+                node = self.call('_float', [self.call(code, [node, right])])
+            else:
+                node = self.call(code, [node, right])
+        return node
+
+    def unary(self):
+        if self.peek() == '-':
+            self.take()
+            return self.call('_np.negative', [self.unary()])
+        if self.peek() == '+':
+            self.take()
+            return self.unary()
+        return self.power()
+
+    def power(self):
+        node = self.primary()
+        if self.peek() == '^':
+            self.take()
+            node = self.call('_np.power', [node, self.unary()])
+        return node
+
+    def primary(self):
+        kind, value = self.take()
+        if kind == 'number':
+            return _constant(value)
+        if value == '(':
+            node = self.ternary()
+            self.take(')')
+            return node
+        if kind != 'name':
+            self.index -= 1
+            self.error('Unexpected "%s"' % value)
+        if self.peek() == '(':
+            if value not in FUNCTIONS:
+                self.index -= 1
+                self.error('Unknown function "%s"' % value)
+            self.take('(')
+            args = [self.ternary()]
+            while self.peek() == ',':
+                self.take(',')
+                args.append(self.ternary())
+            self.take(')')
+            code, arg_num = FUNCTIONS[value]
+            if arg_num is not None and len(args) != arg_num:
+                self.index -= 1
+                self.error('%s takes %d arguments, %d given' % (value, arg_num, len(args)))
+            return self.call(code, args)
+        if value in CONSTANTS:
+            return _constant(CONSTANTS[value])
+        self.variables.add(value)
+        return '_v[%r]' % value, None
+
+
+class Expression(object):
+    """ A compiled muparser expression.
+
+    Attributes:
+        text (str): the expression
+        source (str): generated NumPy code
+        variables (frozenset): names of the variables used
+    """
+    def __init__(self, text, tokens=None):
+        self.text = str(text)
+        parser = _Parser(self.text, tokens)
+        self.source, self.constant = parser.parse()
+        self.variables = frozenset(parser.variables)
+        self._function = eval('lambda _v: ' + self.source, dict(_RUNTIME))
+
+    def __repr__(self):
+        return 'Expression(%r)' % self.text
+
+    def __call__(self, variables, size=None):
+        """ Evaluate the expression.
+
+        Args:
+            variables (dict): arrays (or scalars) by variable name, e.g.
+                from vertex_variables
+            size (int): if not None, the result is broadcast to this length
+
+        Returns:
+            float64 array (or float if size is None and the expression
+            only uses scalars)
+        """
+        missing = self.variables.difference(variables)
+        if missing:
+            raise ValueError('Unknown variable(s) %s in "%s"' % (
+                ', '.join(sorted(missing)), self.text))
+        with np.errstate(all='ignore'):
+            result = self._function(variables)
+        if size is not None:
+            result = np.broadcast_to(np.asarray(result, dtype=np.float64), (size,))
+        return result
+
+
+def normalize(text):
+    """ Expression text with its tokens separated by single spaces, so
+    expressions differing only in whitespace compare equal """
+    return ' '.join(token[1] for token in tokenize(str(text)))
+
+
+class ExpressionCache(object):
+    """ Bounded least recently used cache of compiled expressions, keyed by
+    the normalized expression text. Raw texts already seen map directly to
+    their key, so a repeated lookup does not tokenize the text again.
+
+    Compiled expressions are immutable, so one cache is shared by all
+    threads. Each worker process has its own cache.
+
+    Args:
+        maxsize (int): maximum number of expressions; 0 disables caching
+
+    Attributes:
+        hits, misses, evictions (int): counters since the last clear
+    """
+    def __init__(self, maxsize=CACHE_SIZE):
+        self.maxsize = maxsize
+        self._entries = collections.OrderedDict()  # key: (Expression, raw texts)
+        self._raw = {}  # raw text: key, so hits skip tokenizing
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, text):
+        """ Return the compiled Expression for text, compiling it on a miss """
+        text = str(text)
+        with self._lock:
+            key = self._raw.get(text)
+            if key is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key][0]
+        tokens = tokenize(text)
+        key = ' '.join(token[1] for token in tokens)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                # Same expression, spelled differently
+                self._entries.move_to_end(key)
+                self._raw[text] = key
+                entry[1].append(text)
+                self.hits += 1
+                return entry[0]
+            self.misses += 1
+        # Compile outside the lock; a concurrent miss on the same key just
+        # compiles it twice
+        expression = Expression(text, tokens)
+        with self._lock:
+            if self.maxsize > 0 and key not in self._entries:
+                self._entries[key] = (expression, [text])
+                self._raw[text] = key
+                self._shrink(self.maxsize)
+        return expression
+
+    def _evict(self, key):
+        """ Remove an entry and its raw texts """
+        for text in self._entries.pop(key)[1]:
+            self._raw.pop(text, None)
+
+    def _shrink(self, maxsize):
+        """ Evict the least recently used entries down to maxsize """
+        while len(self._entries) > max(maxsize, 0):
+            self._evict(next(iter(self._entries)))
+            self.evictions += 1
+
+    def resize(self, maxsize):
+        """ Change the maximum size, evicting the least recently used
+        expressions if needed """
+        with self._lock:
+            self.maxsize = maxsize
+            self._shrink(maxsize)
+
+    def clear(self):
+        """ Remove all expressions and reset the counters """
+        with self._lock:
+            self._entries.clear()
+            self._raw.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def info(self):
+        """ Counters as a dict with keys hits, misses, evictions, size,
+        maxsize and hit_rate """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'size': len(self._entries), 'maxsize': self.maxsize,
+                    'hit_rate': self.hits / float(lookups) if lookups else 0.0}
+
+
+CACHE = ExpressionCache()
+"""ExpressionCache: cache used by compile_expression and the native filters
+"""
+
+
+def compile_expression(text, cache=True):
+    """ Parse a muparser expression and compile it to an Expression.
+
+    Args:
+        text (str): muparser expression
+        cache (bool): use CACHE, so repeated expressions are only compiled
+            once
+    """
+    if cache:
+        return CACHE.get(text)
+    return Expression(text)
+
+
+def cache_info():
+    """ Hit and miss counters of CACHE; see ExpressionCache.info """
+    return CACHE.info()
+
+
+def evaluate(text, variables, size=None):
+    """ Compile and evaluate a muparser expression; see Expression """
+    return compile_expression(text)(variables, size)
+
+
+def vertex_variables(vertices, normals=None, colors=None, quality=None, selected=None,
+                     attributes=None):
+    """ Per vertex variables of a mesh, as used by the vertex function
+    filters.
+
+    Args:
+        vertices (array): (N, 3) vertex coordinates (x, y, z)
+        normals (array): optional (N, 3) vertex normals (nx, ny, nz)
+        colors (array): optional (N, 3) or (N, 4) colors in [0, 255] (r, g,
+            b, a); defaults to opaque white
+        quality (array): optional (N,) vertex quality (q); defaults to 0
+        selected (array): optional (N,) bool selection (vsel); defaults to
+            none selected
+        attributes (dict): optional custom per vertex attribute arrays by
+            name (see mp_func.vert_attr)
+
+    Returns:
+        dict: arrays by variable name, plus vi (vertex index)
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    vert_num = len(vertices)
+    variables = {'x': vertices[:, 0], 'y': vertices[:, 1], 'z': vertices[:, 2],
+                 'vi': np.arange(vert_num, dtype=np.float64)}
+    if normals is None:
+        normals = np.zeros((vert_num, 3))
+    if colors is None:
+        colors = np.full((vert_num, 4), 255.0)
+    colors = np.asarray(colors, dtype=np.float64)
+    for index, name in enumerate(('nx', 'ny', 'nz')):
+        variables[name] = np.asarray(normals, dtype=np.float64)[:, index]
+    for index, name in enumerate(('r', 'g', 'b', 'a')):
+        variables[name] = colors[:, index] if index < colors.shape[1] else np.full(vert_num, 255.0)
+    variables['q'] = (np.zeros(vert_num) if quality is None
+                      else np.asarray(quality, dtype=np.float64))
+    variables['vsel'] = (np.zeros(vert_num) if selected is None
+                         else np.asarray(selected, dtype=np.float64))
+    if attributes is not None:
+        for name, values in attributes.items():
+            variables[name] = np.asarray(values, dtype=np.float64)
+    return variables
+
+
+def face_variables(vertices, faces, variables=None, attributes=None):
+    """ Per face variables of a mesh, as used by the face function filters.
+
+    Args:
+        vertices (array): (N, 3) vertex coordinates
+        faces (array): (M, 3) triangle vertex indices
+        variables (dict): per vertex variables (see vertex_variables);
+            x0, nx1, a2, q2 etc. are taken from these
+        attributes (dict): optional custom per face attribute arrays
+
+    Returns:
+        dict: arrays by variable name, plus fi (face index)
+    """
+    if variables is None:
+        variables = vertex_variables(vertices)
+    faces = np.asarray(faces)
+    face_vars = {'fi': np.arange(len(faces), dtype=np.float64)}
+    for name in ('x', 'y', 'z', 'nx', 'ny', 'nz', 'r', 'g', 'b', 'a', 'q'):
+        for corner in range(3):
+            face_vars['%s%d' % (name, corner)] = variables[name][faces[:, corner]]
+    if attributes is not None:
+        for name, values in attributes.items():
+            face_vars[name] = np.asarray(values, dtype=np.float64)
+    return face_vars
+
+
+def vert_function(variables, x_func='x', y_func='y', z_func='z', selected=False):
+    """ Native transform.vert_function.
+
+    Args:
+        variables (dict): per vertex variables (see vertex_variables)
+        x_func, y_func, z_func (str): muparser functions for the new
+            coordinates
+        selected (bool): only move the selected vertices (vsel)
+
+    Returns:
+        (N, 3) array of new vertex coordinates
+    """
+    size = len(variables['x'])
+    vertices = np.stack([compile_expression(func)(variables, size)
+                         for func in (x_func, y_func, z_func)], axis=1)
+    if selected:
+        keep = np.not_equal(variables['vsel'], 0)
+        old = np.stack([variables['x'], variables['y'], variables['z']], axis=1)
+        vertices = np.where(keep[:, None], vertices, old)
+    return vertices
+
+
+def vert_color_function(variables, red=255, green=255, blue=255, alpha=255, color=None):
+    """ Native vert_color.function.
+
+    Args:
+        variables (dict): per vertex variables (see vertex_variables)
+        red, green, blue, alpha (str): muparser functions for each channel,
+            in [0, 255]
+        color (str): color name; overrides the channel functions
+
+    Returns:
+        (N, 4) uint8 array of vertex colors
+    """
+    if color is not None:
+        red, green, blue = util.color_values(color)
+    size = len(variables['x'])
+    colors = np.stack([compile_expression(func)(variables, size)
+                       for func in (red, green, blue, alpha)], axis=1)
+    return np.clip(np.nan_to_num(colors), 0, 255).astype(np.uint8)
+
+
+def select_vert_function(variables, function='(q < 0)', faces=None, strict_face_select=True):
+    """ Native select.vert_function.
+
+    Args:
+        variables (dict): per vertex variables (see vertex_variables)
+        function (str): boolean muparser function
+        faces (array): optional (M, 3) faces to select as well
+        strict_face_select (bool): a face is selected if all (True) or any
+            (False) of its vertices are selected
+
+    Returns:
+        vertex selection (bool array), and face selection if faces is not
+            None
+    """
+    vert_select = np.not_equal(
+        compile_expression(function)(variables, len(variables['x'])), 0)
+    if faces is None:
+        return vert_select
+    corners = vert_select[np.asarray(faces)]
+    return vert_select, corners.all(axis=1) if strict_face_select else corners.any(axis=1)
+
+
+def vq_function(variables, function='vi', normalize=False):
+    """ Native mp_func.vq_function.
+
+    Args:
+        variables (dict): per vertex variables (see vertex_variables)
+        function (str): muparser function for the new quality
+        normalize (bool): scale the quality to [0, 1]
+
+    Returns:
+        (N,) array of vertex quality
+    """
+    quality = np.array(compile_expression(function)(variables, len(variables['x'])))
+    if normalize:
+        low, high = quality.min(), quality.max()
+        quality = (quality - low) / (high - low) if high > low else np.zeros_like(quality)
+    return quality
+
+
+def curve(functions, parameter='t'):
+    """ Compile an [x, y, z] list of muparser functions of one parameter,
+    e.g. mp_func.torus_knot('t'), into a curve(t) function for
+    primitives.sweep and primitives.deform_to_curve """
+    if len(functions) != 3:
+        print('Error: a curve needs x, y and z functions')
+        sys.exit(1)
+    expressions = [compile_expression(func) for func in functions]
+
+    def curve_function(t):
+        t = np.asarray(t, dtype=np.float64)
+        variables = {parameter: t}
+        return np.stack([np.broadcast_to(expr(variables), t.shape) for expr in expressions],
+                        axis=-1)
+    return curve_function
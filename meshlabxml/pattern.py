@@ -0,0 +1,149 @@
+""" MeshLabXML instanced copies
+
+Radial and linear patterns built in meshlabserver need a
+layers.duplicate and one or more transform filters per copy, followed by
+layers.join, so the script, the layer count and the join all grow with
+the number of copies. Here each copy is a 4x4 matrix instead, and all
+copies are made in one vectorized step and written as a single mesh:
+
+    vertices, faces = primitives.grid(size=1.0, x_segments=10, y_segments=10)
+    matrices = pattern.radial(12) @ pattern.translation([5, 0, 0])
+    vertices, faces = pattern.instance(vertices, faces, matrices)
+    script = primitives.to_script('ring.ply', vertices, faces, file_out='out.ply')
+
+Matrices act on column vectors (new = matrix @ [x, y, z, 1]), so
+a @ b applies b first. Rotations follow transform.rotate: angles are in
+degrees and positive angles are counterclockwise about the axis.
+
+Requires NumPy.
+"""
+
+import math
+
+import numpy as np
+
+from . import mlx
+from . import geometry
+
+
+def translation(value=(0.0, 0.0, 0.0)):
+    """ 4x4 translation matrix """
+    matrix = np.eye(4)
+    matrix[:3, 3] = value
+    return matrix
+
+
+def scaling(value=1.0):
+    """ 4x4 scale matrix; value is a single factor or one per axis """
+    matrix = np.eye(4)
+    matrix[:3, :3] *= np.broadcast_to(np.asarray(value, dtype=np.float64), (3,))
+    return matrix
+
+
+def rotation(axis='z', angle=0.0, custom_axis=None, center=None):
+    """ 4x4 rotation matrix about an axis through the origin or center.
+
+    Args:
+        axis (str): 'x', 'y', 'z' or 'custom' (see geometry.axis_vector)
+        angle (float): rotation angle in degrees
+        custom_axis (3 component list or tuple): axis for 'custom'
+        center (3 component list or tuple): point on the axis; default is
+            the origin
+    """
+    unit = geometry.axis_vector(axis, custom_axis)
+    angle = math.radians(angle)
+    cross = np.array([[0.0, -unit[2], unit[1]],
+                      [unit[2], 0.0, -unit[0]],
+                      [-unit[1], unit[0], 0.0]])
+    matrix = np.eye(4)
+    matrix[:3, :3] = (math.cos(angle) * np.eye(3) + math.sin(angle) * cross +
+                      (1 - math.cos(angle)) * np.outer(unit, unit))
+    if center is not None:
+        matrix = translation(center) @ matrix @ translation(-np.asarray(center, dtype=np.float64))
+    return matrix
+
+
+def radial(count, axis='z', angle=None, custom_axis=None, center=None):
+    """ (count, 4, 4) matrices of a radial (polar) pattern.
+
+    Args:
+        count (int): number of copies, including the original (identity)
+        angle (float): angle between copies in degrees; default spreads
+            the copies evenly over 360 degrees
+        axis, custom_axis, center: see rotation
+    """
+    if angle is None:
+        angle = 360.0 / count
+    return np.stack([rotation(axis, index * angle, custom_axis, center)
+                     for index in range(count)])
+
+
+def linear(count, offset=(1.0, 0.0, 0.0)):
+    """ (count, 4, 4) matrices of a linear pattern, with copies offset by
+    multiples of offset, starting with the original (identity) """
+    matrices = np.tile(np.eye(4), (count, 1, 1))
+    matrices[:, :3, 3] = np.arange(count)[:, None] * np.asarray(offset, dtype=np.float64)
+    return matrices
+
+
+def transform_vertices(vertices, matrix):
+    """ Apply a 4x4 matrix to (N, 3) vertices """
+    matrix = np.asarray(matrix, dtype=np.float64)
+    return vertices @ matrix[:3, :3].T + matrix[:3, 3]
+
+
+def instance(vertices, faces, matrices):
+    """ Copy a mesh once per matrix and combine the copies into one mesh.
+
+    Copies transformed by a mirroring matrix (negative determinant) have
+    their faces reversed, so all copies keep their orientation.
+
+    Args:
+        vertices (array): (N, 3) vertices of the base mesh
+        faces (array): (M, 3) faces of the base mesh
+        matrices (array): (K, 4, 4) matrices, one per copy, e.g. from
+            radial or linear
+
+    Returns:
+        vertices (array): (K * N, 3); copy k is vertices k*N to (k+1)*N-1
+        faces (array): (K * M, 3)
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64)
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 4, 4)
+    copies = (np.einsum('kij,nj->kni', matrices[:, :3, :3], vertices) +
+              matrices[:, None, :3, 3])
+    offsets = np.arange(len(matrices), dtype=np.int64)[:, None, None] * len(vertices)
+    copy_faces = np.where((np.linalg.det(matrices[:, :3, :3]) < 0)[:, None, None],
+                          faces[:, ::-1], faces) + offsets
+    return copies.reshape(-1, 3), copy_faces.reshape(-1, 3)
+
+
+def instance_file(file_in, matrices, file_out=None, color=None, instance_out=None,
+                  ml_version=mlx.ML_VERSION):
+    """ Instance a mesh file and return a FilterScript that uses the copies
+    as its input.
+
+    Use this for base meshes made by an earlier script run. The mesh is
+    read with mesh_io.read_mesh; vertex colors are not kept (use color).
+
+    Args:
+        file_in (str): base mesh filename
+        matrices (array): (K, 4, 4) matrices, one per copy
+        file_out (str): output filename of the script
+        color (str): optional color name for all vertices
+        instance_out (str): ply filename for the copies; defaults to
+            file_in with an _instances.ply suffix
+
+    Returns:
+        FilterScript
+    """
+    import os
+    from . import mesh_io
+    from . import primitives
+
+    if instance_out is None:
+        instance_out = os.path.splitext(file_in)[0] + '_instances.ply'
+    vertices, faces = instance(*mesh_io.read_mesh(file_in), matrices=matrices)
+    return primitives.to_script(instance_out, vertices, faces, color=color,
+                                file_out=file_out, ml_version=ml_version)
@@ -0,0 +1,687 @@
+""" MeshLabXML dry run planner
+
+Simulates a FilterScript without meshlabserver, to reject bad parameter
+sets before committing to a long run. The inputs are replaced by small
+proxy meshes (decimated by vertex clustering), the layer stack is tracked
+and the filters in NATIVE_FILTERS (transforms, geometric, color and
+quality functions, selections, deletions, simple cleaning and layer
+operations) are run on the proxies with NumPy. The result estimates the
+bounding box and vertex and face counts of every layer after every
+filter, and flags filters that would not change anything (e.g. a
+deletion with nothing selected).
+
+Other filters are assumed to leave their layer unchanged, and the layers
+they touch are marked as inexact; filters that create layers (e.g. the
+create functions) add empty placeholder layers. Counts are scaled from
+the proxy to the full input size, so they are estimates whenever a proxy
+is smaller than its input.
+
+Example:
+    script = mlx.FilterScript(file_in='scan.ply', file_out='out.ply')
+    mlx.transform.scale(script, 25.4)
+    mlx.select.vert_function(script, 'z < 0')
+    mlx.delete.selected(script)
+    plan = script.dry_run()
+    print(plan['layers'][plan['current_layer']]['aabb'])
+
+Requires NumPy.
+"""
+
+import os
+import sys
+import time
+import math
+
+import numpy as np
+
+from . import mlx
+from . import util
+from . import geometry
+from . import mesh_io
+from . import muparser
+from . import pattern
+from . import schedule
+
+PROXY_FACES = 20000
+"""int: maximum number of faces (or points, for point clouds) of proxies
+made from the inputs
+"""
+
+MEASURE_FILTERS = ('Compute Geometric Measures', 'Compute Topological Measures',
+                   'Hausdorff Distance', 'Compute Planar Section')
+"""tuple: filters that only measure; they are never reported as no-ops
+"""
+
+
+def proxy_mesh(vertices, faces, max_faces=PROXY_FACES):
+    """ Decimate a mesh by vertex clustering until it has at most max_faces
+    faces (or points, for a point cloud).
+
+    One input vertex is kept per grid cell, so proxy vertices lie on the
+    input. Faces that collapse are removed.
+
+    Returns:
+        vertices, faces of the proxy
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    size = len(faces) if len(faces) else len(vertices)
+    if size <= max_faces:
+        return vertices, faces
+    low = vertices.min(axis=0)
+    extent = max(float(np.ptp(vertices, axis=0).max()), 1e-12)
+    if len(faces):
+        area = 0.5 * np.linalg.norm(np.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]],
+                                             vertices[faces[:, 2]] - vertices[faces[:, 0]]),
+                                    axis=1).sum()
+        cell = math.sqrt(max(area, 1e-24) / (max_faces / 2.0))
+    else:
+        cell = extent / max_faces ** (1 / 3.0)
+    while True:
+        dims = np.floor(np.ptp(vertices, axis=0) / cell).astype(np.int64) + 1
+        cells = np.floor((vertices - low) / cell).astype(np.int64)
+        keys = (cells[:, 0] * dims[1] + cells[:, 1]) * dims[2] + cells[:, 2]
+        _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        if not len(faces):
+            if len(first) <= max_faces:
+                return vertices[first], faces
+        else:
+            new_faces = inverse.reshape(-1)[faces]
+            keep = ((new_faces[:, 0] != new_faces[:, 1]) & (new_faces[:, 1] != new_faces[:, 2]) &
+                    (new_faces[:, 2] != new_faces[:, 0]))
+            new_faces = _unique_faces(new_faces[keep])
+            if len(new_faces) <= max_faces:
+                used = np.unique(new_faces)
+                remap = np.zeros(len(first), dtype=np.int64)
+                remap[used] = np.arange(len(used))
+                return vertices[first[used]], remap[new_faces]
+        cell *= 1.25
+
+
+def _unique_faces(faces):
+    """ Remove faces with the same vertices as an earlier face """
+    if not len(faces):
+        return faces
+    _, first = np.unique(np.sort(faces, axis=1), axis=0, return_index=True)
+    return faces[np.sort(first)]
+
+
+def _vertex_normals(vertices, faces):
+    normals = np.zeros_like(vertices)
+    if len(faces):
+        face_normals = np.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]],
+                                vertices[faces[:, 2]] - vertices[faces[:, 0]])
+        for corner in range(3):
+            np.add.at(normals, faces[:, corner], face_normals)
+    length = np.linalg.norm(normals, axis=1, keepdims=True)
+    return np.divide(normals, length, out=np.zeros_like(normals), where=length > 0)
+
+
+class Layer(object):
+    """ A simulated mesh layer: proxy geometry with per vertex colors,
+    quality, selection and custom attributes.
+
+    Args:
+        label (str): layer label
+        vertices, faces (arrays): proxy mesh
+        vert_num, face_num (int): counts of the full mesh the proxy stands
+            for, used to scale the proxy counts; default to the proxy
+            counts
+    """
+    def __init__(self, label, vertices, faces, vert_num=None, face_num=None):
+        self.label = label
+        self.vertices = np.asarray(vertices, dtype=np.float64).reshape(-1, 3)
+        self.faces = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+        self.colors = np.full((len(self.vertices), 4), 255.0)
+        self.quality = np.zeros(len(self.vertices))
+        self.vsel = np.zeros(len(self.vertices), dtype=bool)
+        self.fsel = np.zeros(len(self.faces), dtype=bool)
+        self.attributes = {}
+        self.vert_scale = (vert_num / float(len(self.vertices))
+                           if vert_num and len(self.vertices) else 1.0)
+        self.face_scale = (face_num / float(len(self.faces))
+                           if face_num and len(self.faces) else self.vert_scale)
+        self.exact = True
+
+    def copy(self, label=None):
+        """ Deep copy of the layer """
+        layer = Layer.__new__(Layer)
+        layer.__dict__.update(self.__dict__)
+        for name in ('vertices', 'faces', 'colors', 'quality', 'vsel', 'fsel'):
+            setattr(layer, name, getattr(self, name).copy())
+        layer.attributes = {name: val.copy() for name, val in self.attributes.items()}
+        if label is not None:
+            layer.label = label
+        return layer
+
+    def state(self):
+        """ Arrays that define the layer, for detecting changes """
+        return ([self.vertices, self.faces, self.colors, self.quality, self.vsel, self.fsel] +
+                [self.attributes[name] for name in sorted(self.attributes)] +
+                [self.label, sorted(self.attributes)])
+
+    def vert_num(self):
+        """ Estimated vertex count of the full mesh """
+        return int(round(len(self.vertices) * self.vert_scale))
+
+    def face_num(self):
+        """ Estimated face count of the full mesh """
+        return int(round(len(self.faces) * self.face_scale))
+
+    def aabb(self):
+        """ Bounding box of the proxy (see geometry.aabb_dict), or None if
+        the layer is empty """
+        if not len(self.vertices):
+            return None
+        return geometry.aabb_dict(self.vertices.min(axis=0), self.vertices.max(axis=0))
+
+    def variables(self, *functions):
+        """ Per vertex muparser variables; normals are only computed if
+        one of the functions uses them (or if no functions are given) """
+        names = set()
+        for function in functions:
+            names.update(muparser.compile_expression(function).variables)
+        normals = None
+        if not functions or names.intersection(('nx', 'ny', 'nz', 'nx0', 'nx1', 'nx2',
+                                                'ny0', 'ny1', 'ny2', 'nz0', 'nz1', 'nz2')):
+            normals = _vertex_normals(self.vertices, self.faces)
+        return muparser.vertex_variables(
+            self.vertices, normals=normals, colors=self.colors, quality=self.quality,
+            selected=self.vsel, attributes=self.attributes)
+
+    def remove(self, vert_keep=None, face_keep=None):
+        """ Keep only the given vertices and faces; faces using a removed
+        vertex are removed as well """
+        if face_keep is None:
+            face_keep = np.ones(len(self.faces), dtype=bool)
+        if vert_keep is None:
+            vert_keep = np.ones(len(self.vertices), dtype=bool)
+        face_keep = face_keep & vert_keep[self.faces].all(axis=1)
+        remap = np.cumsum(vert_keep) - 1
+        self.faces = remap[self.faces[face_keep]]
+        self.fsel = self.fsel[face_keep]
+        for name in ('vertices', 'colors', 'quality', 'vsel'):
+            setattr(self, name, getattr(self, name)[vert_keep])
+        self.attributes = {name: val[vert_keep] for name, val in self.attributes.items()}
+
+    def merge(self, inverse, unique_num):
+        """ Merge vertices: inverse maps every vertex to one of unique_num
+        merged vertices """
+        order = np.argsort(inverse, kind='stable')
+        first = order[np.searchsorted(inverse[order], np.arange(unique_num))]
+        for name in ('vertices', 'colors', 'quality', 'vsel'):
+            setattr(self, name, getattr(self, name)[first])
+        self.attributes = {name: val[first] for name, val in self.attributes.items()}
+        faces = inverse[self.faces]
+        keep = ((faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) &
+                (faces[:, 2] != faces[:, 0]))
+        self.faces, self.fsel = faces[keep], self.fsel[keep]
+
+
+class Simulation(object):
+    """ Layer stack of a dry run: a list of Layers and the current layer """
+    def __init__(self, layers, ml_version=mlx.ML_VERSION):
+        self.layers = layers
+        self.current = len(layers) - 1
+        self.ml_version = ml_version
+
+    def layer(self):
+        """ The current Layer """
+        return self.layers[self.current]
+
+    def add_layer(self, layer):
+        """ Append a layer and make it current """
+        self.layers.append(layer)
+        self.current = len(self.layers) - 1
+
+    def state(self):
+        return [self.current] + [layer.state() for layer in self.layers]
+
+
+def _states_equal(state1, state2):
+    if len(state1) != len(state2):
+        return False
+    for val1, val2 in zip(state1, state2):
+        if isinstance(val1, list) or isinstance(val2, list):
+            if not (isinstance(val1, list) and isinstance(val2, list) and
+                    _states_equal(val1, val2)):
+                return False
+        elif isinstance(val1, np.ndarray):
+            if not np.array_equal(val1, val2):
+                return False
+        elif val1 != val2:
+            return False
+    return True
+
+
+def filter_params(filter_xml):
+    """ Parameters of a filter xml string as a dict; Point3f parameters are
+    [x, y, z] lists, others are strings """
+    import xml.etree.ElementTree as ET
+
+    params = {}
+    for param in ET.fromstring(filter_xml).iter('Param'):
+        if 'value' in param.attrib:
+            params[param.attrib['name']] = param.attrib['value']
+        else:
+            params[param.attrib['name']] = [float(param.attrib.get(axis, 0)) for axis in 'xyz']
+    return params
+
+
+def _bool(params, name, default=False):
+    return params.get(name, str(default)).lower() == 'true'
+
+
+def _transform(sim, params, matrix_function):
+    layers = sim.layers if _bool(params, 'ToAll') else [sim.layer()]
+    for layer in layers:
+        if len(layer.vertices):
+            layer.vertices = pattern.transform_vertices(layer.vertices,
+                                                        matrix_function(layer, params))
+
+
+def _center(layer, params, name):
+    """ Center point of a rotate or scale filter """
+    center_num = int(params.get(name, 0))
+    if center_num == 1:
+        return layer.vertices.mean(axis=0)
+    if center_num == 2:
+        return np.asarray(params.get('customCenter', [0.0, 0.0, 0.0]))
+    return np.zeros(3)
+
+
+def _translate_matrix(layer, params):
+    if _bool(params, 'centerFlag'):
+        return pattern.translation(-(layer.vertices.min(axis=0) + layer.vertices.max(axis=0)) / 2)
+    return pattern.translation([float(params.get('axis' + axis, 0)) for axis in 'XYZ'])
+
+
+def _rotate_matrix(layer, params):
+    axis = ('x', 'y', 'z', 'custom')[int(params.get('rotAxis', 2))]
+    return pattern.rotation(axis, float(params.get('angle', 0)),
+                            custom_axis=params.get('customAxis'),
+                            center=_center(layer, params, 'rotCenter'))
+
+
+def _scale_matrix(layer, params):
+    value = [float(params.get('axis' + axis, 1)) for axis in 'XYZ']
+    if _bool(params, 'uniformFlag'):
+        value = [value[0]] * 3
+    if _bool(params, 'unitFlag'):
+        diagonal = np.linalg.norm(np.ptp(layer.vertices, axis=0))
+        value = [1.0 / diagonal if diagonal else 1.0] * 3
+    center = _center(layer, params, 'scaleCenter')
+    return pattern.translation(center) @ pattern.scaling(value) @ pattern.translation(-center)
+
+
+def _vert_function(sim, params):
+    layer = sim.layer()
+    functions = (params['x'], params['y'], params['z'])
+    layer.vertices = muparser.vert_function(layer.variables(*functions), *functions,
+                                            selected=_bool(params, 'onselected'))
+
+
+def _vert_color_function(sim, params):
+    layer = sim.layer()
+    functions = (params['x'], params['y'], params['z'], params.get('a', '255'))
+    layer.colors = muparser.vert_color_function(layer.variables(*functions),
+                                                *functions).astype(np.float64)
+
+
+def _vq_function(sim, params):
+    layer = sim.layer()
+    layer.quality = muparser.vq_function(layer.variables(params['q']), params['q'],
+                                         normalize=_bool(params, 'normalize'))
+
+
+def _vert_attr(sim, params):
+    layer = sim.layer()
+    layer.attributes[params['name']] = np.array(muparser.compile_expression(params['expr'])(
+        layer.variables(params['expr']), len(layer.vertices)))
+
+
+def _select_all(sim, params, value=True):
+    layer = sim.layer()
+    if _bool(params, 'allVerts', True):
+        layer.vsel[:] = value
+    if _bool(params, 'allFaces', True):
+        layer.fsel[:] = value
+
+
+def _select_none(sim, params):
+    _select_all(sim, params, False)
+
+
+def _invert_selection(sim, params):
+    layer = sim.layer()
+    if _bool(params, 'InvVerts', True):
+        layer.vsel = ~layer.vsel
+    if _bool(params, 'InvFaces', True):
+        layer.fsel = ~layer.fsel
+
+
+def _faces_from_verts(layer, strict):
+    corners = layer.vsel[layer.faces]
+    return corners.all(axis=1) if strict else corners.any(axis=1)
+
+
+def _select_vert_function(sim, params):
+    layer = sim.layer()
+    layer.vsel = muparser.select_vert_function(layer.variables(params['condSelect']),
+                                               params['condSelect'])
+    if sim.ml_version == '1.3.4BETA':
+        layer.fsel = _faces_from_verts(layer, _bool(params, 'strictSelect', True))
+    else:
+        layer.fsel[:] = False
+
+
+def _select_face_function(sim, params):
+    layer = sim.layer()
+    variables = muparser.face_variables(layer.vertices, layer.faces,
+                                         layer.variables(params['condSelect']))
+    variables['fsel'] = layer.fsel.astype(np.float64)
+    layer.fsel = np.not_equal(muparser.compile_expression(params['condSelect'])(
+        variables, len(layer.faces)), 0)
+
+
+def _select_quality(sim, params):
+    layer = sim.layer()
+    layer.vsel = ((layer.quality >= float(params['minQ'])) &
+                  (layer.quality <= float(params['maxQ'])))
+    layer.fsel = _faces_from_verts(layer, _bool(params, 'Inclusive', True))
+
+
+def _select_border(sim, params):
+    layer = sim.layer()
+    edges, edge_idx, face_count = geometry.mesh_edges(layer.faces)
+    border = face_count == 1
+    layer.vsel = np.zeros(len(layer.vertices), dtype=bool)
+    layer.vsel[edges[border].ravel()] = True
+    layer.fsel = border[edge_idx].reshape(-1, 3).any(axis=1)
+
+
+def _delete_faces_verts(sim, params):
+    layer = sim.layer()
+    # Vertices all of whose faces are deleted go as well
+    vert_keep = np.ones(len(layer.vertices), dtype=bool)
+    vert_keep[layer.faces[layer.fsel].ravel()] = False
+    vert_keep[layer.faces[~layer.fsel].ravel()] = True
+    layer.remove(vert_keep, ~layer.fsel)
+
+
+def _delete_faces(sim, params):
+    layer = sim.layer()
+    layer.remove(None, ~layer.fsel)
+
+
+def _delete_verts(sim, params):
+    layer = sim.layer()
+    layer.remove(~layer.vsel, None)
+
+
+def _remove_unreferenced(sim, params):
+    layer = sim.layer()
+    vert_keep = np.zeros(len(layer.vertices), dtype=bool)
+    vert_keep[layer.faces.ravel()] = True
+    layer.remove(vert_keep, None)
+
+
+def _remove_duplicate_faces(sim, params):
+    layer = sim.layer()
+    face_keep = np.zeros(len(layer.faces), dtype=bool)
+    if len(layer.faces):
+        _, first = np.unique(np.sort(layer.faces, axis=1), axis=0, return_index=True)
+        face_keep[first] = True
+    layer.remove(None, face_keep)
+
+
+def _remove_zero_area_faces(sim, params):
+    layer = sim.layer()
+    vertices, faces = layer.vertices, layer.faces
+    cross = np.cross(vertices[faces[:, 1]] - vertices[faces[:, 0]],
+                     vertices[faces[:, 2]] - vertices[faces[:, 0]])
+    layer.remove(None, np.any(cross != 0, axis=1))
+
+
+def _merge_vertices(sim, params, tolerance=0.0):
+    layer = sim.layer()
+    if len(layer.vertices):
+        unique, inverse = geometry.weld_points(layer.vertices, tolerance)
+        layer.merge(inverse, len(unique))
+
+
+def _merge_close_vertices(sim, params):
+    _merge_vertices(sim, params, float(params.get('Threshold', 0)))
+
+
+def _join(sim, params):
+    layers = sim.layers
+    vertices = np.concatenate([layer.vertices for layer in layers])
+    offsets = np.cumsum([0] + [len(layer.vertices) for layer in layers])
+    joined = Layer('Merged Mesh', vertices, np.concatenate(
+        [layer.faces + offset for layer, offset in zip(layers, offsets)]))
+    for name in ('colors', 'quality', 'vsel', 'fsel'):
+        setattr(joined, name, np.concatenate([getattr(layer, name) for layer in layers]))
+    joined.vert_scale = (sum(layer.vert_num() for layer in layers) / float(len(vertices))
+                         if len(vertices) else 1.0)
+    joined.face_scale = (sum(layer.face_num() for layer in layers) / float(len(joined.faces))
+                         if len(joined.faces) else joined.vert_scale)
+    joined.exact = all(layer.exact for layer in layers)
+    sim.add_layer(joined)
+    if _bool(params, 'MergeVertices'):
+        _merge_vertices(sim, params)
+    if not _bool(params, 'AlsoUnreferenced'):
+        _remove_unreferenced(sim, params)
+    if _bool(params, 'DeleteLayer', True):
+        sim.layers = [joined]
+        sim.current = 0
+
+
+def _delete_layer(sim, params):
+    del sim.layers[sim.current]
+    sim.current = min(sim.current, len(sim.layers) - 1)
+
+
+def _change_layer(sim, params):
+    sim.current = int(params.get('mesh', params.get('layer', sim.current)))
+
+
+def _duplicate_layer(sim, params):
+    sim.add_layer(sim.layer().copy('%s_copy' % sim.layer().label))
+
+
+def _rename_layer(sim, params):
+    sim.layer().label = params['newName']
+
+
+def _split_parts(sim, params):
+    layer = sim.layer()
+    edges = geometry.mesh_edges(layer.faces)[0] if len(layer.faces) else np.zeros((0, 2))
+    labels = geometry.connected_labels(len(layer.vertices), edges)
+    for part_num, label in enumerate(np.unique(labels[layer.faces[:, 0]])
+                                     if len(layer.faces) else []):
+        part = layer.copy('CC %d' % part_num)
+        part.remove(labels == label, None)
+        sim.add_layer(part)
+
+
+NATIVE_FILTERS = {
+    'Transform: Move, Translate, Center': lambda sim, params: _transform(
+        sim, params, _translate_matrix),
+    'Transform: Rotate': lambda sim, params: _transform(sim, params, _rotate_matrix),
+    'Transform: Scale': lambda sim, params: _transform(sim, params, _scale_matrix),
+    'Freeze Current Matrix': lambda sim, params: None,
+    'Geometric Function': _vert_function,
+    'Per Vertex Geometric Function': _vert_function,
+    'Per Vertex Color Function': _vert_color_function,
+    'Per Vertex Quality Function': _vq_function,
+    'Define New Per Vertex Attribute': _vert_attr,
+    'Select All': _select_all,
+    'Select None': _select_none,
+    'Invert Selection': _invert_selection,
+    'Conditional Vertex Selection': _select_vert_function,
+    'Conditional Face Selection': _select_face_function,
+    'Select by Vertex Quality': _select_quality,
+    'Select Border': _select_border,
+    'Delete Selected Faces and Vertices': _delete_faces_verts,
+    'Delete Selected Faces': _delete_faces,
+    'Delete Selected Vertices': _delete_verts,
+    'Remove Unreferenced Vertex': _remove_unreferenced,
+    'Remove Unreferenced Vertices': _remove_unreferenced,
+    'Remove Duplicate Faces': _remove_duplicate_faces,
+    'Remove Duplicated Vertex': _merge_vertices,
+    'Remove Duplicate Vertices': _merge_vertices,
+    'Remove Zero Area Faces': _remove_zero_area_faces,
+    'Merge Close Vertices': _merge_close_vertices,
+    'Flatten Visible Layers': _join,
+    'Delete Current Mesh': _delete_layer,
+    'Change the current layer': _change_layer,
+    'Duplicate Current layer': _duplicate_layer,
+    'Rename Current Mesh': _rename_layer,
+    'Split in Connected Components': _split_parts}
+"""dict: filter name to function(simulation, params) running the filter on
+the proxy layers
+"""
+
+
+def _input_files(script):
+    """ Input mesh filenames of a script, in layer order """
+    import xml.etree.ElementTree as ET
+
+    filenames = []
+    for val in util.make_list(script.mlp_in) if script.mlp_in is not None else []:
+        for elem in ET.parse(val).iter(tag='MLMesh'):
+            filenames.append(os.path.join(os.path.dirname(val), elem.attrib['filename']))
+    for val in util.make_list(script.file_in) if script.file_in is not None else []:
+        if val in ('bunny', 'bunny_raw'):
+            val = os.path.join(mlx.THIS_MODULEPATH, os.pardir, 'models',
+                               'bunny_flat(1Z).ply' if val == 'bunny' else 'bunny_raw(-1250Y).ply')
+        filenames.append(val)
+    return filenames
+
+
+def input_layers(script, proxy=None, proxy_faces=PROXY_FACES):
+    """ Proxy Layers for the inputs of a FilterScript.
+
+    Args:
+        script (FilterScript): script to simulate
+        proxy: None to read every input and decimate it (see proxy_mesh);
+            a filename or list of filenames of prepared proxies, one per
+            input; or a list of (vertices, faces) tuples
+        proxy_faces (int): maximum faces of proxies made from the inputs
+
+    Returns:
+        list of Layers
+    """
+    if getattr(script, '_FilterScript__no_file_in', False):
+        # Dummy single vertex input, deleted by the first filter
+        return [Layer('DELETE_ME', np.zeros((1, 3)), np.zeros((0, 3)))]
+    filenames = _input_files(script)
+    if proxy is not None:
+        proxy = util.make_list(proxy) if isinstance(proxy, str) else list(proxy)
+        if len(proxy) != len(filenames):
+            print('Error: %d proxies given for %d inputs' % (len(proxy), len(filenames)))
+            sys.exit(1)
+    layers = []
+    for index, filename in enumerate(filenames):
+        label = os.path.splitext(os.path.basename(filename))[0]
+        counts = schedule.ply_counts(filename) if os.path.exists(filename) else None
+        if proxy is None:
+            vertices, faces = mesh_io.read_mesh(filename)
+            counts = (len(vertices), len(faces))
+            vertices, faces = proxy_mesh(vertices, faces, proxy_faces)
+        elif isinstance(proxy[index], str):
+            vertices, faces = mesh_io.read_mesh(proxy[index])
+        else:
+            vertices, faces = proxy[index]
+        if counts is None:
+            counts = (len(vertices), len(faces))
+        layers.append(Layer(label, vertices, faces, vert_num=counts[0], face_num=counts[1]))
+    return layers
+
+
+def dry_run(script, proxy=None, proxy_faces=PROXY_FACES, log=None, print_output=True):
+    """ Simulate a FilterScript on proxy meshes; see FilterScript.dry_run.
+
+    Returns:
+        dict with keys:
+            filters: one dict per filter with filter_num, name, layer_num,
+                status ('native', 'measure' or 'unsupported'), noop (True
+                if the filter changed nothing, None if unknown), and the
+                estimated vert_num and face_num of the current layer after
+                the filter
+            layers: one dict per layer at the end of the script with label,
+                vert_num, face_num, aabb (see geometry.aabb_dict, None if
+                empty) and exact (False if an unsupported filter touched
+                the layer)
+            current_layer (int): current layer at the end of the script
+            noop_filters, unsupported_filters (lists): filter indexes
+            seconds (float): time taken by the dry run
+    """
+    start = time.perf_counter()
+    sim = Simulation(input_layers(script, proxy, proxy_faces), script.ml_version)
+    layer_counts = script.filter_layer_counts[1:] + [script.last_layer() + 1]
+    filters = []
+    for filter_num, filter_xml in enumerate(script.filters):
+        name = util.filter_name(filter_xml)
+        entry = {'filter_num': filter_num, 'name': name, 'layer_num': sim.current}
+        if name in NATIVE_FILTERS:
+            before = sim.state()
+            known = bool(sim.layers) and sim.layer().exact
+            NATIVE_FILTERS[name](sim, filter_params(filter_xml))
+            entry['status'] = 'native'
+            # A placeholder or inexact layer may have changed unseen
+            entry['noop'] = _states_equal(before, sim.state()) if known else None
+        else:
+            entry['status'] = 'measure' if name in MEASURE_FILTERS else 'unsupported'
+            entry['noop'] = False if name in MEASURE_FILTERS else None
+            if name not in MEASURE_FILTERS:
+                # Unknown result; keep the layer and add placeholders for
+                # any layers the filter creates
+                if sim.layers:
+                    sim.layer().exact = False
+                for _ in range(layer_counts[filter_num] - len(sim.layers)):
+                    placeholder = Layer(name, np.zeros((0, 3)), np.zeros((0, 3)))
+                    placeholder.exact = False
+                    sim.add_layer(placeholder)
+        entry['vert_num'] = sim.layer().vert_num() if sim.layers else None
+        entry['face_num'] = sim.layer().face_num() if sim.layers else None
+        filters.append(entry)
+    plan = {
+        'filters': filters,
+        'layers': [{'label': layer.label, 'vert_num': layer.vert_num(),
+                    'face_num': layer.face_num(), 'aabb': layer.aabb(),
+                    'exact': layer.exact} for layer in sim.layers],
+        'current_layer': sim.current,
+        'noop_filters': [entry['filter_num'] for entry in filters if entry['noop']],
+        'unsupported_filters': [entry['filter_num'] for entry in filters
+                                if entry['status'] == 'unsupported'],
+        'seconds': time.perf_counter() - start}
+    print_plan(plan, log, print_output)
+    return plan
+
+
+def print_plan(plan, log=None, print_output=True):
+    """ Write a dry run plan to a log file or stdout as a table """
+    lines = ['{:>6} {:>5} {:>11} {:>5} {:>10} {:>10}  {}'.format(
+        'filter', 'layer', 'status', 'noop', 'verts', 'faces', 'name')]
+    for entry in plan['filters']:
+        lines.append('{:>6} {:>5} {:>11} {:>5} {:>10} {:>10}  {}'.format(
+            entry['filter_num'], entry['layer_num'], entry['status'],
+            {True: 'yes', False: '', None: '?'}[entry['noop']], str(entry['vert_num']),
+            str(entry['face_num']), entry['name']))
+    lines.append('{:>5} {:>10} {:>10} {:>36}  {}'.format(
+        'layer', 'verts', 'faces', 'aabb size', 'label'))
+    for layer_num, layer in enumerate(plan['layers']):
+        size = ('' if layer['aabb'] is None else
+                ' x '.join('%.4g' % val for val in layer['aabb']['size']))
+        lines.append('{:>5} {:>10} {:>10} {:>36}  {}{}{}'.format(
+            layer_num, layer['vert_num'], layer['face_num'], size, layer['label'],
+            '' if layer['exact'] else ' (inexact)',
+            ' (current)' if layer_num == plan['current_layer'] else ''))
+    if log is not None:
+        log_file = open(log, 'a')
+        log_file.write('\n'.join(lines) + '\n')
+        log_file.close()
+    elif print_output:
+        print('\n'.join(lines))
@@ -0,0 +1,684 @@
+""" MeshLabXML native primitive generators
+
+NumPy versions of the create.*_hires functions. Instead of building the
+shape from several layers in meshlabserver, joining them and welding the
+seams with clean.merge_vert, the mesh is generated directly with shared
+vertices, so it is watertight by construction. Write it with to_script to
+use it as the (single, binary PLY) input of a FilterScript:
+
+    vertices, faces = primitives.cube_hires(size=[100, 50, 2], x_segments=1000,
+                                            y_segments=500)
+    script = primitives.to_script('blank.ply', vertices, faces, file_out='litho.ply')
+    mlx.transform.vert_function(script, z_func=...)
+    script.run_script()
+
+Shapes are placed the same as their create counterparts and faces are
+oriented with normals pointing outward. sweep replaces deforming a tube
+with transform.deform2curve: the curve is sampled once and the swept mesh
+is built with parallel transport frames.
+
+Requires NumPy.
+"""
+
+import sys
+import math
+
+import numpy as np
+
+from . import mlx
+from . import util
+
+
+def grid_faces(ids, closed=False):
+    """ Triangulate a 2D array of vertex indexes as a grid of quads.
+
+    The normal of each triangle is d(column) x d(row). Triangles with a
+    repeated vertex (e.g. where a row collapses to a single center vertex)
+    are dropped.
+
+    Args:
+        ids (array): (rows, columns) array of vertex indexes
+        closed (bool): if True the last column is connected to the first
+
+    Returns:
+        (M, 3) int64 array of faces
+    """
+    ids = np.asarray(ids, dtype=np.int64)
+    if closed:
+        ids = np.concatenate([ids, ids[:, :1]], axis=1)
+    corner0 = ids[:-1, :-1].ravel()
+    corner1 = ids[:-1, 1:].ravel()
+    corner2 = ids[1:, 1:].ravel()
+    corner3 = ids[1:, :-1].ravel()
+    faces = np.concatenate([np.stack([corner0, corner1, corner2], axis=1),
+                            np.stack([corner0, corner2, corner3], axis=1)])
+    keep = ((faces[:, 0] != faces[:, 1]) & (faces[:, 1] != faces[:, 2]) &
+            (faces[:, 0] != faces[:, 2]))
+    return faces[keep]
+
+
+def _rect_ring(x_segments, y_segments):
+    """ Lattice coordinates of the boundary of an x_segments by y_segments
+    rectangle, counterclockwise from the origin """
+    ring_x = np.concatenate([np.arange(x_segments), np.full(y_segments, x_segments),
+                             np.arange(x_segments, 0, -1), np.zeros(y_segments)])
+    ring_y = np.concatenate([np.zeros(x_segments), np.arange(y_segments),
+                             np.full(x_segments, y_segments), np.arange(y_segments, 0, -1)])
+    return ring_x, ring_y
+
+
+def _rect_ids(x_segments, y_segments, ring_ids, first_id):
+    """ (y_segments + 1, x_segments + 1) array of the vertex indexes of a
+    rectangular grid whose boundary vertices are ring_ids (see _rect_ring)
+    and whose interior vertices are numbered from first_id """
+    ids = np.empty((y_segments + 1, x_segments + 1), dtype=np.int64)
+    ring_x, ring_y = _rect_ring(x_segments, y_segments)
+    ids[ring_y.astype(np.int64), ring_x.astype(np.int64)] = ring_ids
+    interior = (x_segments - 1) * (y_segments - 1)
+    if interior > 0:
+        ids[1:-1, 1:-1] = np.arange(first_id, first_id + interior).reshape(
+            y_segments - 1, x_segments - 1)
+    return ids
+
+
+def cube_hires(size=1.0, x_segments=1, y_segments=1, z_segments=1,
+               simple_bottom=True, center=False):
+    """ Native create.cube_hires: a box with x_segments, y_segments and
+    z_segments divisions along each axis.
+
+    Args:
+        size (float or list): size in x, y and z
+        simple_bottom (bool): if True the bottom only has vertices on its
+            edges (a triangle strip), otherwise it is a full grid like the
+            top
+        center (bool): center the box on the origin; otherwise it is placed
+            in the positive octant
+
+    Returns:
+        vertices, faces
+    """
+    size = util.make_list(size, 3)
+    ring_x, ring_y = _rect_ring(x_segments, y_segments)
+    ring_num = len(ring_x)
+    # Sides: one ring of vertices per z row
+    row = np.repeat(np.arange(z_segments + 1), ring_num)
+    vertices = [np.stack([np.tile(ring_x, z_segments + 1), np.tile(ring_y, z_segments + 1),
+                          row], axis=1)]
+    side_ids = np.arange((z_segments + 1) * ring_num).reshape(z_segments + 1, ring_num)
+    faces = [grid_faces(side_ids, closed=True)]
+    vert_num = side_ids.size
+
+    # Top, normals +z
+    interior = np.stack(np.meshgrid(np.arange(1, x_segments), np.arange(1, y_segments)),
+                        axis=-1).reshape(-1, 2)
+    top_ids = _rect_ids(x_segments, y_segments, side_ids[-1], vert_num)
+    vertices.append(np.column_stack([interior, np.full(len(interior), z_segments)]))
+    vert_num += len(interior)
+    faces.append(grid_faces(top_ids))
+
+    # Bottom, normals -z
+    if simple_bottom:
+        # Strip between the two halves of the ring, from the origin corner
+        # to the opposite corner
+        half = x_segments + y_segments
+        strip = np.stack([side_ids[0, (-np.arange(half + 1)) % ring_num],
+                          side_ids[0, np.arange(half + 1)]])
+        faces.append(grid_faces(strip))
+    else:
+        bottom_ids = _rect_ids(x_segments, y_segments, side_ids[0], vert_num)
+        vertices.append(np.column_stack([interior, np.zeros(len(interior))]))
+        faces.append(grid_faces(bottom_ids.T))
+
+    vertices = np.concatenate(vertices).astype(np.float64)
+    vertices *= np.array(size, dtype=np.float64) / [x_segments, y_segments, z_segments]
+    if center:
+        vertices -= np.array(size, dtype=np.float64) / 2
+    return vertices, np.concatenate(faces)
+
+
+def _rings(radii, cir_segments, height=0.0):
+    """ Vertices of concentric circles, one row per radius """
+    angle = 2 * math.pi * np.arange(cir_segments) / cir_segments
+    radii = np.asarray(radii, dtype=np.float64)[:, None]
+    return np.stack([radii * np.cos(angle), radii * np.sin(angle),
+                     np.full(radii.shape[:1] + angle.shape, height)], axis=-1).reshape(-1, 3)
+
+
+def _cap_ids(outer_ids, inner_ids, rad_segments, first_id, cir_segments):
+    """ (rad_segments + 1, cir_segments) vertex indexes of an annulus from
+    the outer to the inner ring, with new vertices for the rings in
+    between numbered from first_id. inner_ids may be a single center
+    vertex. """
+    ids = np.empty((rad_segments + 1, cir_segments), dtype=np.int64)
+    ids[0] = outer_ids
+    ids[-1] = inner_ids
+    if rad_segments > 1:
+        ids[1:-1] = np.arange(first_id, first_id + (rad_segments - 1) * cir_segments).reshape(
+            rad_segments - 1, cir_segments)
+    return ids
+
+
+def annulus_hires(radius1=1.0, radius2=0.0, cir_segments=48, rad_segments=1):
+    """ Native create.annulus_hires: a flat annulus (or disk if radius2 is
+    0) on the XY plane, centered on the origin, with normals +z.
+
+    Args:
+        radius1 (float): outer radius
+        radius2 (float): inner radius
+        cir_segments (int): number of segments around the circle
+        rad_segments (int): number of rings from radius1 to radius2
+
+    Returns:
+        vertices, faces
+    """
+    radii = np.linspace(radius1, radius2, rad_segments + 1)
+    if radius2 == 0:
+        vertices = np.concatenate([_rings(radii[:-1], cir_segments), np.zeros((1, 3))])
+        inner = len(vertices) - 1
+    else:
+        vertices = _rings(radii, cir_segments)
+        inner = np.arange(rad_segments * cir_segments, len(vertices))
+    ids = _cap_ids(np.arange(cir_segments), inner, rad_segments, cir_segments, cir_segments)
+    return vertices, grid_faces(ids, closed=True)
+
+
+def grid(size=1.0, x_segments=1, y_segments=1, center=False):
+    """ Native create.grid: plane on the XY plane facing +Z, in the
+    positive XY quadrant or centered on the origin """
+    size = util.make_list(size, 2)
+    ids = np.arange((x_segments + 1) * (y_segments + 1)).reshape(y_segments + 1, x_segments + 1)
+    y_values, x_values = np.mgrid[0:y_segments + 1, 0:x_segments + 1]
+    vertices = np.stack([x_values.ravel() * size[0] / x_segments,
+                         y_values.ravel() * size[1] / y_segments,
+                         np.zeros(ids.size)], axis=1)
+    if center:
+        vertices[:, :2] -= np.array(size, dtype=np.float64) / 2
+    return vertices, grid_faces(ids)
+
+
+def tube_hires(height=1.0, radius1=1.0, radius2=0.0, cir_segments=32, rad_segments=1,
+               height_segments=1, center=False, simple_bottom=False):
+    """ Native create.tube_hires: a closed tube (or cylinder if radius2 is
+    0) along the z axis.
+
+    Args:
+        height (float): height of the tube
+        radius1 (float): outer radius
+        radius2 (float): inner radius
+        cir_segments (int): number of segments around the circumference
+        rad_segments (int): number of rings in the top (and bottom) caps
+        height_segments (int): number of segments along the height
+        center (bool): center the tube on the origin; otherwise its bottom
+            is on the XY plane
+        simple_bottom (bool): if True the bottom cap has a single ring of
+            segments
+
+    Returns:
+        vertices, faces
+    """
+    heights = np.linspace(0.0, height, height_segments + 1)
+    # Outer wall, normals outward
+    vertices = [np.concatenate([_rings([radius1], cir_segments, val) for val in heights])]
+    outer_ids = np.arange((height_segments + 1) * cir_segments).reshape(
+        height_segments + 1, cir_segments)
+    faces = [grid_faces(outer_ids, closed=True)]
+    vert_num = outer_ids.size
+    if radius2 != 0:
+        # Inner wall, normals inward
+        vertices.append(np.concatenate([_rings([radius2], cir_segments, val)
+                                        for val in heights]))
+        inner_ids = np.arange(vert_num, vert_num + outer_ids.size).reshape(outer_ids.shape)
+        faces.append(grid_faces(inner_ids[::-1], closed=True))
+        vert_num += outer_ids.size
+        inner_top, inner_bottom = inner_ids[-1], inner_ids[0]
+    else:
+        vertices.append(np.array([[0.0, 0.0, height], [0.0, 0.0, 0.0]]))
+        inner_top, inner_bottom = vert_num, vert_num + 1
+        vert_num += 2
+    radii = np.linspace(radius1, radius2, rad_segments + 1)[1:-1]
+    for cap_height, outer, inner, segments in (
+            (height, outer_ids[-1], inner_top, rad_segments),
+            (0.0, outer_ids[0], inner_bottom, 1 if simple_bottom else rad_segments)):
+        ids = _cap_ids(outer, inner, segments, vert_num, cir_segments)
+        if segments > 1:
+            vertices.append(_rings(radii, cir_segments, cap_height))
+            vert_num += len(radii) * cir_segments
+        # Top normals +z, bottom normals -z
+        faces.append(grid_faces(ids if cap_height else ids[::-1], closed=True))
+    vertices = np.concatenate(vertices)
+    if center:
+        vertices[:, 2] -= height / 2
+    return vertices, np.concatenate(faces)
+
+
+def to_script(file_in, vertices, faces, color=None, file_out=None, ml_version=mlx.ML_VERSION):
+    """ Write a generated mesh as a binary PLY and return a FilterScript
+    that uses it as input.
+
+    Args:
+        file_in (str): ply filename to write the mesh to
+        vertices, faces (arrays): the mesh, e.g. from cube_hires
+        color (str): optional color name (see color_names.txt) for all
+            vertices
+        file_out (str): output filename of the script
+
+    Returns:
+        FilterScript
+    """
+    from . import mesh_io
+
+    vert_colors = None
+    if color is not None:
+        vert_colors = np.empty((len(vertices), 3), dtype=np.uint8)
+        vert_colors[:] = [int(val) for val in util.color_values(color)]
+    mesh_io.write_ply(file_in, vertices, faces, vert_colors=vert_colors)
+    return mlx.FilterScript(file_in=file_in, file_out=file_out, ml_version=ml_version)
+
+
+def read_pgm(fbasename):
+    """ Read a binary (P5) or ASCII (P2) PGM image.
+
+    Returns:
+        (rows, columns) float64 array of values scaled to 0 - 1, with row 0
+        at the top of the image
+    """
+    with open(fbasename, 'rb') as fread:
+        data = fread.read()
+    tokens = []
+    pos = 0
+    while len(tokens) < 4:
+        while pos < len(data) and data[pos:pos + 1].isspace():
+            pos += 1
+        if data[pos:pos + 1] == b'#':  # comment until end of line
+            pos = data.index(b'\n', pos) + 1
+            continue
+        start = pos
+        while pos < len(data) and not data[pos:pos + 1].isspace():
+            pos += 1
+        tokens.append(data[start:pos])
+    magic = tokens[0]
+    width, height, max_val = (int(val) for val in tokens[1:])
+    if magic == b'P5':
+        dtype = np.uint8 if max_val < 256 else np.dtype('>u2')
+        values = np.frombuffer(data, dtype=dtype, count=width * height, offset=pos + 1)
+    elif magic == b'P2':
+        values = np.array(data[pos:].split()[:width * height], dtype=np.float64)
+    else:
+        print('Error: "%s" is not a PGM file' % fbasename)
+        sys.exit(1)
+    return values.reshape(height, width).astype(np.float64) / max_val
+
+
+def _leaf_blocks(z_values, tolerance):
+    """ Quadtree leaves of a height grid: blocks of 2**level cells whose
+    heights are within tolerance of two triangles between the block
+    corners.
+
+    Returns:
+        list of (size, rows, columns) arrays of the leaf origins, one per
+        level
+    """
+    from numpy.lib.stride_tricks import sliding_window_view
+
+    cell_rows, cell_cols = z_values.shape[0] - 1, z_values.shape[1] - 1
+    merged = [np.ones((cell_rows, cell_cols), dtype=bool)]
+    size = 2
+    while cell_rows // size and cell_cols // size and merged[-1].any():
+        block_rows, block_cols = cell_rows // size, cell_cols // size
+        blocks = sliding_window_view(z_values, (size + 1, size + 1))[
+            ::size, ::size][:block_rows, :block_cols]
+        # Heights of the two triangles the block is split into (see
+        # _leaf_faces), on either side of the diagonal
+        weight = np.arange(size + 1) / float(size)
+        col_weight, row_weight = weight[None, :], weight[:, None]
+        corner00, corner01 = blocks[..., :1, :1], blocks[..., :1, -1:]
+        corner10, corner11 = blocks[..., -1:, :1], blocks[..., -1:, -1:]
+        planes = np.where(col_weight >= row_weight,
+                          corner00 + col_weight * (corner01 - corner00) +
+                          row_weight * (corner11 - corner01),
+                          corner00 + row_weight * (corner10 - corner00) +
+                          col_weight * (corner11 - corner10))
+        flat = np.abs(blocks - planes).max(axis=(2, 3)) <= tolerance
+        children = merged[-1]
+        for row in (0, 1):
+            for col in (0, 1):
+                flat &= children[row:2 * block_rows:2, col:2 * block_cols:2]
+        merged.append(flat)
+        size *= 2
+    leaves = []
+    covered = np.zeros_like(merged[-1])
+    for level in range(len(merged) - 1, -1, -1):
+        block_rows, block_cols = merged[level].shape
+        if level < len(merged) - 1:
+            parent = np.repeat(np.repeat(covered, 2, axis=0), 2, axis=1)
+            covered = np.zeros((block_rows, block_cols), dtype=bool)
+            covered[:parent.shape[0], :parent.shape[1]] = parent
+        leaf = merged[level] & ~covered
+        rows, cols = np.nonzero(leaf)
+        leaves.append((2 ** level, rows * 2 ** level, cols * 2 ** level))
+        covered |= merged[level]
+    return leaves
+
+
+def _leaf_faces(leaves, active):
+    """ Triangulate quadtree leaves without cracks. Leaves with vertices of
+    smaller neighbors on their edges are fanned from their center vertex,
+    which is marked in active. Returns faces as (row, column) grid
+    coordinates of shape (M, 3, 2). """
+    for size, rows, cols in leaves:
+        for row, col in ((0, 0), (0, size), (size, 0), (size, size)):
+            active[rows + row, cols + col] = True
+    faces = []
+    for size, rows, cols in leaves:
+        # Perimeter counterclockwise from the origin corner
+        steps = np.arange(size)
+        perim = np.concatenate([
+            np.stack([np.zeros(size, dtype=np.int64), steps], axis=1),
+            np.stack([steps, np.full(size, size)], axis=1),
+            np.stack([np.full(size, size), size - steps], axis=1),
+            np.stack([size - steps, np.zeros(size, dtype=np.int64)], axis=1)])
+        perim_rows = rows[:, None] + perim[:, 0]
+        perim_cols = cols[:, None] + perim[:, 1]
+        mask = active[perim_rows, perim_cols]
+        fan = mask.sum(axis=1) > 4
+        # Leaves with only their corners: two triangles
+        corner_rows, corner_cols = rows[~fan], cols[~fan]
+        corners = [np.stack([corner_rows + row, corner_cols + col], axis=1)
+                   for row, col in ((0, 0), (0, size), (size, size), (size, 0))]
+        faces.append(np.stack([corners[0], corners[1], corners[2]], axis=1))
+        faces.append(np.stack([corners[0], corners[2], corners[3]], axis=1))
+        if fan.any():
+            leaf_index, perim_index = np.nonzero(mask[fan])
+            following = np.roll(np.arange(len(leaf_index)), -1)
+            # The last point of each leaf wraps to its first point
+            last = np.append(leaf_index[1:] != leaf_index[:-1], True)
+            firsts = np.flatnonzero(np.insert(last[:-1], 0, True))
+            following[last] = firsts
+            fan_rows, fan_cols = perim_rows[fan], perim_cols[fan]
+            center = np.stack([rows[fan] + size // 2, cols[fan] + size // 2], axis=1)
+            active[center[:, 0], center[:, 1]] = True
+            point = np.stack([fan_rows[leaf_index, perim_index],
+                              fan_cols[leaf_index, perim_index]], axis=1)
+            faces.append(np.stack([center[leaf_index], point, point[following]], axis=1))
+    return np.concatenate(faces)
+
+
+def heightmap(heights, size=None, z_scale=1.0, thickness=0.0, invert=False,
+              closed=False, tolerance=None, center=False):
+    """ Create a relief mesh from a height map, e.g. for lithophanes.
+
+    This replaces deforming a create.grid or create.cube_hires with a
+    per vertex muparser function.
+
+    Args:
+        heights (array or str): 2D array of heights, with row 0 at the top
+            (+y edge), or the filename of a PGM image, whose values are
+            scaled to 0 - 1
+        size (list): size of the mesh in x and y; defaults to one unit per
+            pixel
+        z_scale (float): heights are multiplied by this value
+        thickness (float): added to all heights; the thickness of the base
+            of a closed mesh
+        invert (bool): use 1 - heights (before scaling), e.g. so that dark
+            pixels of a lithophane are thick
+        closed (bool): add side walls and a flat bottom at z = 0 to make a
+            watertight solid
+        tolerance (float): if not None, flat regions are merged into larger
+            triangles wherever the full resolution heights are within this
+            distance (in z) of them. Blocks next to smaller ones are fanned
+            from their center so that the result has no cracks.
+        center (bool): center the mesh on the origin in x and y; otherwise
+            it is placed in the positive quadrant
+
+    Returns:
+        vertices, faces; normals of the relief point up (+z)
+    """
+    if isinstance(heights, str):
+        heights = read_pgm(heights)
+    heights = np.asarray(heights, dtype=np.float64)
+    if invert:
+        heights = 1.0 - heights
+    # Row 0 of the grid is at y = 0
+    z_values = heights[::-1] * z_scale + thickness
+    vert_rows, vert_cols = z_values.shape
+    if size is None:
+        size = [vert_cols - 1, vert_rows - 1]
+    size = util.make_list(size, 2)
+    spacing = [size[0] / float(vert_cols - 1), size[1] / float(vert_rows - 1)]
+
+    if tolerance is None:
+        active = np.ones(z_values.shape, dtype=bool)
+        ids = np.arange(z_values.size).reshape(z_values.shape)
+        faces = grid_faces(ids)
+    else:
+        active = np.zeros(z_values.shape, dtype=bool)
+        grid_coords = _leaf_faces(_leaf_blocks(z_values, tolerance), active)
+        ids = np.cumsum(active).reshape(z_values.shape) - 1
+        faces = ids[grid_coords[..., 0], grid_coords[..., 1]]
+    rows, cols = np.nonzero(active)
+    vertices = np.stack([cols * spacing[0], rows * spacing[1], z_values[rows, cols]], axis=1)
+
+    if closed:
+        ring_x, ring_y = _rect_ring(vert_cols - 1, vert_rows - 1)
+        ring_x, ring_y = ring_x.astype(np.int64), ring_y.astype(np.int64)
+        keep = active[ring_y, ring_x]
+        ring_x, ring_y = ring_x[keep], ring_y[keep]
+        top_ring = ids[ring_y, ring_x]
+        bottom_ring = np.arange(len(vertices), len(vertices) + len(top_ring))
+        bottom_center = len(vertices) + len(top_ring)
+        vertices = np.concatenate([
+            vertices,
+            np.stack([ring_x * spacing[0], ring_y * spacing[1], np.zeros(len(ring_x))], axis=1),
+            [[size[0] / 2.0, size[1] / 2.0, 0.0]]])
+        faces = np.concatenate([
+            faces,
+            grid_faces(np.stack([bottom_ring, top_ring]), closed=True),
+            grid_faces(np.stack([np.full(len(bottom_ring), bottom_center), bottom_ring]),
+                       closed=True)])
+    if center:
+        vertices[:, 0] -= size[0] / 2.0
+        vertices[:, 1] -= size[1] / 2.0
+    return vertices, faces
+
+
+def torus_knot_curve(p=3, q=4, scale=1.0, radius=2.0):
+    """ Native mp_func.torus_knot: returns curve(t), which evaluates the
+    same (p,q) torus knot for an array of t and returns (N, 3) points """
+    def curve(t):
+        t = np.asarray(t, dtype=np.float64)
+        return scale * np.stack([np.sin(t) + radius * np.sin(p * t),
+                                 np.cos(t) - radius * np.cos(p * t),
+                                 -np.sin(q * t)], axis=-1)
+    return curve
+
+
+def circle_profile(radius=1.0, segments=32):
+    """ (segments, 2) counterclockwise circle cross section for sweep """
+    angle = 2 * math.pi * np.arange(segments) / segments
+    return radius * np.stack([np.cos(angle), np.sin(angle)], axis=1)
+
+
+def rect_profile(size=1.0, x_segments=1, y_segments=1):
+    """ Counterclockwise rectangle cross section for sweep, centered on the
+    curve, with x_segments and y_segments divisions along each side; the
+    same cross section as create.cube_open_hires """
+    size = util.make_list(size, 2)
+    ring_x, ring_y = _rect_ring(x_segments, y_segments)
+    return np.stack([ring_x * size[0] / x_segments - size[0] / 2.0,
+                     ring_y * size[1] / y_segments - size[1] / 2.0], axis=1)
+
+
+def _normalize(vectors):
+    return vectors / np.linalg.norm(vectors, axis=-1, keepdims=True)
+
+
+def _unit_perpendicular(vectors):
+    """ A unit vector perpendicular to each vector, using the axis least
+    aligned with it """
+    axes = np.eye(3)[np.argmin(np.abs(vectors), axis=1)]
+    return _normalize(np.cross(vectors, axes))
+
+
+def curve_frames(curve, t, frame='parallel', closed=False, step=None):
+    """ Position and orthonormal frame of a parametric curve.
+
+    Args:
+        curve (function): curve(t) returns (N, 3) points for an array of t,
+            e.g. torus_knot_curve() or muparser.curve(mp_func.torus_knot('t'))
+        t (array): increasing parameter values to evaluate
+        frame (str): 'parallel' for a rotation minimizing (parallel
+            transport) frame, which does not twist and is defined on
+            straight segments; 'frenet' for the Frenet frame (normal
+            towards the center of curvature); 'pqtorus' for the frame used
+            by transform.deform2curve, which gives the same result as the
+            muparser version
+        closed (bool): the curve is closed (t covers one period without
+            repeating the first point); the parallel frame is twisted
+            evenly so that it matches up at the seam
+        step (float): parameter step for derivatives; defaults to 1e-4 of
+            the parameter range (0.001 for pqtorus, as deform2curve)
+
+    Returns:
+        points, tangents, normals, binormals: (N, 3) arrays, with
+            binormal = tangent x normal
+    """
+    t = np.asarray(t, dtype=np.float64)
+    points = curve(t)
+    if frame == 'pqtorus':
+        step = 0.001 if step is None else step
+        ahead = curve(t + step)
+        tangents = _normalize(ahead - points)
+        binormals = _normalize(np.cross(tangents, ahead + points))
+        normals = np.cross(binormals, tangents)
+        return points, tangents, normals, binormals
+    if step is None:
+        step = 1e-4 * max(float(t[-1] - t[0]), 1e-9)
+    ahead, behind = curve(t + step), curve(t - step)
+    tangents = _normalize(ahead - behind)
+    if frame == 'frenet':
+        accel = ahead - 2 * points + behind
+        normals = _normalize(accel - np.sum(accel * tangents, axis=1, keepdims=True) * tangents)
+        return points, tangents, normals, np.cross(tangents, normals)
+    if frame != 'parallel':
+        print('Error: unknown frame "%s"; use parallel, frenet or pqtorus' % frame)
+        sys.exit(1)
+    # Any reference normal per sample, then undo its twist relative to
+    # parallel transport: rotate each reference normal into the next
+    # sample's normal plane with the minimal rotation between tangents and
+    # accumulate the angle to the next reference normal.
+    normals = _unit_perpendicular(tangents)
+    binormals = np.cross(tangents, normals)
+    if closed:
+        next_index = np.roll(np.arange(len(t)), -1)
+    else:
+        next_index = np.arange(1, len(t))
+    this_tangent, next_tangent = tangents[:len(next_index)], tangents[next_index]
+    axis = np.cross(this_tangent, next_tangent)
+    cos_angle = np.sum(this_tangent * next_tangent, axis=1, keepdims=True)
+    # Rodrigues rotation of the normal; (1 - cos) / sin^2 = 1 / (1 + cos)
+    normal = normals[:len(next_index)]
+    transported = (normal * cos_angle + np.cross(axis, normal) +
+                   axis * np.sum(axis * normal, axis=1, keepdims=True) /
+                   np.maximum(1.0 + cos_angle, 1e-12))
+    twist = np.arctan2(np.sum(transported * binormals[next_index], axis=1),
+                       np.sum(transported * normals[next_index], axis=1))
+    angle = np.concatenate([[0.0], np.cumsum(twist)])
+    if closed:
+        # Spread the holonomy (the angle after a full loop) evenly
+        holonomy = angle[-1]
+        angle = angle[:-1] - holonomy * np.arange(len(t)) / float(len(t))
+    cos_twist, sin_twist = np.cos(angle)[:, None], np.sin(angle)[:, None]
+    normals, binormals = (normals * cos_twist + binormals * sin_twist,
+                          binormals * cos_twist - normals * sin_twist)
+    return points, tangents, normals, binormals
+
+
+def sweep(curve, profile, t_range=(0.0, 2 * math.pi), segments=720, frame='parallel',
+          closed=None, caps=True):
+    """ Sweep a 2D cross section along a parametric curve.
+
+    Native replacement for deforming a tube with transform.deform2curve:
+    the curve is sampled once, frames are computed for all samples at once
+    and the mesh is built directly. Closed curves are joined exactly, so no
+    clean.merge_vert is needed.
+
+    Args:
+        curve (function): curve(t) returns (N, 3) points for an array of t,
+            e.g. torus_knot_curve() or muparser.curve(mp_func.torus_knot('t'))
+        profile (array): (M, 2) counterclockwise cross section, in the
+            (normal, binormal) plane, e.g. circle_profile or rect_profile
+        t_range (tuple): start and end parameter
+        segments (int): number of segments along the curve
+        frame (str): see curve_frames
+        closed (bool): if None, the curve is closed if its start and end
+            points are the same
+        caps (bool): close the ends of an open sweep with fans
+
+    Returns:
+        vertices, faces; normals point outward
+    """
+    profile = np.asarray(profile, dtype=np.float64)
+    ends = curve(np.array(t_range, dtype=np.float64))
+    if closed is None:
+        extent = max(float(np.ptp(curve(np.linspace(t_range[0], t_range[1], 16)),
+                                  axis=0).max()), 1e-12)
+        closed = bool(np.linalg.norm(ends[1] - ends[0]) <= 1e-9 * extent)
+    t = np.linspace(t_range[0], t_range[1], segments + (0 if closed else 1),
+                    endpoint=not closed)
+    points, _, normals, binormals = curve_frames(curve, t, frame=frame, closed=closed)
+    vertices = (points[:, None, :] + profile[None, :, 0, None] * normals[:, None, :] +
+                profile[None, :, 1, None] * binormals[:, None, :]).reshape(-1, 3)
+    ids = np.arange(len(vertices)).reshape(len(t), len(profile))
+    if closed:
+        ids = np.concatenate([ids, ids[:1]])
+    faces = [grid_faces(ids, closed=True)]
+    if caps and not closed:
+        centroid = profile.mean(axis=0)
+        centers = points[[0, -1]] + centroid[0] * normals[[0, -1]] + centroid[1] * binormals[[0, -1]]
+        first, last = len(vertices), len(vertices) + 1
+        vertices = np.concatenate([vertices, centers])
+        faces.append(grid_faces(np.stack([np.full(len(profile), first), ids[0]]), closed=True))
+        faces.append(grid_faces(np.stack([ids[-1], np.full(len(profile), last)]), closed=True))
+    return vertices, np.concatenate(faces)
+
+
+def deform_to_curve(vertices, curve, frame='pqtorus', step=None, samples=4096):
+    """ Native transform.deform2curve for vertex arrays.
+
+    Each vertex (x, y, z) is moved to curve(z) + x * normal + y * binormal.
+
+    Args:
+        vertices (array): (N, 3) vertices
+        curve (function): curve(t) returns (N, 3) points, e.g.
+            torus_knot_curve()
+        frame (str): see curve_frames. 'pqtorus' (default) matches
+            deform2curve and is evaluated for every vertex. For 'parallel'
+            and 'frenet' frames are computed at samples points over the z
+            range and interpolated; a curve that is closed over the z range
+            gets a seamless frame.
+        step (float): see curve_frames
+
+    Returns:
+        (N, 3) deformed vertices
+    """
+    vertices = np.asarray(vertices, dtype=np.float64)
+    z_values = vertices[:, 2]
+    if frame == 'pqtorus':
+        points, _, normals, binormals = curve_frames(curve, z_values, frame, step=step)
+    else:
+        z_min, z_max = float(z_values.min()), float(z_values.max())
+        ends = curve(np.array([z_min, z_max]))
+        closed = bool(np.allclose(ends[0], ends[1]))
+        t = np.linspace(z_min, z_max, samples, endpoint=not closed)
+        _, tangents, normals, binormals = curve_frames(curve, t, frame, closed=closed, step=step)
+        if closed:
+            t = np.append(t, z_max)
+            tangents, normals = np.vstack([tangents, tangents[:1]]), np.vstack([normals, normals[:1]])
+        points = curve(z_values)
+        tangent = _normalize(np.stack([np.interp(z_values, t, tangents[:, axis])
+                                       for axis in range(3)], axis=1))
+        normal = np.stack([np.interp(z_values, t, normals[:, axis]) for axis in range(3)],
+                          axis=1)
+        normals = _normalize(normal - np.sum(normal * tangent, axis=1, keepdims=True) * tangent)
+        binormals = np.cross(tangent, normals)
+    return points + vertices[:, :1] * normals + vertices[:, 1:2] * binormals
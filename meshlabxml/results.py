@@ -0,0 +1,347 @@
+""" MeshLabXML compact measurement results
+
+The measurement parsers in compute return nested dicts of Python floats,
+which is convenient for a single file but wasteful when measuring many
+files. This module provides:
+
+    Result classes with __slots__ that hold a measurement as flat fields.
+    ResultColumns, an accumulator that appends results into NumPy column
+    arrays and exports them to CSV or NPZ in one shot.
+
+Both accept the dicts output by compute (e.g. LogParser.geometry) and can
+convert back to them. Missing float values are stored as nan and missing
+or undefined integer values (e.g. genus of a non-manifold mesh, unknown
+filter_num) as -1.
+
+Requires NumPy.
+"""
+
+import csv
+import sys
+
+import numpy as np
+
+
+def _vector_columns(name, size):
+    """ Column specs for a vector (or flattened matrix) value """
+    if size == 3:
+        return [('%s_%s' % (name, axis), name, index, 'f8')
+                for index, axis in enumerate('xyz')]
+    return [('%s_%d' % (name, index), name, index, 'f8') for index in range(size)]
+
+
+COMMON_COLUMNS = [('filter_num', 'filter_num', None, 'i8'),
+                  ('layer_num', 'layer_num', None, 'i8')]
+"""list: columns shared by all results, as (column, key, index, dtype)
+"""
+
+GEOMETRY_COLUMNS = (
+    [('aabb_%s_%s' % (key, axis), 'aabb.' + key, index, 'f8')
+     for key in ('min', 'max', 'center', 'size') for index, axis in enumerate('xyz')] +
+    [('aabb_diagonal', 'aabb.diagonal', None, 'f8'),
+     ('area_mm2', 'area_mm2', None, 'f8'),
+     ('volume_mm3', 'volume_mm3', None, 'f8'),
+     ('total_edge_length', 'total_edge_length', None, 'f8'),
+     ('total_edge_length_incl_faux', 'total_edge_length_incl_faux', None, 'f8')] +
+    _vector_columns('barycenter', 3) +
+    _vector_columns('vert_barycenter', 3) +
+    _vector_columns('center_of_mass', 3) +
+    _vector_columns('inertia_tensor', 9) +
+    _vector_columns('principal_axes', 9) +
+    _vector_columns('axis_momenta', 3) +
+    COMMON_COLUMNS)
+"""list: measure_geometry columns, as (column, key, index, dtype). Nested
+keys are separated by '.' and matrices are flattened row by row. area_cm2
+and volume_cm3 are derived from area_mm2 and volume_mm3.
+"""
+
+TOPOLOGY_COLUMNS = (
+    [(key, key, None, 'i8') for key in (
+        'vert_num', 'edge_num', 'face_num', 'unref_vert_num', 'boundry_edge_num',
+        'part_num', 'non_manifold_E', 'non_manifold_V', 'non_manifold_edge',
+        'non_manifold_vert', 'genus', 'hole_num')] +
+    [('manifold', 'manifold', None, '?')] +
+    COMMON_COLUMNS)
+"""list: measure_topology columns, as (column, key, index, dtype). The
+non-manifold edge and vertex counts are only output for non-manifold
+meshes, and are missing (-1) otherwise.
+"""
+
+HAUSDORFF_COLUMNS = (
+    [(key, key, None, 'f8') for key in (
+        'min_distance', 'max_distance', 'mean_distance', 'rms_distance')] +
+    [('number_points', 'number_points', None, 'i8')] +
+    COMMON_COLUMNS)
+"""list: hausdorff_distance columns, as (column, key, index, dtype)
+"""
+
+MISSING = {'f8': float('nan'), 'i8': -1, '?': False}
+"""dict: value stored for a missing value of each column dtype
+"""
+
+
+def _plan(columns):
+    """ Group columns by key, as a list of (key parts, [(index, missing)]) """
+    plan = []
+    for _, key, index, dtype in columns:
+        parts = tuple(key.split('.'))
+        if not plan or plan[-1][0] != parts:
+            plan.append((parts, []))
+        plan[-1][1].append((index, MISSING[dtype]))
+    return plan
+
+
+def _row(result, plan):
+    """ Flatten a result dict into a tuple of column values """
+    row = []
+    for parts, fields in plan:
+        value = result
+        for part in parts:
+            value = value.get(part) if isinstance(value, dict) else None
+        if value is None or value == 'undefined':
+            row.extend(missing for _, missing in fields)
+        elif fields[0][0] is None:
+            row.append(value)
+        else:
+            if value and isinstance(value[0], (list, tuple)):
+                # Matrix; flatten row by row
+                value = [val for vec in value for val in vec]
+            row.extend(value[index] if index < len(value) else missing
+                       for index, missing in fields)
+    return tuple(row)
+
+
+def _nested(row, columns):
+    """ Convert a tuple of column values back into a result dict """
+    result = {}
+    for value, (_, key, index, dtype) in zip(row, columns):
+        if dtype == 'f8':
+            if value != value:  # nan
+                continue
+            value = float(value)
+        elif dtype == 'i8':
+            value = int(value)
+            if value == -1:
+                if key not in ('genus', 'hole_num', 'filter_num', 'layer_num'):
+                    continue
+                value = 'undefined' if key in ('genus', 'hole_num') else None
+        else:
+            value = bool(value)
+        parent = result
+        parts = key.split('.')
+        for part in parts[:-1]:
+            parent = parent.setdefault(part, {})
+        if index is None:
+            parent[parts[-1]] = value
+        else:
+            parent.setdefault(parts[-1], []).append(value)
+    for key in ('inertia_tensor', 'principal_axes'):
+        if key in result:
+            result[key] = [result[key][i:i + 3] for i in range(0, len(result[key]), 3)]
+    if 'area_mm2' in result:
+        result['area_cm2'] = result['area_mm2'] * 0.01
+    if 'volume_mm3' in result:
+        result['volume_cm3'] = result['volume_mm3'] * 0.001
+    return result
+
+
+class Result(object):
+    """ Base class for compact measurement results.
+
+    Subclasses define COLUMNS; every column is stored in a slot of the same
+    name. Results can be converted to and from the dicts output by compute.
+    """
+    __slots__ = ()
+    COLUMNS = []
+    PLAN = []
+
+    def __init__(self, *values):
+        for (column, _, _, _), value in zip(self.COLUMNS, values):
+            setattr(self, column, value)
+        for column, _, _, dtype in self.COLUMNS[len(values):]:
+            setattr(self, column, MISSING[dtype])
+
+    @classmethod
+    def from_dict(cls, result):
+        """ Create a result from a compute result dict """
+        return cls(*_row(result, cls.PLAN))
+
+    def to_dict(self):
+        """ Return the result as a compute result dict """
+        return _nested(self.as_tuple(), self.COLUMNS)
+
+    def as_tuple(self):
+        """ Return the column values as a tuple """
+        return tuple(getattr(self, column) for column, _, _, _ in self.COLUMNS)
+
+    def __eq__(self, other):
+        # nan (missing) values compare equal
+        return type(self) is type(other) and all(
+            val == other_val or (val != val and other_val != other_val)
+            for val, other_val in zip(self.as_tuple(), other.as_tuple()))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(
+            '%s=%r' % (column, getattr(self, column)) for column, _, _, _ in self.COLUMNS))
+
+
+class GeometryResult(Result):
+    """ Compact measure_geometry result """
+    COLUMNS = GEOMETRY_COLUMNS
+    PLAN = _plan(GEOMETRY_COLUMNS)
+    __slots__ = tuple(column for column, _, _, _ in GEOMETRY_COLUMNS)
+
+
+class TopologyResult(Result):
+    """ Compact measure_topology result """
+    COLUMNS = TOPOLOGY_COLUMNS
+    PLAN = _plan(TOPOLOGY_COLUMNS)
+    __slots__ = tuple(column for column, _, _, _ in TOPOLOGY_COLUMNS)
+
+
+class HausdorffResult(Result):
+    """ Compact hausdorff_distance result """
+    COLUMNS = HAUSDORFF_COLUMNS
+    PLAN = _plan(HAUSDORFF_COLUMNS)
+    __slots__ = tuple(column for column, _, _, _ in HAUSDORFF_COLUMNS)
+
+
+RESULT_CLASSES = {'geometry': GeometryResult,
+                  'topology': TopologyResult,
+                  'hausdorff_distance': HausdorffResult}
+"""dict: result class for each kind of measurement (see
+compute.MEASURE_FILTERS)
+"""
+
+
+class ResultColumns(object):
+    """ Accumulate measurement results into NumPy column arrays.
+
+    Results are stored in a single structured array that grows by doubling,
+    so appending many results does not create any per-result objects other
+    than the row labels, which are kept in a list.
+
+    Args:
+        kind (str): 'geometry', 'topology' or 'hausdorff_distance'
+        capacity (int): initial number of rows to allocate
+
+    Example:
+        columns = ResultColumns('geometry')
+        for fbasename in files:
+            columns.append(mlx.files.measure_geometry(fbasename), label=fbasename)
+        columns.to_npz('geometry.npz')
+    """
+    def __init__(self, kind='geometry', capacity=1024):
+        self.kind = kind
+        self.result_class = RESULT_CLASSES[kind]
+        self.dtype = np.dtype([(column, dtype) for column, _, _, dtype
+                               in self.result_class.COLUMNS])
+        self._data = np.zeros(max(int(capacity), 1), dtype=self.dtype)
+        self._size = 0
+        self.labels = []
+
+    def __len__(self):
+        return self._size
+
+    def _reserve(self, size):
+        if size > len(self._data):
+            data = np.zeros(max(size, 2 * len(self._data)), dtype=self.dtype)
+            data[:self._size] = self._data[:self._size]
+            self._data = data
+
+    def append(self, result, label=None):
+        """ Append a result dict or Result object.
+
+        Args:
+            result (dict or Result): measurement result
+            label (str): optional label for the row, e.g. the file name
+        """
+        self._reserve(self._size + 1)
+        if isinstance(result, Result):
+            self._data[self._size] = result.as_tuple()
+        else:
+            self._data[self._size] = _row(result, self.result_class.PLAN)
+        self.labels.append('' if label is None else str(label))
+        self._size += 1
+
+    def extend(self, results, labels=None):
+        """ Append a sequence of result dicts or Result objects """
+        results = list(results)
+        if labels is None:
+            labels = [None] * len(results)
+        self._reserve(self._size + len(results))
+        for result, label in zip(results, labels):
+            self.append(result, label)
+
+    @property
+    def data(self):
+        """ Structured array of the accumulated rows (a view) """
+        return self._data[:self._size]
+
+    def columns(self):
+        """ Return a dict of column name: 1D array (views) """
+        data = self.data
+        return {column: data[column] for column in self.dtype.names}
+
+    def __getitem__(self, index):
+        """ Return row index as a Result object """
+        return self.result_class(*self.data[index].tolist())
+
+    def to_csv(self, filename, delimiter=','):
+        """ Write all rows to a CSV file with a header line """
+        data = self.data
+        columns = [data[column].tolist() for column in self.dtype.names]
+        with open(filename, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file, delimiter=delimiter)
+            writer.writerow(('label',) + self.dtype.names)
+            writer.writerows(zip(self.labels, *columns))
+
+    def to_npz(self, filename, compressed=True):
+        """ Write all columns (and the labels) to a NumPy npz file """
+        save = np.savez_compressed if compressed else np.savez
+        save(filename, label=np.array(self.labels, dtype=str), kind=np.array(self.kind),
+             **self.columns())
+
+    @classmethod
+    def from_npz(cls, filename):
+        """ Load a ResultColumns written by to_npz """
+        with np.load(filename) as npz:
+            columns = cls(str(npz['kind']), capacity=len(npz['label']))
+            for column in columns.dtype.names:
+                columns._data[column] = npz[column]
+            columns.labels = npz['label'].tolist()
+        columns._size = len(columns.labels)
+        return columns
+
+
+def save_report(filename, tables):
+    """ Write several ResultColumns with the same rows (labels) to one file.
+
+    Columns are named "<kind>.<column>", e.g. "geometry.area_mm2". The
+    format is chosen by extension: npz, or csv for anything else.
+
+    Args:
+        filename (str): output filename
+        tables (dict): ResultColumns by kind, e.g. {'geometry': ...,
+            'topology': ...}
+    """
+    kinds = list(tables)
+    labels = tables[kinds[0]].labels
+    for kind in kinds[1:]:
+        if tables[kind].labels != labels:
+            print('Error: all tables in a report must have the same rows')
+            sys.exit(1)
+    columns = {}
+    for kind in kinds:
+        for column, values in tables[kind].columns().items():
+            columns['%s.%s' % (kind, column)] = values
+    if filename.lower().endswith('.npz'):
+        np.savez_compressed(filename, label=np.array(labels, dtype=str), **columns)
+    else:
+        with open(filename, 'w', newline='') as csv_file:
+            writer = csv.writer(csv_file)
+            writer.writerow(['label'] + list(columns))
+            writer.writerows(zip(labels, *[values.tolist() for values in columns.values()]))
@@ -0,0 +1,340 @@
+""" MeshLabXML memory aware job scheduling
+
+Peak memory of meshlabserver (and native) runs grows with the size of the
+input mesh, so a fixed number of workers either leaves most of a large
+host idle on small meshes or runs out of memory on large ones.
+MemoryModel predicts the peak resident memory of a job from the vertex
+and face counts of its input (read from the PLY header, or estimated from
+the file size) using the peak RSS measured on earlier jobs with the same
+mix of filters. MemoryScheduler only starts a job while the predicted
+memory of all running jobs fits in a budget, and learns from every job
+as it completes.
+
+Jobs with a filter mix that has not been seen before are predicted with
+conservative defaults (DEFAULT_BASE_BYTES and DEFAULT_BYTES_PER_ELEMENT).
+
+Example:
+    model = schedule.MemoryModel()
+    scheduler = schedule.MemoryScheduler(budget='auto', model=model)
+    jobs = [schedule.mesh_job(name, mix='simplify') for name in filenames]
+    with ProcessPoolExecutor(max_workers=64) as pool:
+        for job, future in scheduler.run(pool, jobs, submit):
+            ...
+"""
+
+import bisect
+import os
+import sys
+
+DEFAULT_BASE_BYTES = 256 * 1024 ** 2
+"""int: predicted memory of a job with an unseen filter mix, excluding the
+mesh
+"""
+
+DEFAULT_BYTES_PER_ELEMENT = 2048
+"""int: predicted memory per vertex or face for an unseen filter mix
+"""
+
+FILE_BYTES_PER_ELEMENT = 12
+"""int: file bytes per vertex or face, used to estimate the element count
+of meshes without a PLY header. Low, so the estimate is conservative.
+"""
+
+SAFETY_FACTOR = 1.25
+"""float: predictions are multiplied by this factor
+"""
+
+BUDGET_FRACTION = 0.8
+"""float: fraction of physical memory used by budget='auto'
+"""
+
+FAILED_MIX = 'error'
+"""str: mix of jobs that failed (files.measure_tree sets the method as the
+mix); their peak memory is not learnt
+"""
+
+
+def ply_counts(fbasename):
+    """ Read the vertex and face counts from a PLY header.
+
+    Returns:
+        vert_num, face_num (int), or None if the file is not a ply file
+    """
+    counts = {}
+    try:
+        with open(fbasename, 'rb') as fread:
+            if fread.readline().strip() != b'ply':
+                return None
+            for line in fread:
+                words = line.split()
+                if not words:
+                    continue
+                if words[0] == b'element' and len(words) > 2:
+                    counts[words[1].decode('ascii', 'replace')] = int(words[2])
+                elif words[0] == b'end_header':
+                    break
+    except (OSError, ValueError):
+        return None
+    return counts.get('vertex', 0), counts.get('face', 0)
+
+
+def mesh_job(fbasename, mix, **job):
+    """ Create a job dict for an input mesh, with keys path, mix, size and
+    (for ply files) vert_num and face_num, plus any keyword arguments """
+    job.update({'path': fbasename, 'mix': mix, 'size': os.path.getsize(fbasename),
+                'vert_num': None, 'face_num': None})
+    counts = ply_counts(fbasename)
+    if counts is not None:
+        job['vert_num'], job['face_num'] = counts
+    return job
+
+
+def job_elements(job):
+    """ Number of vertices plus faces of a job's input, estimated from the
+    file size if the counts are not known """
+    if job.get('vert_num') is not None:
+        return job['vert_num'] + (job.get('face_num') or 0)
+    return (job.get('size') or 0) // FILE_BYTES_PER_ELEMENT
+
+
+def host_memory():
+    """ Physical memory of the host in bytes, or None if not available """
+    try:
+        return os.sysconf('SC_PAGE_SIZE') * os.sysconf('SC_PHYS_PAGES')
+    except (AttributeError, ValueError, OSError):
+        return None
+
+
+def reset_peak_rss():
+    """ Reset the peak RSS of the current process (Linux only); returns
+    True if it was reset """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss():
+    """ Peak RSS of the current process in bytes (since reset_peak_rss on
+    Linux), or None if not available """
+    try:
+        with open('/proc/self/status') as status:
+            for line in status:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss * (1 if sys.platform == 'darwin' else 1024)
+
+
+class MemoryModel(object):
+    """ Predict the peak memory of jobs from measured job records.
+
+    For each filter mix, a line through the smallest job and the steepest
+    larger job is fitted, so predictions err on the high side. Only the
+    fit of the mix of a new record changes, and predictions are cached per
+    mix and element count.
+
+    Args:
+        base_bytes (int): fixed memory for unseen mixes
+        bytes_per_element (int): memory per vertex or face for unseen mixes
+        safety_factor (float): multiplier for all predictions
+    """
+    def __init__(self, base_bytes=DEFAULT_BASE_BYTES, bytes_per_element=DEFAULT_BYTES_PER_ELEMENT,
+                 safety_factor=SAFETY_FACTOR):
+        self.base_bytes = base_bytes
+        self.bytes_per_element = bytes_per_element
+        self.safety_factor = safety_factor
+        self.observations = {}
+        self._fits = {}
+        self._lines = {}
+        self._floors = {}
+        self._predictions = {}
+
+    def add(self, job, max_rss_bytes):
+        """ Record the measured peak RSS of a job (see mesh_job). Failed
+        jobs (mix FAILED_MIX) are ignored. """
+        if not max_rss_bytes or job['mix'] == FAILED_MIX:
+            return
+        mix, point = job['mix'], (max(job_elements(job), 1), max_rss_bytes)
+        self.observations.setdefault(mix, []).append(point)
+        self._add_floor(mix, *point)
+        self._add_hull(mix, *point)
+        sizes, peaks = self._fits[mix]
+        if len(sizes) > 1:
+            slope = max((peaks[1] - peaks[0]) / float(sizes[1] - sizes[0]), 0.0)
+        else:
+            slope = peaks[0] / float(sizes[0])
+        self._lines[mix] = (max(peaks[0] - slope * sizes[0], 0.0), slope)
+        self._predictions[mix] = {}
+
+    def _add_hull(self, mix, elements, rss):
+        """ Keep the upper convex hull of the (elements, rss) points of a
+        mix. The steepest line from the smallest job to a larger one goes
+        to the next point of the hull. """
+        sizes, peaks = self._fits.setdefault(mix, ([], []))
+        index = bisect.bisect_left(sizes, elements)
+        if index < len(sizes) and sizes[index] == elements:
+            if peaks[index] >= rss:
+                return
+            del sizes[index], peaks[index]
+
+        def above(left, middle, right):
+            """ True if point middle is above the line from left to right """
+            return ((sizes[middle] - sizes[left]) * (peaks[right] - peaks[left]) <
+                    (peaks[middle] - peaks[left]) * (sizes[right] - sizes[left]))
+
+        sizes.insert(index, elements)
+        peaks.insert(index, rss)
+        if 0 < index < len(sizes) - 1 and not above(index - 1, index, index + 1):
+            del sizes[index], peaks[index]
+            return
+        while index >= 2 and not above(index - 2, index - 1, index):
+            del sizes[index - 1], peaks[index - 1]
+            index -= 1
+        while index + 2 < len(sizes) and not above(index, index + 1, index + 2):
+            del sizes[index + 1], peaks[index + 1]
+
+    def _add_floor(self, mix, elements, rss):
+        """ Keep the running maximum RSS by element count as a staircase of
+        (elements, rss) with rss increasing """
+        sizes, maxima = self._floors.setdefault(mix, ([], []))
+        index = bisect.bisect_right(sizes, elements)
+        if index and maxima[index - 1] >= rss:
+            return
+        end = index
+        while end < len(sizes) and maxima[end] <= rss:
+            end += 1
+        sizes[index:end] = [elements]
+        maxima[index:end] = [rss]
+
+    def add_records(self, records, mix_key='mix'):
+        """ Record a list of job dicts that have a max_rss_bytes key, e.g.
+        files.measure_tree index entries (use mix_key='method') """
+        for record in records:
+            if record.get('max_rss_bytes') and record.get(mix_key) is not None:
+                self.add(dict(record, mix=record[mix_key]), record['max_rss_bytes'])
+
+    def predict(self, job):
+        """ Predicted peak memory of a job in bytes """
+        return self.predict_elements(job.get('mix'), job_elements(job))
+
+    def predict_elements(self, mix, elements):
+        """ Predicted peak memory in bytes of a job of a mix with an input
+        of this many vertices plus faces """
+        cache = self._predictions.get(mix)
+        if cache is None:
+            return int(self.safety_factor *
+                       (self.base_bytes + self.bytes_per_element * elements))
+        if elements not in cache:
+            base, slope = self._lines[mix]
+            # Never less than a smaller job of the same mix used
+            sizes, maxima = self._floors[mix]
+            index = bisect.bisect_right(sizes, elements)
+            floor = maxima[index - 1] if index else 0
+            cache[elements] = int(self.safety_factor * max(base + slope * elements, floor))
+        return cache[elements]
+
+
+class MemoryScheduler(object):
+    """ Admit jobs to a pool while their predicted memory fits a budget.
+
+    Jobs are started largest first. If the next job does not fit, smaller
+    jobs that do are started instead; a job larger than the whole budget
+    is started on its own.
+
+    Args:
+        budget (int or str): memory budget in bytes, or 'auto' for
+            BUDGET_FRACTION of physical memory
+        model (MemoryModel): memory model; a new one is created if None
+        max_jobs (int): maximum number of running jobs, e.g. the number of
+            pool workers; defaults to the number of CPUs
+    """
+    def __init__(self, budget='auto', model=None, max_jobs=None):
+        if budget == 'auto':
+            memory = host_memory()
+            if memory is None:
+                print('Error: host memory is unknown on this platform; set the budget')
+                sys.exit(1)
+            budget = int(memory * BUDGET_FRACTION)
+        self.budget = budget
+        self.model = model if model is not None else MemoryModel()
+        self.max_jobs = max_jobs or os.cpu_count() or 1
+        self.running = {}
+
+    def reserved(self):
+        """ Predicted memory of the running jobs """
+        return sum(predicted for _, predicted in self.running.values())
+
+    def run(self, pool, jobs, submit):
+        """ Run jobs, yielding (job, future) as each completes.
+
+        The measured peak RSS of each job is added to the model if the
+        caller sets job['max_rss_bytes'] before the next job is requested,
+        and the remaining jobs are predicted again.
+
+        Args:
+            pool (concurrent.futures.Executor): pool to submit to
+            jobs (list): job dicts (see mesh_job)
+            submit (function): called as submit(pool, job), returns a future
+        """
+        from concurrent.futures import wait, FIRST_COMPLETED
+
+        # Pending jobs by mix, sorted by element count. Predictions only
+        # grow with the element count within a mix, so the largest job of
+        # a mix that fits is found by bisection.
+        pending = {}
+        for order, job in enumerate(jobs):
+            pending.setdefault(job.get('mix'), []).append((job_elements(job), -order, job))
+        for mix_jobs in pending.values():
+            mix_jobs.sort(key=lambda item: item[:2])
+        reserved = self.reserved()
+        while pending or self.running:
+            while pending and len(self.running) < self.max_jobs:
+                free = None if not self.running else self.budget - reserved
+                choice = None
+                for mix, mix_jobs in pending.items():
+                    index = self._largest_fitting(mix, mix_jobs, free)
+                    if index is None:
+                        continue
+                    predicted = self.model.predict_elements(mix, mix_jobs[index][0])
+                    if choice is None or predicted > choice[0]:
+                        choice = (predicted, mix, index)
+                if choice is None:
+                    break
+                predicted, mix, index = choice
+                job = pending[mix].pop(index)[2]
+                if not pending[mix]:
+                    del pending[mix]
+                job['predicted_bytes'] = predicted
+                self.running[submit(pool, job)] = (job, predicted)
+                reserved += predicted
+            done, _ = wait(list(self.running), return_when=FIRST_COMPLETED)
+            for future in done:
+                job, predicted = self.running.pop(future)
+                reserved -= predicted
+                yield job, future
+                if job.get('max_rss_bytes'):
+                    self.model.add(job, job['max_rss_bytes'])
+
+    def _largest_fitting(self, mix, mix_jobs, free):
+        """ Index of the largest job of a mix whose prediction is at most
+        free bytes (any job if free is None), or None """
+        if free is None:
+            return len(mix_jobs) - 1
+        low, high = 0, len(mix_jobs)
+        while low < high:
+            middle = (low + high) // 2
+            if self.model.predict_elements(mix, mix_jobs[middle][0]) <= free:
+                low = middle + 1
+            else:
+                high = middle
+        return low - 1 if low else None
@@ -0,0 +1,238 @@
+""" MeshLabXML per stage profiler
+
+Splits a FilterScript into stages and runs each one in a separate
+meshlabserver process, saving the mesh after every stage as a binary PLY
+checkpoint. The wall time and peak resident memory of each process are
+attributed to the filters of its stage, so the expensive steps of any
+script show up, even with meshlabserver builds that do not log filter
+timings (see FilterScript.profile for those that do).
+
+Checkpoints are named by a hash of the script inputs and all filters up to
+and including the stage, and the measured time and memory are saved next
+to them. Profiling the same script again, or a script that shares its
+first filters, reuses the checkpoints and only runs the stages after the
+last one found.
+
+A stage ends after every filter that leaves exactly one layer. Filters
+that run while more than one layer exists (e.g. layers.join or
+sampling.hausdorff_distance) are grouped into a single stage, as only the
+current layer is saved in a checkpoint. Vertex and face flags are saved,
+so selections carry over between stages, but textures, rasters and layer
+labels do not.
+
+Example:
+    script = mlx.FilterScript(file_in='scan.ply')
+    mlx.clean.merge_vert(script)
+    mlx.remesh.simplify(script, faces=100000)
+    mlx.smooth.taubin(script)
+    report = stages.profile_stages(script)
+"""
+
+import os
+import sys
+import json
+import hashlib
+import tempfile
+
+from . import mlx
+from . import util
+from . import hooks
+from . import compute
+
+CHECKPOINT_DIR = '.meshlabxml_checkpoints'
+"""str: default directory for stage checkpoints
+"""
+
+CHECKPOINT_MASK = 'vc vf vq vn fc ff fq wt'
+"""str: output mask options of checkpoints (without the -m flag)
+"""
+
+
+def split_stages(script):
+    """ Split the filters of a FilterScript into stages.
+
+    A stage ends after each filter that leaves exactly one layer.
+
+    Returns:
+        list: lists of filter indexes, one per stage
+    """
+    layer_counts = script.filter_layer_counts[1:] + [script.last_layer() + 1]
+    stages = []
+    stage = []
+    for filter_num, layer_count in enumerate(layer_counts):
+        stage.append(filter_num)
+        if layer_count == 1:
+            stages.append(stage)
+            stage = []
+    if stage:
+        stages.append(stage)
+    return stages
+
+
+def input_key(script):
+    """ Hash identifying the input files of a FilterScript, by path, size
+    and modification time """
+    key = hashlib.sha1(script.ml_version.encode())
+    for val in util.make_list(script.mlp_in) + util.make_list(script.file_in):
+        if val is None:
+            continue
+        if val in ('bunny', 'bunny_raw'):
+            val = os.path.join(mlx.THIS_MODULEPATH, os.pardir, 'models',
+                               'bunny_flat(1Z).ply' if val == 'bunny' else 'bunny_raw(-1250Y).ply')
+        stat = os.stat(val)
+        key.update(('%s\0%d\0%d\0' % (os.path.abspath(val), stat.st_size,
+                                      stat.st_mtime_ns)).encode())
+    return key.hexdigest()
+
+
+def stage_keys(script, stages):
+    """ Return the checkpoint key of every stage; each key depends on the
+    inputs and all filters up to the end of its stage """
+    key = input_key(script)
+    keys = []
+    for stage in stages:
+        key = hashlib.sha1((key + ''.join(script.filters[num] for num in stage)).encode())
+        key = key.hexdigest()
+        keys.append(key)
+    return keys
+
+
+def checkpoint_mask(ml_version=mlx.ML_VERSION):
+    """ Output mask options for checkpoints """
+    return '%s %s' % ('-om' if ml_version < '1.3.4' else '-m', CHECKPOINT_MASK)
+
+
+def _load_record(checkpoint):
+    record_name = os.path.splitext(checkpoint)[0] + '.json'
+    if not (os.path.exists(checkpoint) and os.path.exists(record_name)):
+        return None
+    with open(record_name) as record_file:
+        return json.load(record_file)
+
+
+def run_stage(script, stage, file_in, checkpoint, log=None,
+              print_meshlabserver_output=True):
+    """ Run the filters of one stage and save the result as a checkpoint.
+
+    Args:
+        script (FilterScript): the script the stage belongs to
+        stage (list): filter indexes of the stage
+        file_in (str): checkpoint of the previous stage, or None to use
+            the inputs of script (first stage)
+        checkpoint (str): output checkpoint filename (ply)
+
+    Returns:
+        dict: seconds (wall time of meshlabserver) and max_rss_bytes (None
+            if not available on this platform)
+    """
+    usage = {}
+
+    def on_exit(event, info):
+        usage['seconds'] = info['seconds']
+        usage['max_rss_bytes'] = (info['rusage']['max_rss_bytes']
+                                  if info['rusage'] is not None else None)
+
+    temp_files = []
+    mlp_in = None
+    if file_in is None:
+        file_in, mlp_in = script.file_in, script.mlp_in
+        if file_in is None and mlp_in is None:
+            # Scripts without input files start by deleting a dummy mesh
+            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.xyz',
+                                                    dir=os.getcwd())
+            temp_file.write(b'0 0 0')
+            temp_file.close()
+            temp_files.append(temp_file.name)
+            file_in = temp_file.name
+    script_file = tempfile.NamedTemporaryFile(delete=False, suffix='.mlx')
+    script_file.write(''.join(script.opening + [script.filters[num] for num in stage] +
+                              script.closing).encode())
+    script_file.close()
+    temp_files.append(script_file.name)
+    # Write to a temporary name so that a failed run leaves no checkpoint
+    part_name = os.path.splitext(checkpoint)[0] + '.part.ply'
+    hooks.register('exit', on_exit)
+    try:
+        return_code = mlx.run(script=script_file.name, log=log, mlp_in=mlp_in,
+                              file_in=file_in, file_out=part_name,
+                              output_mask=checkpoint_mask(script.ml_version),
+                              ml_version=script.ml_version, weld_stl=script.weld_stl,
+                              print_meshlabserver_output=print_meshlabserver_output)
+    finally:
+        hooks.unregister('exit', on_exit)
+        for val in temp_files:
+            os.remove(val)
+    if return_code != 0 or not os.path.exists(part_name):
+        print('Error: stage with filters %s did not write checkpoint "%s"' % (
+            stage, part_name))
+        sys.exit(1)
+    os.replace(part_name, checkpoint)
+    with open(os.path.splitext(checkpoint)[0] + '.json', 'w') as record_file:
+        json.dump(usage, record_file)
+    return usage
+
+
+def profile_stages(script, checkpoint_dir=CHECKPOINT_DIR, stop=None, rerun=False,
+                   log=None, print_output=True, print_meshlabserver_output=False):
+    """ Profile a FilterScript by running it stage by stage.
+
+    Args:
+        script (FilterScript): script to profile; it is not modified and
+            its output files are not written
+        checkpoint_dir (str): directory for the stage checkpoints
+        stop (int): only profile the stages up to and including the one
+            containing this filter index; None for the whole script
+        rerun (bool): run every stage again even if its checkpoint exists
+        log (str): filename to log the report and meshlabserver output
+        print_output (bool): print the report to stdout if log is None
+        print_meshlabserver_output (bool): pass meshlabserver's output to
+            stdout if log is None
+
+    Returns:
+        list: one dict per stage, slowest first, with the keys of
+            compute.profile_report (filter_num and layer_num are those of
+            the first filter of the stage and name joins the names of all
+            its filters) and filter_nums, max_rss_bytes, cached (True if
+            the times were recorded by an earlier run) and checkpoint
+    """
+    if not script.filters:
+        print('WARNING: no filters to profile!')
+        return []
+    stages = split_stages(script)
+    if stop is not None:
+        stages = [stage for stage in stages if stage[0] <= stop]
+    keys = stage_keys(script, stages)
+    if not os.path.exists(checkpoint_dir):
+        os.makedirs(checkpoint_dir)
+    checkpoints = [os.path.join(checkpoint_dir, key + '.ply') for key in keys]
+
+    records = [None if rerun else _load_record(val) for val in checkpoints]
+    # Stages up to the last one with a checkpoint do not need to run
+    first = len(records)
+    while first > 0 and records[first - 1] is None:
+        first -= 1
+    stage_times = []
+    for index, stage in enumerate(stages):
+        cached = index < first and records[index] is not None
+        if index >= first:
+            records[index] = run_stage(
+                script, stage, checkpoints[index - 1] if index else None,
+                checkpoints[index], log=log,
+                print_meshlabserver_output=print_meshlabserver_output)
+        record = records[index]
+        names = [util.filter_name(script.filters[num]) for num in stage]
+        stage_times.append({
+            'filter_num': stage[0],
+            'layer_num': script.filter_layers[stage[0]],
+            'name': ' + '.join(str(name) for name in names),
+            'msec': record['seconds'] * 1000.0 if record is not None else 0.0,
+            'filter_nums': stage,
+            'max_rss_bytes': record['max_rss_bytes'] if record is not None else None,
+            'cached': cached,
+            'checkpoint': checkpoints[index]})
+    total = sum(entry['msec'] for entry in stage_times)
+    for entry in stage_times:
+        entry['percent'] = 100.0 * entry['msec'] / total if total else 0.0
+    report = sorted(stage_times, key=lambda entry: entry['msec'], reverse=True)
+    compute.print_profile(report, log, print_output)
+    return report
@@ -0,0 +1,195 @@
+""" MeshLabXML timeline tracer
+
+Records nested spans (FilterScript construction, run_script calls,
+meshlabserver process lifetime, script saving and ml_log parsing) and writes
+them as Chrome trace event JSON, which can be loaded into chrome://tracing
+or https://ui.perfetto.dev to see idle gaps, serialization points and
+stragglers in batch runs. Output parsed live from meshlabserver's stdout
+is interleaved with the process, so its total parse time is recorded on
+an instant "parse" event instead of a span.
+
+Spans from all threads are recorded. Worker processes (e.g. the
+files.measure_tree process pool) append their spans to part files next to
+the trace file, which are merged when the trace is saved. Timestamps are
+wall clock microseconds, so spans from different processes line up.
+
+Example:
+    from meshlabxml import trace
+    trace.start('batch_trace.json')
+    ... run scripts ...
+    trace.stop()
+"""
+
+import os
+import json
+import glob
+import time
+import functools
+import threading
+import contextlib
+
+from . import hooks
+
+TRACE_ENV = 'MESHLABXML_TRACE'
+"""str: environment variable with the trace filename and owner pid, so that
+worker processes started with spawn also record spans
+"""
+
+TRACER = None
+"""Tracer: the active tracer, or None if tracing is off
+"""
+
+
+def _now():
+    """ Wall clock time in microseconds """
+    return time.time_ns() // 1000
+
+
+class Tracer(object):
+    """ Record spans and save them as Chrome trace event JSON.
+
+    Args:
+        filename (str): output filename
+        owner_pid (int): pid of the process that saves the trace; other
+            processes write part files. Defaults to the current process.
+    """
+    def __init__(self, filename, owner_pid=None):
+        self.filename = filename
+        self.owner_pid = os.getpid() if owner_pid is None else owner_pid
+        self.events = []
+        self._lock = threading.Lock()
+        self._named = set()
+
+    def _record(self, event):
+        pid = os.getpid()
+        tid = threading.get_ident()
+        event['pid'] = pid
+        event['tid'] = tid
+        events = [event]
+        if (pid, tid) not in self._named:
+            self._named.add((pid, tid))
+            events.insert(0, {'ph': 'M', 'name': 'thread_name', 'pid': pid, 'tid': tid,
+                              'args': {'name': threading.current_thread().name}})
+            events.insert(0, {'ph': 'M', 'name': 'process_name', 'pid': pid, 'tid': tid,
+                              'args': {'name': 'main' if pid == self.owner_pid
+                                               else 'worker %d' % pid}})
+        if pid == self.owner_pid:
+            with self._lock:
+                self.events.extend(events)
+        else:
+            with self._lock:
+                with open('%s.%d.part' % (self.filename, pid), 'a') as part_file:
+                    for val in events:
+                        part_file.write(json.dumps(val) + '\n')
+
+    def complete(self, name, start, end, cat='meshlabxml', **args):
+        """ Record a span from start to end (microseconds) """
+        self._record({'ph': 'X', 'name': name, 'cat': cat, 'ts': start,
+                      'dur': max(end - start, 0), 'args': args})
+
+    def instant(self, name, cat='meshlabxml', **args):
+        """ Record an instant event """
+        self._record({'ph': 'i', 'name': name, 'cat': cat, 'ts': _now(), 's': 't',
+                      'args': args})
+
+    @contextlib.contextmanager
+    def span(self, name, cat='meshlabxml', **args):
+        """ Context manager recording a span around its block """
+        start = _now()
+        try:
+            yield args
+        finally:
+            self.complete(name, start, _now(), cat, **args)
+
+    def hook(self, event, info):
+        """ hooks callback recording meshlabserver, parse and save spans """
+        now = _now()
+        if event == 'spawn':
+            self._record({'ph': 'B', 'name': 'meshlabserver', 'cat': 'process', 'ts': now,
+                          'args': {'cmd': info['cmd']}})
+        elif event == 'exit':
+            args = {'return_code': info['return_code'], 'aborted': info['aborted']}
+            if info['rusage'] is not None:
+                args.update(info['rusage'])
+            self._record({'ph': 'E', 'name': 'meshlabserver', 'cat': 'process', 'ts': now,
+                          'args': args})
+        elif event == 'parse':
+            if info['source'] == 'stdout':
+                # Parsed live, spread over the process lifetime; not a span
+                self.instant('parse', 'parse', source=info['source'], lines=info['lines'],
+                             bytes=info['bytes'], seconds=info['seconds'])
+            else:
+                self.complete('parse', now - int(info['seconds'] * 1e6), now, 'parse',
+                              source=info['source'], lines=info['lines'],
+                              bytes=info['bytes'])
+        elif event == 'script_build':
+            self.complete('save_to_file', now - int(info['seconds'] * 1e6), now, 'script',
+                          filter_num=info['filter_num'], bytes=info['bytes'])
+        elif event == 'output':
+            self.instant('output', 'io', file_out=info['file_out'], bytes=info['bytes'])
+
+    def save(self):
+        """ Merge part files from worker processes and write the trace """
+        events = list(self.events)
+        for part_name in sorted(glob.glob(glob.escape(self.filename) + '.*.part')):
+            with open(part_name) as part_file:
+                for line in part_file:
+                    try:
+                        events.append(json.loads(line))
+                    except ValueError:  # incomplete line of a killed worker
+                        continue
+            os.remove(part_name)
+        with open(self.filename, 'w') as trace_file:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, trace_file)
+        return self.filename
+
+
+def start(filename='meshlabxml_trace.json'):
+    """ Start tracing to filename; returns the Tracer """
+    global TRACER
+    if TRACER is not None:
+        stop()
+    TRACER = Tracer(filename)
+    hooks.register('all', TRACER.hook)
+    os.environ[TRACE_ENV] = '%s%s%d' % (filename, os.pathsep, TRACER.owner_pid)
+    return TRACER
+
+
+def stop():
+    """ Stop tracing and save the trace; returns the trace filename """
+    global TRACER
+    if TRACER is None:
+        return None
+    tracer, TRACER = TRACER, None
+    hooks.unregister('all', tracer.hook)
+    os.environ.pop(TRACE_ENV, None)
+    return tracer.save()
+
+
+def span(name, cat='meshlabxml', **args):
+    """ Context manager recording a span if tracing is on """
+    if TRACER is None:
+        return contextlib.nullcontext(args)
+    return TRACER.span(name, cat, **args)
+
+
+def traced(name=None, cat='meshlabxml'):
+    """ Decorator recording a span around every call if tracing is on """
+    def decorate(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if TRACER is None:
+                return func(*args, **kwargs)
+            with TRACER.span(span_name, cat):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+if os.environ.get(TRACE_ENV) and TRACER is None:
+    # Worker process started by a traced process
+    _filename, _, _owner_pid = os.environ[TRACE_ENV].rpartition(os.pathsep)
+    TRACER = Tracer(_filename, owner_pid=int(_owner_pid))
+    hooks.register('all', TRACER.hook)
@@ -1077,6 +1077,10 @@ def deform2curve(script, curve=mp_func.torus_knot('t'), step=0.001):
 
     newPoint = point.x*N + point.y*B
 
+    primitives.sweep builds a swept mesh natively (with parallel transport
+    frames by default) and primitives.deform_to_curve applies the same
+    deformation to a vertex array.
+
     """
     curve_step = []
     for idx, val in enumerate(curve):
@@ -1,8 +1,8 @@
 """ MeshLabXML utility functions """
 
 import os
+import re
 import sys
-import inspect
 from glob import glob
 
 #from . import FilterScript
@@ -43,10 +43,7 @@ def color_values(color):
         for a named color.
     """
     # Get the directory where this script file is located:
-    this_dir = os.path.dirname(
-        os.path.realpath(
-            inspect.getsourcefile(
-                lambda: 0)))
+    this_dir = os.path.dirname(os.path.realpath(__file__))
     color_name_file = os.path.join(this_dir, 'color_names.txt')
     found = False
     for line in open(color_name_file, 'r'):
@@ -115,6 +112,8 @@ def write_filter(script, filter_xml):
     """
     if isinstance(script, mlx.FilterScript):
         script.filters.append(filter_xml)
+        script.filter_layers.append(script.current_layer())
+        script.filter_layer_counts.append(script.last_layer() + 1)
     elif isinstance(script, str):
         script_file = open(script, 'a')
         script_file.write(filter_xml)
@@ -124,6 +123,15 @@ def write_filter(script, filter_xml):
     return None
 
 
+FILTER_NAME_PATTERN = re.compile(r'<(?:xml)?filter\s+name="([^"]*)"')
+
+
+def filter_name(filter_xml):
+    """ Return the MeshLab filter name of a filter xml string, or None """
+    match = FILTER_NAME_PATTERN.search(filter_xml)
+    return match.group(1) if match is not None else None
+
+
 # Matrix Math
 def mat_transpose(matrix):
     """ Transpose 2D matrix
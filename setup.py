@@ -18,4 +18,5 @@ setup(name='MeshLabXML',
       author_email='3DLirious@gmail.com',
       license='LGPL-2.1',
       packages=['meshlabxml'],
+      extras_require={'native': ['numpy']},
       include_package_data=True)